@@ -1,9 +1,35 @@
 from django.contrib import admin
+from django.db.models import Q
 from django.utils.html import format_html
 from django.urls import reverse
 from django.utils.safestring import mark_safe
 from django.utils import timezone
-from .models import Member, Child, MembershipFee, Payment, UserProfile
+from .models import (
+    Member, Child, MembershipFee, Payment, UserProfile, DuplicateCandidate,
+    phonetic_key_filter, reserve_membership_numbers, search_members
+)
+
+
+# Sound-alike members added to an admin search
+ADMIN_PHONETIC_LIMIT = 100
+
+
+def phonetic_search_results(model_admin, request, queryset, search_term):
+    """
+    Default admin search plus names that sound like the search term.
+    "Shrestha" also finds "श्रेष्ठ" and "Srestha": members through the search
+    token index, children through their indexed phonetic_key column.
+    """
+    results, may_have_duplicates = admin.ModelAdmin.get_search_results(
+        model_admin, request, queryset, search_term
+    )
+    if queryset.model is Member:
+        phonetic_match = Q(pk__in=search_members(search_term, queryset, limit=ADMIN_PHONETIC_LIMIT))
+    else:
+        phonetic_match = phonetic_key_filter(search_term)
+    if phonetic_match is not None:
+        results |= queryset.filter(phonetic_match)
+    return results, may_have_duplicates
 
 
 @admin.register(UserProfile)
@@ -83,9 +109,12 @@ class MemberAdmin(admin.ModelAdmin):
         'email',
         'citizenship_number',
         'father_name',
-        'grandfather_name'
+        'grandfather_name',
+    ]
+    # Payment status follows the payments, so it is shown but not edited here
+    readonly_fields = [
+        'last_payment_date', 'membership_valid_until', 'total_paid_display', 'created_at', 'updated_at'
     ]
-    readonly_fields = ['created_at', 'updated_at', 'total_paid_display']
     
     fieldsets = (
         ('Primary Information', {
@@ -133,30 +162,25 @@ class MemberAdmin(admin.ModelAdmin):
     
     inlines = [ChildInline]
     
+    def get_search_results(self, request, queryset, search_term):
+        """Also match other spellings of the member's name"""
+        return phonetic_search_results(self, request, queryset, search_term)
+    
     def total_paid_display(self, obj):
         """Display total amount paid"""
         if obj.pk:
-            total = obj.get_total_paid()
             return format_html(
-                '<strong style="color: green;">NPR {:,.2f}</strong>',
-                total
+                '<strong style="color: green;">NPR {}</strong>',
+                f"{obj.total_paid:,.2f}"
             )
         return "-"
     total_paid_display.short_description = 'Total Paid'
+    total_paid_display.admin_order_field = 'total_paid'
     
     def save_model(self, request, obj, form, change):
         """Auto-generate membership number if not provided"""
         if not obj.membership_number:
-            # Get the last membership number
-            last_member = Member.objects.all().order_by('id').last()
-            if last_member and last_member.membership_number:
-                try:
-                    last_number = int(last_member.membership_number.split('-')[-1])
-                    obj.membership_number = f"NSS-MEM-{last_number + 1:05d}"
-                except:
-                    obj.membership_number = f"NSS-MEM-{Member.objects.count() + 1:05d}"
-            else:
-                obj.membership_number = "NSS-MEM-00001"
+            obj.membership_number = reserve_membership_numbers(1)[0]
         super().save_model(request, obj, form, change)
 
 
@@ -167,6 +191,10 @@ class ChildAdmin(admin.ModelAdmin):
     list_filter = ['gender', 'date_of_birth']
     search_fields = ['name', 'member__name']
     autocomplete_fields = ['member']
+    
+    def get_search_results(self, request, queryset, search_term):
+        """Also match other spellings of the child's name"""
+        return phonetic_search_results(self, request, queryset, search_term)
 
 
 @admin.register(MembershipFee)
@@ -203,8 +231,8 @@ class MembershipFeeAdmin(admin.ModelAdmin):
     def amount_display(self, obj):
         """Display amount with currency"""
         return format_html(
-            '<strong>NPR {:,.2f}</strong>',
-            obj.amount
+            '<strong>NPR {}</strong>',
+            f"{obj.amount:,.2f}"
         )
     amount_display.short_description = 'Amount'
 
@@ -273,8 +301,8 @@ class PaymentAdmin(admin.ModelAdmin):
     def amount_display(self, obj):
         """Display amount with currency"""
         return format_html(
-            '<strong style="color: green;">NPR {:,.2f}</strong>',
-            obj.amount
+            '<strong style="color: green;">NPR {}</strong>',
+            f"{obj.amount:,.2f}"
         )
     amount_display.short_description = 'Amount'
     
@@ -287,4 +315,35 @@ class PaymentAdmin(admin.ModelAdmin):
             request,
             f"Selected {queryset.count()} payment(s) for receipt generation."
         )
-    generate_receipt_report.short_description = "Generate receipts for selected payments"
\ No newline at end of file
+    generate_receipt_report.short_description = "Generate receipts for selected payments"
+
+
+@admin.register(DuplicateCandidate)
+class DuplicateCandidateAdmin(admin.ModelAdmin):
+    """Review queue of possible duplicate members"""
+    list_display = ['member_a_link', 'member_b_link', 'score', 'reasons', 'status', 'created_at']
+    list_filter = ['status']
+    search_fields = ['member_a__name', 'member_b__name', 'member_a__membership_number', 'member_b__membership_number']
+    list_select_related = ['member_a', 'member_b']
+    readonly_fields = ['member_a', 'member_b', 'score', 'reasons', 'created_at']
+    
+    def member_link(self, member):
+        url = reverse('admin:membership_member_change', args=[member.pk])
+        return format_html('<a href="{}">{} ({})</a>', url, member.name, member.membership_number)
+    
+    def member_a_link(self, obj):
+        return self.member_link(obj.member_a)
+    member_a_link.short_description = 'Member'
+    
+    def member_b_link(self, obj):
+        return self.member_link(obj.member_b)
+    member_b_link.short_description = 'Possible Duplicate'
+    
+    actions = ['dismiss_candidates']
+    
+    def dismiss_candidates(self, request, queryset):
+        """Mark selected pairs as different people so they are not suggested again"""
+        updated = queryset.update(status='DISMISSED')
+        self.message_user(request, f"{updated} pair(s) marked as not duplicates.")
+    dismiss_candidates.short_description = "Mark selected pairs as not duplicates"
+
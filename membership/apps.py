@@ -1,5 +1,22 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.core.signals import request_started
+
+WARM_CACHE_DISPATCH_UID = 'membership.warm_nepali_date_cache'
+
+
+def warm_nepali_date_cache(sender, **kwargs):
+    """Runs once, on the first request this process serves"""
+    request_started.disconnect(dispatch_uid=WARM_CACHE_DISPATCH_UID)
+    from .nepali_date import NepaliDate
+    NepaliDate.warm_cache()
 
 
 class MembershipConfig(AppConfig):
     name = 'membership'
+
+    def ready(self):
+        # Pre-format the current fiscal year's dates for the nepali/dual_date filters.
+        # Deferred to the first request so migrate, shell and other commands skip it.
+        if getattr(settings, 'NEPALI_DATE_WARM_CACHE', True):
+            request_started.connect(warm_nepali_date_cache, dispatch_uid=WARM_CACHE_DISPATCH_UID)
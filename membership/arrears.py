@@ -0,0 +1,132 @@
+"""
+Dues and arrears
+Works out what every regular member owes in one pass: members, their latest
+payment dates and the fee matrix are each read with a single query, then
+vectorized date arithmetic finds when each member's unpaid period began, how
+many months or years have fallen due since, and the amount owed. Results
+are stored in MemberDues so the arrears report reads an indexed table; the
+refresh_member_dues command rebuilds it (daily, and after fee changes or
+imports), while member and payment writes refresh their own member's row.
+"""
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import MEMBER_DUES_CACHE_KEY, Member, MemberDues, MembershipFee, Payment
+
+# Length of one paid period; other frequencies are treated as annual
+PERIOD_MONTHS = {'MONTHLY': 1, 'ANNUAL': 12}
+
+
+def _month_numbers(dates):
+    return dates.dt.year * 12 + dates.dt.month - 1
+
+
+def add_months(dates, months):
+    """Datetime series moved by months, landing on the last day of a shorter month"""
+    total = _month_numbers(dates) + months
+    first = pd.to_datetime(pd.DataFrame({'year': total // 12, 'month': total % 12 + 1, 'day': 1}))
+    day = np.minimum(dates.dt.day, first.dt.days_in_month)
+    return first + pd.to_timedelta(day - 1, unit='D')
+
+
+def compute_dues(members, last_payments, fees, today):
+    """
+    Dues of the given members as of today.
+
+    members: DataFrame indexed by member id with payment_frequency and join_date
+    last_payments: Series of latest payment date by member id
+    fees: {payment_frequency: amount} for regular members
+
+    Unpaid time starts one period after the latest payment, or at the join
+    date for members who never paid. Returns the members owing at least one
+    period, with payment_frequency, last_payment_date, due_since,
+    periods_owed and amount_due (in paisa, missing when no fee applies).
+    """
+    frame = members[['payment_frequency']].copy()
+    frame['last_payment_date'] = last_payments.reindex(frame.index)
+    period = frame['payment_frequency'].map(PERIOD_MONTHS).fillna(12).astype('int64')
+
+    last = pd.to_datetime(frame['last_payment_date'])
+    due_since = pd.to_datetime(members['join_date'])
+    paid = last.notna()
+    if paid.any():
+        due_since[paid] = add_months(last[paid], period[paid])
+    frame['due_since'] = due_since
+
+    today = pd.Timestamp(today)
+    elapsed = (
+        (today.year * 12 + today.month - 1) - _month_numbers(due_since)
+        - (today.day < due_since.dt.day)
+    )
+    is_due = (due_since <= today).to_numpy()
+    frame['periods_owed'] = np.where(is_due, elapsed.fillna(0).astype('int64') // period + 1, 0)
+
+    fee_paisa = frame['payment_frequency'].map(
+        {frequency: int(amount * 100) for frequency, amount in fees.items()}
+    )
+    frame['amount_due'] = (frame['periods_owed'] * fee_paisa).astype('Int64')
+    return frame[frame['periods_owed'] > 0]
+
+
+def refresh_member_dues(member_ids=None, today=None):
+    """
+    Recompute stored dues for the given members, or rebuild the whole table.
+    Returns the number of members owing.
+    """
+    today = today or timezone.localdate()
+    members = Member.objects.filter(membership_type='REGULAR', is_active=True)
+    payments = Payment.objects.all()
+    stored = MemberDues.objects.all()
+    if member_ids is not None:
+        member_ids = list(member_ids)
+        members = members.filter(pk__in=member_ids)
+        payments = payments.filter(member_id__in=member_ids)
+        stored = stored.filter(member_id__in=member_ids)
+
+    frame = pd.DataFrame.from_records(
+        list(members.values_list('pk', 'payment_frequency', 'join_date')),
+        columns=['id', 'payment_frequency', 'join_date'],
+        index='id',
+    )
+    dues = []
+    if not frame.empty:
+        last_payments = pd.Series(dict(
+            payments.order_by().values('member_id').annotate(last=Max('payment_date'))
+            .values_list('member_id', 'last')
+        ), dtype=object)
+        fees = dict(
+            MembershipFee.objects.filter(membership_type='REGULAR', is_active=True)
+            .values_list('payment_frequency', 'amount')
+        )
+        owing = compute_dues(frame, last_payments, fees, today)
+        dues = [
+            MemberDues(
+                member_id=member_id,
+                payment_frequency=row.payment_frequency,
+                last_payment_date=row.last_payment_date if pd.notna(row.last_payment_date) else None,
+                due_since=row.due_since.date(),
+                periods_owed=row.periods_owed,
+                amount_due=None if pd.isna(row.amount_due) else Decimal(int(row.amount_due)) / 100,
+                computed_on=today,
+            )
+            for member_id, row in zip(owing.index, owing.itertuples(index=False))
+        ]
+
+    with transaction.atomic():
+        stored.delete()
+        MemberDues.objects.bulk_create(dues, batch_size=1000)
+    if member_ids is None:
+        cache.set(MEMBER_DUES_CACHE_KEY, today.isoformat(), None)
+    return len(dues)
+
+
+def member_dues_stale(today=None):
+    """Whether the dues table missed today's rebuild, a fee change or a bulk import since"""
+    today = today or timezone.localdate()
+    return cache.get(MEMBER_DUES_CACHE_KEY) != today.isoformat()
@@ -0,0 +1,153 @@
+"""
+Duplicate member detection
+Members are only compared with others sharing a blocking key: the same
+phone, the same citizenship number, or a name and father's name that sound
+alike. Pairs within a block are scored with Jaro-Winkler name similarity
+plus exact identifier matches, so the work grows with block sizes instead
+of with the square of the member count. Pure text handling only, so
+migrations and management commands can share it.
+"""
+from .phonetic import phonetic_key, transliterate
+from .search import normalize_phone, normalize_token
+
+# Emails bulk upload writes for members without one
+PLACEHOLDER_EMAIL_DOMAIN = '@placeholder.com'
+
+# A block this large (an office phone, a very common name) says little about
+# any one pair and would cost size^2 comparisons, so it is skipped
+MAX_BLOCK_SIZE = 50
+
+# Pairs scoring at least this are stored for review
+DUPLICATE_THRESHOLD = 0.85
+
+BLOCKING_KEY_MAX_LENGTH = 120
+
+
+def member_blocking_keys(member):
+    """Blocking keys of a member; members sharing any key are compared"""
+    keys = set()
+    phone = normalize_phone(member.phone)
+    if phone:
+        keys.add(f'phone:{phone}')
+    citizenship = normalize_token(member.citizenship_number or '')
+    if citizenship:
+        keys.add(f'citizenship:{citizenship}')
+    name = phonetic_key(member.name)
+    father = phonetic_key(member.father_name).split()
+    if name and father:
+        keys.add(f'name:{name}|{father[0]}'[:BLOCKING_KEY_MAX_LENGTH])
+    return keys
+
+
+def jaro_winkler(a, b, prefix_scale=0.1):
+    """Jaro-Winkler similarity of two strings, from 0 (different) to 1 (equal)"""
+    if a == b:
+        return 1.0
+    if not a or not b:
+        return 0.0
+
+    window = max(max(len(a), len(b)) // 2 - 1, 0)
+    a_matched = [False] * len(a)
+    b_matched = [False] * len(b)
+    matches = 0
+    for i, ch in enumerate(a):
+        for j in range(max(0, i - window), min(len(b), i + window + 1)):
+            if not b_matched[j] and b[j] == ch:
+                a_matched[i] = b_matched[j] = True
+                matches += 1
+                break
+    if not matches:
+        return 0.0
+
+    a_chars = [ch for ch, matched in zip(a, a_matched) if matched]
+    b_chars = [ch for ch, matched in zip(b, b_matched) if matched]
+    transpositions = sum(x != y for x, y in zip(a_chars, b_chars)) // 2
+    jaro = (matches / len(a) + matches / len(b) + (matches - transpositions) / matches) / 3
+
+    prefix = 0
+    for x, y in zip(a[:4], b[:4]):
+        if x != y:
+            break
+        prefix += 1
+    return jaro + prefix * prefix_scale * (1 - jaro)
+
+
+# Romanization variants evened out before names are compared
+SPELLING_FOLDS = [('aa', 'a'), ('ee', 'i'), ('ii', 'i'), ('oo', 'u'), ('uu', 'u'), ('sh', 's'), ('th', 't'), ('w', 'v')]
+
+
+def _name_words(value):
+    value = transliterate(value).lower()
+    for variant, letter in SPELLING_FOLDS:
+        value = value.replace(variant, letter)
+    return value.split()
+
+
+def _is_ascii(value):
+    return all(ord(ch) < 128 for ch in value)
+
+
+def name_similarity(a, b):
+    """
+    Similarity of two names in any script. Relatives share a surname, so the
+    given names count for most of it. A Devanagari name and its romanization
+    count as 0.95 when they sound alike.
+    """
+    a, b = str(a or ''), str(b or '')
+    if not a.strip() or not b.strip():
+        return None
+    a_words, b_words = _name_words(a), _name_words(b)
+    if len(a_words) > 1 and len(b_words) > 1:
+        similarity = (
+            0.8 * jaro_winkler(' '.join(a_words[:-1]), ' '.join(b_words[:-1]))
+            + 0.2 * jaro_winkler(a_words[-1], b_words[-1])
+        )
+    else:
+        similarity = jaro_winkler(' '.join(a_words), ' '.join(b_words))
+    if similarity < 0.95 and _is_ascii(a) != _is_ascii(b) and phonetic_key(a) == phonetic_key(b):
+        similarity = 0.95
+    return similarity
+
+
+def real_email(value):
+    value = (value or '').strip().lower()
+    return '' if value.endswith(PLACEHOLDER_EMAIL_DOMAIN) else value
+
+
+def score_pair(a, b):
+    """
+    (score from 0 to 1, reasons) for two members being the same person.
+    The member's name carries the score and the father's name scales it;
+    shared identifiers raise it and different birth dates lower it.
+    Placeholder phones and emails never count as shared.
+    """
+    name = name_similarity(a.name, b.name) or 0.0
+    father = name_similarity(a.father_name, b.father_name)
+    score = name if father is None else name * (0.7 + 0.3 * father)
+    reasons = [f'name {name:.0%} alike']
+    if father is not None:
+        reasons.append(f"father's name {father:.0%} alike")
+
+    citizenship = normalize_token(a.citizenship_number or '')
+    if citizenship and citizenship == normalize_token(b.citizenship_number or ''):
+        score = max(score, 0.9)
+        reasons.append('same citizenship number')
+
+    phone = normalize_phone(a.phone)
+    if phone and phone == normalize_phone(b.phone):
+        score += (1 - score) * 0.3
+        reasons.append('same phone')
+
+    email = real_email(a.email)
+    if email and email == real_email(b.email):
+        score += (1 - score) * 0.3
+        reasons.append('same email')
+
+    if a.date_of_birth and b.date_of_birth:
+        if a.date_of_birth == b.date_of_birth:
+            score += (1 - score) * 0.3
+            reasons.append('same date of birth')
+        else:
+            score *= 0.85
+            reasons.append('different date of birth')
+    return score, reasons
@@ -1,7 +1,9 @@
 from django import forms
+from django.utils.functional import cached_property
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
 from django.contrib.auth.models import User
-from .models import Member, Child, MembershipFee, Payment
+from .models import Member, Child, MembershipFee, Payment, reserve_membership_numbers
+from .nepali_date import NepaliDate
 
 
 class LoginForm(AuthenticationForm):
@@ -97,20 +99,43 @@ class MemberForm(forms.ModelForm):
             'is_active': forms.CheckboxInput(attrs={'class': 'form-check-input'}),
         }
     
+    # Nepali (BS) date inputs in member_form.html, keyed by the AD field they fill
+    BS_DATE_INPUTS = {
+        'date_of_birth': 'dob',
+        'citizenship_issue_date': 'cit',
+        'join_date': 'join',
+    }
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.invalid_bs_dates = []
+        
+        # Convert BS entries server-side when the AD field was left empty
+        if self.is_bound:
+            data = self.data.copy()
+            for field, prefix in self.BS_DATE_INPUTS.items():
+                parts = [data.get(f'{prefix}_bs_{part}') for part in ('year', 'month', 'day')]
+                if data.get(field) or not all(parts):
+                    continue
+                ad_date = NepaliDate.bs_to_ad(*parts)
+                if ad_date:
+                    data[field] = ad_date.isoformat()
+                else:
+                    self.invalid_bs_dates.append(field)
+            self.data = data
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        for field in self.invalid_bs_dates:
+            self.add_error(field, 'Enter a valid Nepali (BS) date between 2000 and 2089.')
+        return cleaned_data
+    
     def save(self, commit=True):
         member = super().save(commit=False)
         
         # Auto-generate membership number if not provided
         if not member.membership_number:
-            last_member = Member.objects.all().order_by('id').last()
-            if last_member and last_member.membership_number:
-                try:
-                    last_number = int(last_member.membership_number.split('-')[-1])
-                    member.membership_number = f"NSS-MEM-{last_number + 1:05d}"
-                except:
-                    member.membership_number = f"NSS-MEM-{Member.objects.count() + 1:05d}"
-            else:
-                member.membership_number = "NSS-MEM-00001"
+            member.membership_number = reserve_membership_numbers(1)[0]
         
         if commit:
             member.save()
@@ -172,7 +197,8 @@ class PaymentForm(forms.ModelForm):
             'payment_mode', 'transaction_reference', 'collected_by', 'remarks'
         ]
         widgets = {
-            'member': forms.Select(attrs={'class': 'form-select'}),
+            # Picked through the member lookup box, not a dropdown of every member
+            'member': forms.HiddenInput(),
             'membership_fee': forms.Select(attrs={'class': 'form-select'}),
             'amount': forms.NumberInput(attrs={'class': 'form-control', 'step': '0.01', 'placeholder': 'Amount'}),
             'payment_date': forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
@@ -184,8 +210,8 @@ class PaymentForm(forms.ModelForm):
     
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        # Order members by name
-        self.fields['member'].queryset = Member.objects.filter(is_active=True).order_by('name')
+        # Only active members can pay; the queryset is only used to validate the chosen id
+        self.fields['member'].queryset = Member.objects.filter(is_active=True)
         
         # Filter membership fees - only show active fees
         self.fields['membership_fee'].queryset = MembershipFee.objects.filter(is_active=True)
@@ -203,15 +229,21 @@ class PaymentForm(forms.ModelForm):
                 self.initial['amount'] = self.instance.membership_fee.amount
         
         # Add data attributes for JavaScript filtering
-        self.fields['member'].widget.attrs.update({
-            'id': 'id_member',
-            'onchange': 'updateFeeOptions()'
-        })
         self.fields['membership_fee'].widget.attrs.update({
             'id': 'id_membership_fee',
             'onchange': 'updateAmount()'
         })
     
+    @cached_property
+    def selected_member(self):
+        """Member currently chosen on the form, shown in the lookup box"""
+        if self.is_bound:
+            member_id = self.data.get(self.add_prefix('member'))
+            if not member_id or not str(member_id).isdigit():
+                return None
+            return Member.objects.filter(pk=member_id).first()
+        return self.instance.member if self.instance.member_id else None
+    
     def clean(self):
         cleaned_data = super().clean()
         member = cleaned_data.get('member')
@@ -0,0 +1,1073 @@
+"""
+Bulk member import
+Column-wise pandas pipeline behind the bulk upload: whole columns are
+normalized at once, uniqueness is checked against prefetched sets and valid
+rows are written with bulk_create in batches. Uploads are streamed and
+committed in fixed-size chunks. Row numbers in the report are spreadsheet
+rows (header is row 1).
+"""
+import time
+from collections import defaultdict
+from decimal import Decimal
+from io import BytesIO
+
+import numpy as np
+import openpyxl
+import pandas as pd
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connection, connections, transaction
+from django.db.models.sql import UpdateQuery
+from django.db.models.sql.constants import NO_RESULTS
+from django.utils import timezone
+
+from .models import (
+    Child, Member, MembershipFee, Payment, ImportJob, DASHBOARD_STATS_CACHE_KEY, DUPLICATE_FIELDS,
+    MEMBER_DUES_CACHE_KEY, birthday_key, find_duplicates_of, index_member_blocking_keys,
+    index_member_search_tokens, reconcile_payment_summaries, recompute_payment_status,
+    reserve_membership_numbers, reserve_receipt_numbers
+)
+from .nepali_date import NepaliDate
+from .phonetic import phonetic_key
+from .search import SEARCH_FIELD_WEIGHTS, normalize_phone
+
+# Optional BS date columns accepted by bulk upload, mapped to their AD column
+BS_DATE_COLUMNS = {
+    'date_of_birth_bs': 'date_of_birth',
+    'join_date_bs': 'join_date',
+    'citizenship_issue_date_bs': 'citizenship_issue_date',
+}
+
+# Accepted spellings in the sheet -> stored value
+MEMBERSHIP_TYPE_VALUES = {
+    'REGULAR': 'REGULAR',
+    'LIFETIME': 'LIFETIME',
+    'HONARARY': 'HONARARY',
+    'HONORARY': 'HONARARY',
+}
+PAYMENT_FREQUENCY_VALUES = {
+    'ANNUAL': 'ANNUAL',
+    'YEARLY': 'ANNUAL',
+    'MONTHLY': 'MONTHLY',
+    'ONE-TIME': 'ONE-TIME',
+    'ONE_TIME': 'ONE-TIME',
+    'HONARARY': 'HONARARY',
+}
+GENDER_VALUES = {
+    'M': 'M', 'MALE': 'M',
+    'F': 'F', 'FEMALE': 'F',
+    'O': 'O', 'OTHER': 'O',
+}
+
+# Text columns copied as they are (empty -> None)
+OPTIONAL_TEXT_COLUMNS = [
+    'father_name', 'grandfather_name', 'spouse_name',
+    'citizenship_number', 'citizenship_issue_district',
+]
+
+PAYMENT_MODE_VALUES = {
+    'CASH': 'CASH',
+    'BANK': 'BANK_TRANSFER',
+    'BANK_TRANSFER': 'BANK_TRANSFER',
+    'BANK TRANSFER': 'BANK_TRANSFER',
+    'ONLINE': 'ONLINE',
+    'CHEQUE': 'CHEQUE',
+    'CHECK': 'CHEQUE',
+    'HONARARY': 'HONARARY',
+    'HONORARY': 'HONARARY',
+}
+
+# Sheets of a legacy workbook, imported in this (dependency) order
+WORKBOOK_SHEETS = ('Members', 'Children', 'Payments')
+PAYMENT_BS_DATE_COLUMNS = {'payment_date_bs': 'payment_date'}
+
+# Fields an upsert may change on an existing member, when the sheet has a value
+UPDATE_FIELDS = [
+    'name', 'phone', 'email', 'date_of_birth', 'gender', 'address',
+    'father_name', 'grandfather_name', 'spouse_name',
+    'citizenship_number', 'citizenship_issue_date', 'citizenship_issue_district',
+    'membership_type', 'payment_frequency', 'join_date',
+]
+# Indexed keys Member.save derives from a field
+DERIVED_KEYS = {
+    'name': ('phonetic_key', phonetic_key),
+    'date_of_birth': ('birthday_key', birthday_key),
+    'phone': ('phone_key', normalize_phone),
+}
+
+# Order in which auto-generated fields are listed in the report
+AUTO_GENERATED_FIELDS = [
+    'phone (missing)', 'membership_type', 'gender', 'payment_frequency',
+    'membership_number', 'email', 'address',
+]
+
+
+def apply_bs_date_columns(df, columns=BS_DATE_COLUMNS):
+    """Fill AD date columns from their BS counterparts, converting whole columns at once"""
+    for bs_column, ad_column in columns.items():
+        if bs_column not in df.columns:
+            continue
+
+        converted = pd.Series(NepaliDate.parse_bs_array(df[bs_column]), index=df.index)
+        if ad_column in df.columns:
+            # An explicit AD date wins; BS only fills the gaps
+            df[ad_column] = df[ad_column].where(df[ad_column].notna(), converted)
+        else:
+            df[ad_column] = converted
+    return df
+
+
+def text_column(df, column):
+    """Stripped strings of a column, '' where missing (whole numbers lose their '.0')"""
+    if column not in df.columns:
+        return pd.Series('', index=df.index, dtype=object)
+    values = df[column]
+    if pd.api.types.is_float_dtype(values) and (values.dropna() % 1 == 0).all():
+        values = values.astype('Int64')
+    return values.astype(object).where(values.notna(), '').astype(str).str.strip()
+
+
+def date_column(df, column):
+    """Dates of a column, None where missing or unparseable"""
+    if column not in df.columns:
+        return pd.Series([None] * len(df), index=df.index, dtype=object)
+    parsed = pd.to_datetime(df[column], errors='coerce', format='mixed')
+    return parsed.dt.date.astype(object).where(parsed.notna(), None)
+
+
+def choice_column(df, column, values, default):
+    """Column mapped through accepted spellings; returns (values, used_default mask)"""
+    mapped = text_column(df, column).str.upper().map(values)
+    return mapped.fillna(default), mapped.isna()
+
+
+def _existing_values(field, values, batch_size=1000, model=Member):
+    """Values of a unique field (of Member unless given) that are already taken"""
+    values = list({value for value in values if value})
+    existing = set()
+    for start in range(0, len(values), batch_size):
+        existing.update(model.objects.filter(
+            **{f'{field}__in': values[start:start + batch_size]}
+        ).values_list(field, flat=True))
+    return existing
+
+
+def _existing_ids(field, values, batch_size=1000):
+    """{value: member id} for the values of a unique Member field that are taken"""
+    values = list({value for value in values if value})
+    existing = {}
+    for start in range(0, len(values), batch_size):
+        existing.update(Member.objects.filter(
+            **{f'{field}__in': values[start:start + batch_size]}
+        ).values_list(field, 'pk'))
+    return existing
+
+
+def _phone_matches(phones, names, batch_size=1000):
+    """
+    Ids of the members with the same normalized phone and a name that sounds
+    the same, per row. Families often share a phone, so the phone alone is
+    not enough to say two rows are one person.
+    """
+    values = list({phone for phone in phones if phone})
+    candidates = defaultdict(list)
+    for start in range(0, len(values), batch_size):
+        rows = Member.objects.filter(
+            phone_key__in=values[start:start + batch_size]
+        ).values_list('phone_key', 'phonetic_key', 'pk')
+        for phone, key, pk in rows:
+            candidates[(phone, key)].append(pk)
+    keys = names.map(phonetic_key)
+    return pd.Series(
+        [candidates.get((phone, key), []) if phone else [] for phone, key in zip(phones, keys)],
+        index=phones.index, dtype=object
+    )
+
+
+def _sheet(workbook, name=None):
+    """Named sheet (any case), else the Members sheet, else the first sheet"""
+    names = {sheet.strip().lower(): sheet for sheet in workbook.sheetnames}
+    wanted = (name or WORKBOOK_SHEETS[0]).lower()
+    if wanted in names:
+        return workbook[names[wanted]]
+    if name:
+        raise KeyError(f'The workbook has no {name} sheet.')
+    return workbook.worksheets[0]
+
+
+def workbook_sheets(file):
+    """
+    Related sheets ('Members', 'Children', 'Payments') found in an .xlsx
+    upload; a workbook import needs Members plus at least one other.
+    """
+    try:
+        workbook = openpyxl.load_workbook(file, read_only=True)
+    except Exception:
+        return []
+    finally:
+        file.seek(0)
+    try:
+        names = {sheet.strip().lower() for sheet in workbook.sheetnames}
+    finally:
+        workbook.close()
+    found = [sheet for sheet in WORKBOOK_SHEETS if sheet.lower() in names]
+    return found if WORKBOOK_SHEETS[0] in found and len(found) > 1 else []
+
+
+def _xlsx_chunks(file, chunk_size, sheet=None):
+    """DataFrames of chunk_size rows streamed from one sheet of an .xlsx file"""
+    workbook = openpyxl.load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = _sheet(workbook, sheet).iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(value).strip() if value is not None else f'column_{i}' for i, value in enumerate(header)]
+        width = len(columns)
+
+        chunk, index = [], []
+        for position, values in enumerate(rows):
+            # Formatting can make read-only sheets report trailing empty rows
+            if all(value is None for value in values):
+                continue
+            chunk.append((tuple(values) + (None,) * width)[:width])
+            index.append(position)
+            if len(chunk) == chunk_size:
+                yield pd.DataFrame(chunk, columns=columns, index=index)
+                chunk, index = [], []
+        if chunk:
+            yield pd.DataFrame(chunk, columns=columns, index=index)
+    finally:
+        workbook.close()
+
+
+def read_chunks(file, extension, chunk_size, sheet=None):
+    """
+    Stream an uploaded CSV/Excel file as DataFrames of at most chunk_size rows.
+    The index counts data rows from 0 across chunks, so row numbers stay right.
+    Excel files are read from `sheet`, by default the Members or first sheet.
+    Old .xls files cannot be streamed and are read whole, then sliced.
+    """
+    if extension == 'csv':
+        yield from pd.read_csv(file, chunksize=chunk_size)
+    elif extension == 'xlsx':
+        yield from _xlsx_chunks(file, chunk_size, sheet)
+    else:
+        df = pd.read_excel(file, sheet_name=sheet or 0)
+        for start in range(0, len(df), chunk_size):
+            yield df.iloc[start:start + chunk_size]
+
+
+class MemberImport:
+    """
+    Imports member rows from one or more DataFrames (a whole file or its chunks)
+    and collects the same report the bulk upload always showed: created,
+    skipped, per-row errors and per-row auto-generated fields.
+    
+    Each chunk is committed on its own, so memory stays bounded by the chunk
+    size and rows saved before a failing chunk are kept. Only the first
+    REPORT_LIMIT errors and auto-generated rows are kept in detail.
+    """
+    BATCH_SIZE = 500
+    CHUNK_SIZE = 2000
+    REPORT_LIMIT = 100
+
+    def __init__(self, dry_run=False, update_existing=False):
+        # Dry run: validate only, writing nothing and keeping a report row per sheet row
+        self.dry_run = dry_run
+        # Upsert: rows matching an existing member update it instead of failing
+        self.update_existing = update_existing
+        self.report = []
+        self.success_count = 0
+        self.updated_count = 0
+        self.unchanged_count = 0
+        self.skipped_count = 0
+        self.error_count = 0
+        self.errors = []
+        self.auto_generated_count = 0
+        self.auto_generated = []
+        # Membership number given in the sheet -> number of the member it became
+        # (only kept when set to a dict, for workbooks that refer back to members)
+        self.number_map = None
+        self.processed_rows = 0
+        self.stopped = False
+
+    def add_error(self, message):
+        self.error_count += 1
+        if len(self.errors) < self.REPORT_LIMIT:
+            self.errors.append(message)
+
+    def add_auto_generated(self, item):
+        self.auto_generated_count += 1
+        if len(self.auto_generated) < self.REPORT_LIMIT:
+            self.auto_generated.append(item)
+
+    def import_file(self, file, extension, chunk_size=None, progress=None):
+        """
+        Import a whole upload chunk by chunk. A chunk that cannot be read or
+        written stops the import; chunks before it stay committed.
+        progress(importer) is called after every chunk.
+        """
+        chunks = read_chunks(file, extension, chunk_size or self.CHUNK_SIZE)
+        last_row = 1
+        while True:
+            try:
+                df = next(chunks)
+            except StopIteration:
+                break
+            except Exception as e:
+                self.stop(f'Could not read the file after row {last_row}: {str(e)}')
+                break
+            if df.empty:
+                continue
+            try:
+                self.import_frame(df)
+            except Exception as e:
+                self.stop(f'Rows {df.index[0] + 2}-{df.index[-1] + 2}: {str(e)}')
+                break
+            last_row = int(df.index[-1]) + 2
+            self.processed_rows = last_row - 1
+            if progress:
+                progress(self)
+
+    def stop(self, message):
+        self.stopped = True
+        self.add_error(f'{message}. Import stopped; earlier rows were saved.')
+
+    def import_frame(self, df):
+        """Normalize, validate and create the members of one DataFrame"""
+        df = apply_bs_date_columns(df)
+        row_numbers = pd.Series(df.index + 2, index=df.index)
+
+        name = text_column(df, 'name')
+        present = name != ''
+        self.skipped_count += int((~present).sum())
+        if self.dry_run:
+            self._report(row_numbers[~present], name[~present], 'Skipped', 'No name; the row is skipped.')
+        df, name, row_numbers = df[present], name[present], row_numbers[present]
+        if df.empty:
+            return 0
+
+        frame = pd.DataFrame({'name': name}, index=df.index)
+        auto = pd.DataFrame(False, index=df.index, columns=AUTO_GENERATED_FIELDS)
+
+        # Phone: placeholder when missing (TEMP + time stamp + row index)
+        phone = text_column(df, 'phone')
+        auto['phone (missing)'] = phone == ''
+        stamp = np.base_repr(int(time.time()), 36)
+        frame['phone'] = phone.where(phone != '', 'TEMP' + stamp + df.index.astype(str).to_series(index=df.index))
+
+        frame['date_of_birth'] = date_column(df, 'date_of_birth')
+        frame['join_date'] = date_column(df, 'join_date').fillna(timezone.now().date())
+        frame['citizenship_issue_date'] = date_column(df, 'citizenship_issue_date')
+
+        frame['membership_type'], auto['membership_type'] = choice_column(
+            df, 'membership_type', MEMBERSHIP_TYPE_VALUES, 'REGULAR'
+        )
+        frame['gender'], auto['gender'] = choice_column(df, 'gender', GENDER_VALUES, 'O')
+        frame['payment_frequency'], auto['payment_frequency'] = choice_column(
+            df, 'payment_frequency', PAYMENT_FREQUENCY_VALUES, 'MONTHLY'
+        )
+
+        address = text_column(df, 'address')
+        auto['address'] = address == ''
+        frame['address'] = address.where(address != '', 'Address not provided')
+
+        for column in OPTIONAL_TEXT_COLUMNS:
+            frame[column] = text_column(df, column)
+
+        # Validation: one message per failing row, rows with errors are not created
+        row_errors = pd.Series('', index=df.index)
+
+        def fail(mask, message):
+            mask = mask & (row_errors == '')
+            row_errors[mask] = message if isinstance(message, str) else message[mask]
+
+        existing = pd.Series(np.nan, index=df.index)
+        if self.update_existing:
+            existing, match_errors = self._match_existing(df, frame)
+            fail(match_errors != '', match_errors)
+        new = existing.isna()
+
+        fail(new & (frame['father_name'] == ''), "Father's name is required.")
+
+        citizenship = frame['citizenship_number']
+        taken_citizenship = _existing_values('citizenship_number', citizenship[new])
+        fail(
+            (citizenship != '') & ((new & citizenship.isin(taken_citizenship)) | citizenship.duplicated()),
+            'Citizenship number ' + citizenship + ' already exists.'
+        )
+
+        for column in frame.columns:
+            max_length = getattr(Member._meta.get_field(column), 'max_length', None)
+            if max_length and frame[column].dtype == object:
+                lengths = frame[column].map(lambda value: len(value) if isinstance(value, str) else 0)
+                fail(lengths > max_length, f'{column} is longer than {max_length} characters.')
+
+        failed = row_errors != ''
+        for row, message in zip(row_numbers[failed], row_errors[failed]):
+            self.add_error(f'Row {row}: {message}')
+        if self.dry_run:
+            self._report(row_numbers[failed], frame['name'][failed], 'Error', row_errors[failed])
+        frame, auto, row_numbers = frame[~failed], auto[~failed], row_numbers[~failed]
+
+        matched = existing[~failed].notna()
+        if matched.any():
+            self._update(df, frame[matched], auto[matched], existing[~failed][matched], row_numbers[matched])
+            frame, auto, row_numbers = frame[~matched], auto[~matched], row_numbers[~matched]
+        if frame.empty:
+            return 0
+
+        # Membership numbers: keep unused ones from the file, allocate the rest as one block
+        provided = text_column(df.loc[frame.index], 'membership_number')
+        given_numbers = provided.copy()
+        taken = _existing_values('membership_number', provided)
+        needs_number = (provided == '') | provided.isin(taken) | ((provided != '') & provided.duplicated())
+        auto['membership_number'] = needs_number
+        if self.dry_run:
+            return self._report_valid(df, frame, auto, row_numbers)
+        provided[needs_number] = reserve_membership_numbers(
+            int(needs_number.sum()), exclude=set(provided[provided != ''])
+        )
+        frame['membership_number'] = provided
+
+        email = text_column(df.loc[frame.index], 'email')
+        auto['email'] = email == ''
+        frame['email'] = email.where(
+            email != '',
+            'noemail.' + provided.str.lower().str.replace('-', '', regex=False) + '@placeholder.com'
+        )
+
+        # Derived columns Member.save would normally fill in
+        dob = pd.to_datetime(frame['date_of_birth'])
+        frame['birthday_key'] = (dob.dt.month * 100 + dob.dt.day).astype('Int64').astype(object).where(dob.notna(), None)
+        frame['phonetic_key'] = frame['name'].map(phonetic_key)
+        frame['phone_key'] = frame['phone'].map(normalize_phone)
+
+        for column in OPTIONAL_TEXT_COLUMNS:
+            frame[column] = frame[column].where(frame[column] != '', None)
+
+        frame = frame.astype(object).where(frame.notna(), None)
+        members = [Member(is_active=True, **fields) for fields in frame.to_dict('records')]
+        created = self._create(members, list(row_numbers))
+
+        created_numbers = {member.membership_number for member in created}
+        if self.number_map is not None:
+            kept = (given_numbers != '') & frame['membership_number'].isin(created_numbers)
+            self.number_map.update(zip(given_numbers[kept], frame['membership_number'][kept]))
+
+        # Auto-generated report for the rows that were created
+        auto = auto[frame['membership_number'].isin(created_numbers)]
+        flagged = auto.any(axis=1)
+        for index in auto.index[flagged]:
+            self.add_auto_generated({
+                'row': int(index) + 2,
+                'name': frame.at[index, 'name'],
+                'fields': [field for field in AUTO_GENERATED_FIELDS if auto.at[index, field]],
+            })
+        return len(created)
+
+    def _match_existing(self, df, frame):
+        """
+        Id of the existing member each row updates (NaN for new members) and
+        the rows that cannot be matched safely. Membership number and
+        citizenship number must agree; the phone (with a matching name) is
+        only used when neither finds a member.
+        """
+        numbers = text_column(df, 'membership_number')
+        citizenship = frame['citizenship_number']
+        by_number = numbers.map(_existing_ids('membership_number', numbers))
+        by_citizenship = citizenship.map(_existing_ids('citizenship_number', citizenship))
+
+        phones = frame['phone'].map(normalize_phone)
+        by_phone = _phone_matches(phones, frame['name'])
+        identified = by_number.notna() | by_citizenship.notna()
+        single_phone = ~identified & (by_phone.map(len) == 1)
+
+        existing = by_number.fillna(by_citizenship)
+        existing[single_phone] = by_phone[single_phone].str[0]
+
+        errors = pd.Series('', index=frame.index)
+        errors[by_number.notna() & by_citizenship.notna() & (by_number != by_citizenship)] = (
+            'Membership number and citizenship number belong to different members.'
+        )
+        ambiguous = ~identified & (by_phone.map(len) > 1)
+        errors[(errors == '') & ambiguous] = (
+            'Phone ' + frame['phone'][ambiguous] + ' matches several members with this name; '
+            'add the membership or citizenship number.'
+        )
+        valid = (errors == '') & existing.notna()
+        errors[valid & existing.where(valid).duplicated()] = 'Matches the same member as an earlier row.'
+
+        return existing, errors
+
+    def _update(self, df, frame, auto, existing, row_numbers):
+        """
+        Apply the sheet's values to the matched members. Empty cells and
+        placeholders never overwrite stored data; only members whose values
+        changed are written, with one bulk_update per set of changed fields.
+        """
+        given = pd.DataFrame({
+            field: frame[field].notna() & (frame[field] != '')
+            for field in UPDATE_FIELDS if field in frame.columns
+        })
+        given['phone'] &= ~auto['phone (missing)']
+        given['address'] &= ~auto['address']
+        for field in ('membership_type', 'gender', 'payment_frequency'):
+            given[field] &= ~auto[field]
+        given['join_date'] = date_column(df.loc[frame.index], 'join_date').notna()
+        email = text_column(df.loc[frame.index], 'email')
+        values = frame.assign(email=email)
+        given['email'] = email != ''
+
+        values = values.astype(object).where(values.notna(), None)
+        members = Member.objects.in_bulk([int(pk) for pk in existing])
+
+        groups = defaultdict(list)
+        changes = []
+        for index, pk in existing.items():
+            member = members[int(pk)]
+            changed = []
+            for field in UPDATE_FIELDS:
+                if not given.at[index, field]:
+                    continue
+                value = values.at[index, field]
+                current = getattr(member, field)
+                if field == 'phone' and normalize_phone(current) == normalize_phone(value):
+                    continue  # Same number, written differently
+                if current != value:
+                    setattr(member, field, value)
+                    changed.append(field)
+                    if field in DERIVED_KEYS:
+                        key, derive = DERIVED_KEYS[field]
+                        setattr(member, key, derive(value))
+                        changed.append(key)
+            changes.append(', '.join(field for field in changed if field in UPDATE_FIELDS))
+            if changed:
+                groups[tuple(changed)].append(member)
+
+        if self.number_map is not None:
+            given_numbers = text_column(df.loc[existing.index], 'membership_number')
+            self.number_map.update(
+                (number, members[int(pk)].membership_number)
+                for number, pk in zip(given_numbers, existing) if number
+            )
+
+        changes = pd.Series(changes, index=existing.index, dtype=object)
+        changed = changes != ''
+        self.updated_count += int(changed.sum())
+        self.unchanged_count += int((~changed).sum())
+        if self.dry_run:
+            numbers = existing.map(lambda pk: members[int(pk)].membership_number)
+            messages = ('Will update ' + numbers + ': ' + changes).where(changed, 'Matches ' + numbers + '; no changes.')
+            self._report(row_numbers, frame['name'], 'OK', messages)
+            return
+
+        with transaction.atomic():
+            for fields, batch in groups.items():
+                Member.objects.bulk_update(batch, list(fields), batch_size=self.BATCH_SIZE)
+        reindex = [
+            member for fields, batch in groups.items()
+            if set(fields) & set(SEARCH_FIELD_WEIGHTS) for member in batch
+        ]
+        for start in range(0, len(reindex), 1000):
+            index_member_search_tokens(reindex[start:start + 1000])
+        recheck = [
+            member for fields, batch in groups.items()
+            if set(fields) & set(DUPLICATE_FIELDS) for member in batch
+        ]
+        for start in range(0, len(recheck), 1000):
+            index_member_blocking_keys(recheck[start:start + 1000])
+        find_duplicates_of(member.pk for member in recheck)
+        cache.delete_many([DASHBOARD_STATS_CACHE_KEY, MEMBER_DUES_CACHE_KEY])
+
+    def _report(self, row_numbers, names, status, message, auto_generated=''):
+        self.report.append(pd.DataFrame({
+            'Row': row_numbers,
+            'Name': names,
+            'Status': status,
+            'Message': message,
+            'Auto-generated': auto_generated,
+        }))
+
+    def _report_valid(self, df, frame, auto, row_numbers):
+        """Dry run: report the rows that would be created, with the fields that would be filled in"""
+        auto['email'] = text_column(df.loc[frame.index], 'email') == ''
+        fields = pd.Series('', index=auto.index)
+        for field in AUTO_GENERATED_FIELDS:
+            fields += auto[field].map({True: field + ', ', False: ''})
+        fields = fields.str.rstrip(', ')
+
+        self.success_count += len(frame)
+        flagged = fields != ''
+        self.auto_generated_count += int(flagged.sum())
+        self._report(row_numbers, frame['name'], 'OK', 'Will be created.', fields)
+        return len(frame)
+
+    def report_frame(self):
+        """Dry run report, one row per sheet row in file order"""
+        if not self.report:
+            return pd.DataFrame(columns=['Row', 'Name', 'Status', 'Message', 'Auto-generated'])
+        return pd.concat(self.report).sort_values('Row', kind='stable')
+
+    def _create(self, members, row_numbers):
+        """
+        bulk_create in batches inside one transaction. A batch the database
+        rejects is retried row by row so the failing rows can be reported.
+        """
+        created = []
+        with transaction.atomic():
+            for start in range(0, len(members), self.BATCH_SIZE):
+                batch = members[start:start + self.BATCH_SIZE]
+                rows = row_numbers[start:start + self.BATCH_SIZE]
+                try:
+                    with transaction.atomic():
+                        Member.objects.bulk_create(batch)
+                    created.extend(batch)
+                except DatabaseError:
+                    for member, row in zip(batch, rows):
+                        member.pk = None
+                        try:
+                            with transaction.atomic():
+                                member.save()
+                            created.append(member)
+                        except Exception as e:
+                            self.add_error(f'Row {row}: {str(e)}')
+
+            # bulk_create skips save() and its signals: index search tokens and
+            # blocking keys, check for duplicates and drop cached stats
+            numbers = [member.membership_number for member in created]
+            created_ids = []
+            for start in range(0, len(numbers), 1000):
+                batch = list(Member.objects.filter(membership_number__in=numbers[start:start + 1000]))
+                index_member_search_tokens(batch)
+                index_member_blocking_keys(batch)
+                created_ids.extend(member.pk for member in batch)
+            find_duplicates_of(created_ids)
+        cache.delete_many([DASHBOARD_STATS_CACHE_KEY, MEMBER_DUES_CACHE_KEY])
+        self.success_count += len(created)
+        return created
+
+
+class WorkbookImport(MemberImport):
+    """
+    Members, Children and Payments sheets of one legacy workbook, imported in
+    a single transaction and bulk_created in that (dependency) order.
+    Children and payments name their member by membership number, resolved
+    in memory against the Members sheet first and existing members second.
+    Without upsert, a Members row whose membership number is already taken
+    is that member imported before (so re-importing a workbook adds nothing),
+    unless its citizenship number says otherwise, in which case the row and
+    the children and payments naming it are rejected.
+    Membership validity is refreshed once per paying member at the end,
+    instead of once per payment.
+    """
+
+    def __init__(self, update_existing=False):
+        super().__init__(update_existing=update_existing)
+        self.number_map = {}
+        self.children_count = 0
+        self.payments_count = 0
+        self.already_imported_count = 0
+        self.paid_member_ids = set()
+        # Membership numbers of Members rows rejected for belonging to someone else
+        self.rejected_numbers = set()
+        # Membership numbers given on the Members sheet so far, across chunks
+        self.sheet_numbers = set()
+
+    def import_workbook(self, file, chunk_size=None, progress=None):
+        """
+        Import every related sheet; any unexpected error rolls the whole workbook back.
+        progress(importer) is called after every chunk of every sheet, with
+        processed_rows counting the rows of all sheets so far.
+        """
+        sheets = workbook_sheets(file)
+        chunk_size = chunk_size or self.CHUNK_SIZE
+        imports = [('Members', self.import_frame), ('Children', self.import_children), ('Payments', self.import_payments)]
+        try:
+            with transaction.atomic():
+                done = 0
+                for sheet, import_chunk in imports:
+                    if sheet not in sheets:
+                        continue
+                    file.seek(0)
+                    for df in read_chunks(file, 'xlsx', chunk_size, sheet=sheet):
+                        if df.empty:
+                            continue
+                        import_chunk(df)
+                        self.processed_rows = done + int(df.index[-1]) + 1
+                        if progress:
+                            progress(self)
+                    done = self.processed_rows
+
+                # bulk_create skips Payment.save and its signals
+                paid = list(self.paid_member_ids)
+                for start in range(0, len(paid), 1000):
+                    members = Member.objects.filter(pk__in=paid[start:start + 1000])
+                    reconcile_payment_summaries(members)
+                    recompute_payment_status(members)
+        except Exception as e:
+            self.success_count = self.updated_count = self.children_count = self.payments_count = 0
+            self.already_imported_count = 0
+            self.stopped = True
+            self.add_error(f'{str(e)}. Import stopped; nothing from this workbook was saved.')
+        cache.delete_many([DASHBOARD_STATS_CACHE_KEY, MEMBER_DUES_CACHE_KEY])
+
+    def import_frame(self, df):
+        df = self._reject_repeated_numbers(df)
+        if not self.update_existing:
+            df = self._skip_imported_members(df)
+        return super().import_frame(df)
+
+    def _reject_repeated_numbers(self, df):
+        """
+        Drop Members rows repeating a membership number given earlier in the
+        sheet, so children and payments naming it resolve to the first row.
+        """
+        numbers = text_column(df, 'membership_number')
+        given = (numbers != '') & (text_column(df, 'name') != '')
+        repeated = given & (
+            numbers.isin(self.sheet_numbers) | numbers[given].duplicated().reindex(df.index, fill_value=False)
+        )
+        for row, number in zip(df.index[repeated] + 2, numbers[repeated]):
+            self.add_error(f'Row {row}: Membership number {number} appears more than once in the Members sheet.')
+        self.sheet_numbers.update(numbers[given])
+        return df[~repeated]
+
+    def _skip_imported_members(self, df):
+        """
+        Drop the Members rows whose membership number is already taken: the
+        member itself when the citizenship numbers agree (or the sheet has
+        none), otherwise an error. Children and payments naming a skipped
+        member are added to the existing one.
+        """
+        numbers = text_column(df, 'membership_number')
+        existing = numbers.map(_existing_ids('membership_number', numbers))
+        found = existing.notna() & (text_column(df, 'name') != '')
+        if not found.any():
+            return df
+
+        stored = dict(
+            Member.objects.filter(pk__in=[int(pk) for pk in existing[found]])
+            .values_list('pk', 'citizenship_number')
+        )
+        citizenship = text_column(df, 'citizenship_number')
+        stored_citizenship = existing[found].map(lambda pk: stored.get(int(pk)) or '')
+        same = found & ((citizenship == '') | (citizenship == stored_citizenship.reindex(df.index)))
+        conflict = found & ~same
+
+        for row, number in zip(df.index[conflict] + 2, numbers[conflict]):
+            self.add_error(f'Row {row}: Membership number {number} already belongs to another member.')
+        self.rejected_numbers.update(numbers[conflict])
+        self.already_imported_count += int(same.sum())
+        self.number_map.update((number, number) for number in numbers[same])
+        return df[~found]
+
+    def _member_ids(self, df):
+        """Member id per row from its membership number column, NaN when unknown"""
+        numbers = text_column(df, 'membership_number')
+        numbers = numbers.map(lambda number: self.number_map.get(number, number))
+        return numbers, numbers.map(_existing_ids('membership_number', numbers))
+
+    def _rejected_member(self, numbers):
+        """Rows naming a Members row that was rejected, and their message"""
+        return numbers.isin(self.rejected_numbers), 'Member ' + numbers + ' was not imported (see the Members sheet).'
+
+    def _report_sheet_errors(self, sheet, row_errors, row_numbers):
+        failed = row_errors != ''
+        for row, message in zip(row_numbers[failed], row_errors[failed]):
+            self.add_error(f'{sheet} row {row}: {message}')
+        return failed
+
+    def import_children(self, df):
+        """Create the children of one chunk of the Children sheet"""
+        df = apply_bs_date_columns(df)
+        row_numbers = pd.Series(df.index + 2, index=df.index)
+        name = text_column(df, 'name')
+        present = name != ''
+        self.skipped_count += int((~present).sum())
+        df, name, row_numbers = df[present], name[present], row_numbers[present]
+        if df.empty:
+            return
+
+        numbers, member_ids = self._member_ids(df)
+        date_of_birth = date_column(df, 'date_of_birth')
+        gender = text_column(df, 'gender').str.upper().map(GENDER_VALUES)
+        keys = name.map(phonetic_key)
+
+        row_errors = pd.Series('', index=df.index)
+        row_errors[numbers == ''] = 'Membership number is required.'
+        rejected, message = self._rejected_member(numbers)
+        row_errors[(row_errors == '') & rejected] = message
+        row_errors[(row_errors == '') & member_ids.isna()] = 'No member with membership number ' + numbers + '.'
+        max_length = Child._meta.get_field('name').max_length
+        row_errors[(row_errors == '') & (name.str.len() > max_length)] = f'name is longer than {max_length} characters.'
+        failed = self._report_sheet_errors('Children', row_errors, row_numbers)
+
+        # A child already recorded for the member (same name, any spelling) is not added twice
+        ids = [int(pk) for pk in member_ids[~failed].unique()]
+        recorded = set()
+        for start in range(0, len(ids), 1000):
+            recorded.update(
+                Child.objects.filter(member_id__in=ids[start:start + 1000]).values_list('member_id', 'phonetic_key')
+            )
+        pairs = pd.Series(list(zip(member_ids.fillna(0).astype(int), keys)), index=df.index)
+        repeated = ~failed & (pairs.isin(recorded) | pairs.duplicated())
+        self.already_imported_count += int(repeated.sum())
+
+        create = ~failed & ~repeated
+        children = [
+            Child(
+                member_id=int(member_id), name=child_name, phonetic_key=key,
+                date_of_birth=dob, birthday_key=birthday_key(dob),
+                gender=child_gender if isinstance(child_gender, str) else None,
+            )
+            for member_id, child_name, key, dob, child_gender in zip(
+                member_ids[create], name[create], keys[create], date_of_birth[create], gender[create]
+            )
+        ]
+        Child.objects.bulk_create(children, batch_size=self.BATCH_SIZE)
+        self.children_count += len(children)
+
+        # bulk_create skips the signal that makes children's names searchable
+        parent_ids = sorted({child.member_id for child in children})
+        for start in range(0, len(parent_ids), 1000):
+            index_member_search_tokens(Member.objects.filter(pk__in=parent_ids[start:start + 1000]))
+
+    def import_payments(self, df):
+        """Create the payments of one chunk of the Payments sheet"""
+        df = apply_bs_date_columns(df, PAYMENT_BS_DATE_COLUMNS)
+        row_numbers = pd.Series(df.index + 2, index=df.index)
+        numbers = text_column(df, 'membership_number')
+        present = (numbers != '') | (text_column(df, 'amount') != '')
+        self.skipped_count += int((~present).sum())
+        df, row_numbers = df[present], row_numbers[present]
+        if df.empty:
+            return
+
+        numbers, member_ids = self._member_ids(df)
+        payment_date = date_column(df, 'payment_date')
+        amount = pd.to_numeric(df['amount'], errors='coerce') if 'amount' in df.columns else pd.Series(np.nan, index=df.index)
+        payment_mode = text_column(df, 'payment_mode').str.upper().map(PAYMENT_MODE_VALUES).fillna('CASH')
+        receipt = text_column(df, 'receipt_number')
+
+        # Fee from the member's type and frequency, as PaymentForm requires
+        ids = [int(pk) for pk in member_ids.dropna().unique()]
+        member_terms = {}
+        for start in range(0, len(ids), 1000):
+            member_terms.update(
+                (pk, (membership_type, frequency)) for pk, membership_type, frequency in
+                Member.objects.filter(pk__in=ids[start:start + 1000])
+                .values_list('pk', 'membership_type', 'payment_frequency')
+            )
+        fees = {}
+        for fee in MembershipFee.objects.filter(is_active=True).order_by('-pk'):
+            fees[(fee.membership_type, fee.payment_frequency)] = fee
+        fee = member_ids.map(lambda pk: fees.get(member_terms.get(int(pk))) if pk == pk else None)
+        amount = amount.where(amount.notna(), fee.map(lambda fee: float(fee.amount) if fee else np.nan))
+
+        row_errors = pd.Series('', index=df.index)
+
+        def fail(mask, message):
+            mask = mask & (row_errors == '')
+            row_errors[mask] = message if isinstance(message, str) else message[mask]
+
+        fail(numbers == '', 'Membership number is required.')
+        fail(*self._rejected_member(numbers))
+        fail(member_ids.isna(), 'No member with membership number ' + numbers + '.')
+        fail(fee.isna(), 'No active fee for this member\'s membership type and payment frequency.')
+        fail(payment_date.isna(), 'Payment date is required.')
+        fail(amount.isna() | (amount < 0) | (amount >= 10 ** 8), 'Amount must be a number between 0 and 99,999,999.')
+        fail((receipt != '') & receipt.duplicated(keep=False), 'Receipt number ' + receipt + ' appears more than once.')
+        failed = self._report_sheet_errors('Payments', row_errors, row_numbers)
+
+        # Payments already in the database (same receipt, or same member, date and amount) are skipped
+        amount = amount.round(2).map(lambda value: Decimal(f'{value:.2f}') if value == value else None)
+        ok_ids = [int(pk) for pk in member_ids[~failed].unique()]
+        recorded = set()
+        for start in range(0, len(ok_ids), 1000):
+            recorded.update(
+                Payment.objects.filter(member_id__in=ok_ids[start:start + 1000])
+                .values_list('member_id', 'payment_date', 'amount')
+            )
+        entries = pd.Series(
+            list(zip(member_ids.fillna(0).astype(int), payment_date, amount)), index=df.index
+        )
+        repeated = ~failed & (
+            ((receipt != '') & receipt.isin(_existing_values('receipt_number', receipt, model=Payment)))
+            | ((receipt == '') & entries.isin(recorded))
+        )
+        self.already_imported_count += int(repeated.sum())
+
+        create = ~failed & ~repeated
+        receipt = receipt[create]
+        missing = receipt == ''
+        receipt[missing] = reserve_receipt_numbers(int(missing.sum())) if missing.any() else []
+
+        optional = {
+            column: text_column(df[create], column).replace('', None)
+            for column in ('transaction_reference', 'collected_by', 'remarks')
+        }
+        payments = [
+            Payment(
+                member_id=int(member_id), membership_fee=payment_fee, amount=payment_amount,
+                payment_date=paid_on, payment_mode=mode, receipt_number=receipt_number,
+                transaction_reference=reference, collected_by=collected_by, remarks=remarks,
+            )
+            for member_id, payment_fee, payment_amount, paid_on, mode, receipt_number, reference, collected_by, remarks
+            in zip(
+                member_ids[create], fee[create], amount[create], payment_date[create], payment_mode[create],
+                receipt, optional['transaction_reference'], optional['collected_by'], optional['remarks'],
+            )
+        ]
+        Payment.objects.bulk_create(payments, batch_size=self.BATCH_SIZE)
+        self.payments_count += len(payments)
+        self.paid_member_ids.update(int(pk) for pk in member_ids[create])
+
+
+def count_rows(file, extension):
+    """
+    Data rows in an upload, for progress estimates; None when unknown.
+    CSV counts lines (quoted line breaks make it an overestimate), XLSX uses
+    the sheet dimensions recorded in the file, summed over a workbook's
+    related sheets.
+    """
+    try:
+        if extension == 'csv':
+            lines, last = 0, b'\n'
+            for block in iter(lambda: file.read(1 << 20), b''):
+                lines += block.count(b'\n')
+                last = block[-1:]
+            # Last line without a trailing line break
+            if last != b'\n':
+                lines += 1
+            return max(lines - 1, 0)
+        if extension == 'xlsx':
+            sheets = workbook_sheets(file) or [None]
+            workbook = openpyxl.load_workbook(file, read_only=True)
+            try:
+                max_rows = [_sheet(workbook, sheet).max_row for sheet in sheets]
+            finally:
+                workbook.close()
+            return sum(max(max_row - 1, 0) for max_row in max_rows) if all(max_rows) else None
+    except Exception:
+        return None
+    finally:
+        file.seek(0)
+    return None
+
+
+def validate_file(file, extension, update_existing=False):
+    """
+    Dry run of a whole upload: every check the import makes, including the
+    uniqueness lookups against the database, without writing anything.
+    The file is validated as one frame so duplicates across chunks are found.
+    """
+    importer = MemberImport(dry_run=True, update_existing=update_existing)
+    frames = list(read_chunks(file, extension, MemberImport.CHUNK_SIZE))
+    if frames:
+        importer.import_frame(pd.concat(frames))
+    return importer
+
+
+def validation_report_xlsx(importer, file_name):
+    """XLSX bytes of a dry run: a summary sheet and one row per sheet row"""
+    workbook = openpyxl.Workbook(write_only=True)
+    header_font = openpyxl.styles.Font(bold=True, color="FFFFFF")
+    header_fill = openpyxl.styles.PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
+
+    def header(sheet, values):
+        cells = []
+        for value in values:
+            cell = openpyxl.cell.WriteOnlyCell(sheet, value=value)
+            cell.font, cell.fill = header_font, header_fill
+            cells.append(cell)
+        sheet.append(cells)
+
+    summary = workbook.create_sheet('Summary')
+    summary.column_dimensions['A'].width = 30
+    summary.column_dimensions['B'].width = 40
+    header(summary, ['Validation Report', file_name])
+    summary.append(['Checked at', timezone.localtime().strftime('%Y-%m-%d %H:%M')])
+    summary.append(['Rows that will be created', importer.success_count])
+    if importer.update_existing:
+        summary.append(['Members that will be updated', importer.updated_count])
+        summary.append(['Members already up to date', importer.unchanged_count])
+    summary.append(['Rows with errors', importer.error_count])
+    summary.append(['Empty rows skipped', importer.skipped_count])
+    summary.append(['Rows with auto-generated data', importer.auto_generated_count])
+    summary.append(['Nothing has been saved. Fix the errors and upload the file to import it.'])
+
+    rows = workbook.create_sheet('Rows')
+    report = importer.report_frame()
+    for letter, width in zip('ABCDE', (8, 30, 10, 60, 50)):
+        rows.column_dimensions[letter].width = width
+    header(rows, list(report.columns))
+    for values in report.itertuples(index=False):
+        rows.append(list(values))
+
+    buffer = BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+def _update_on(db_connection, queryset, **values):
+    """queryset.update(**values), run on the given connection"""
+    query = queryset.query.chain(UpdateQuery)
+    query.add_update_values(values)
+    query.get_compiler(connection=db_connection).execute_sql(NO_RESULTS)
+
+
+def run_import_job(job):
+    """
+    Run one claimed ImportJob to the end, saving counters after every chunk.
+    Workbooks with Children or Payments sheets go through WorkbookImport.
+    The uploaded file is deleted once the job has finished.
+    """
+    report_fields = [
+        'processed_rows', 'success_count', 'updated_count', 'skipped_count', 'error_count',
+        'auto_generated_count', 'errors', 'auto_generated',
+    ]
+    importer = MemberImport(update_existing=job.update_existing)
+    progress_connection = None
+
+    def save_progress(importer):
+        nonlocal progress_connection
+        for field in report_fields:
+            setattr(job, field, getattr(importer, field))
+        if not connection.in_atomic_block or connection.vendor == 'sqlite':
+            # SQLite has one writer at a time, so it could only wait for the import
+            job.save(update_fields=report_fields)
+            return
+        # A workbook imports in one transaction: write progress on a second
+        # connection so the progress page sees it before the import commits
+        if progress_connection is None:
+            progress_connection = connections.create_connection(DEFAULT_DB_ALIAS)
+        _update_on(
+            progress_connection, ImportJob.objects.filter(pk=job.pk),
+            **{field: getattr(job, field) for field in report_fields},
+        )
+
+    try:
+        with job.file.open('rb') as file:
+            job.total_rows = count_rows(file, job.file_type)
+            job.save(update_fields=['total_rows'])
+            if job.file_type == 'xlsx' and workbook_sheets(file):
+                importer = WorkbookImport(update_existing=job.update_existing)
+                report_fields += ['children_count', 'payments_count', 'already_imported_count']
+                importer.import_workbook(file, progress=save_progress)
+            else:
+                importer.import_file(file, job.file_type, progress=save_progress)
+        job.status = 'FAILED' if importer.stopped else 'COMPLETED'
+    except Exception as e:
+        job.status = 'FAILED'
+        job.message = f'Error processing file: {str(e)}'
+    finally:
+        if progress_connection is not None:
+            progress_connection.close()
+
+    for field in report_fields:
+        setattr(job, field, getattr(importer, field))
+    job.finished_at = timezone.now()
+    job.save()
+    job.file.delete(save=True)
+    return job
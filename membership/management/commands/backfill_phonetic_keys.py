@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from membership.models import Child, Member
+from membership.phonetic import phonetic_key
+
+
+class Command(BaseCommand):
+    help = 'Compute the phonetic name key of existing members and children in chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows updated per batch')
+        parser.add_argument('--all', action='store_true', help='Recompute keys that are already set')
+
+    def handle(self, *args, **options):
+        for model in (Member, Child):
+            updated = self.backfill(model, options['batch_size'], options['all'])
+            label = model._meta.verbose_name_plural.lower()
+            self.stdout.write(self.style.SUCCESS(f'Updated phonetic keys for {updated:,} {label}'))
+
+    def backfill(self, model, batch_size, recompute):
+        """Walk the table by primary key, updating one chunk at a time"""
+        queryset = model.objects.all() if recompute else model.objects.filter(phonetic_key='')
+        last_pk, updated = 0, 0
+        while True:
+            chunk = list(
+                queryset.filter(pk__gt=last_pk).order_by('pk').only('pk', 'name', 'phonetic_key')[:batch_size]
+            )
+            if not chunk:
+                return updated
+            changed = []
+            for obj in chunk:
+                key = phonetic_key(obj.name)
+                if key != obj.phonetic_key:
+                    obj.phonetic_key = key
+                    changed.append(obj)
+            model.objects.bulk_update(changed, ['phonetic_key'])
+            updated += len(changed)
+            last_pk = chunk[-1].pk
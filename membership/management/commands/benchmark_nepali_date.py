@@ -0,0 +1,63 @@
+import random
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from membership.nepali_date import NepaliDate
+
+
+class Command(BaseCommand):
+    help = 'Benchmark indexed AD to BS conversion against the month-walking converter, and the formatting caches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=100000, help='Number of random dates to convert')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for the sample dates')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        last_offset = NepaliDate.MONTH_START_OFFSETS[-1] - 1
+        dates = [
+            NepaliDate.REFERENCE_DATE_AD + timedelta(days=rng.randint(0, last_offset))
+            for _ in range(options['count'])
+        ]
+
+        start = time.perf_counter()
+        walked = [NepaliDate._ad_to_bs_walk(d) for d in dates]
+        walk_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        indexed = [NepaliDate.ad_to_bs(d) for d in dates]
+        index_time = time.perf_counter() - start
+
+        mismatches = sum(1 for a, b in zip(walked, indexed) if a != b)
+
+        self.stdout.write(f'Dates converted: {len(dates):,}')
+        self.stdout.write(f'Month walk:      {walk_time:.3f}s')
+        self.stdout.write(f'Indexed lookup:  {index_time:.3f}s')
+        if index_time:
+            self.stdout.write(f'Speedup:         {walk_time / index_time:.1f}x')
+
+        # The same dates formatted twice: the second pass is served by the caches
+        NepaliDate.clear_cache()
+        start = time.perf_counter()
+        for d in dates:
+            NepaliDate.format_dual_date(d)
+        cold_time = time.perf_counter() - start
+        start = time.perf_counter()
+        for d in dates:
+            NepaliDate.format_dual_date(d)
+        warm_time = time.perf_counter() - start
+
+        self.stdout.write(f'Format (cold):   {cold_time:.3f}s')
+        self.stdout.write(f'Format (cached): {warm_time:.3f}s')
+        for name, stats in NepaliDate.cache_stats().items():
+            self.stdout.write(
+                f"{name}: {stats['hits']:,} hits, {stats['misses']:,} misses, "
+                f"{stats['size']:,}/{stats['maxsize']:,} entries"
+            )
+
+        if mismatches:
+            self.stdout.write(self.style.ERROR(f'{mismatches} conversion(s) differ'))
+        else:
+            self.stdout.write(self.style.SUCCESS('All conversions match'))
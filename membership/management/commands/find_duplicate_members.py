@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from membership.duplicates import MAX_BLOCK_SIZE
+from membership.models import (
+    DuplicateCandidate, Member, MemberBlockingKey, index_member_blocking_keys, store_duplicate_candidates
+)
+
+
+class Command(BaseCommand):
+    help = 'Find possible duplicate members by comparing members that share a blocking key'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Members or blocks handled per batch')
+        parser.add_argument('--rebuild-keys', action='store_true', help='Recompute every member\'s blocking keys first')
+        parser.add_argument('--reset', action='store_true', help='Drop open candidates before the scan (dismissed ones are kept)')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        if options['rebuild_keys']:
+            batch = []
+            for member in Member.objects.order_by('pk').iterator(chunk_size=batch_size):
+                batch.append(member)
+                if len(batch) >= batch_size:
+                    index_member_blocking_keys(batch)
+                    batch = []
+            index_member_blocking_keys(batch)
+            self.stdout.write('Blocking keys rebuilt')
+
+        if options['reset']:
+            DuplicateCandidate.objects.filter(status='OPEN').delete()
+
+        # Only blocks with more than one member (and not too many) produce pairs
+        keys = list(
+            MemberBlockingKey.objects.values('key')
+            .annotate(size=Count('id'))
+            .filter(size__gt=1, size__lte=MAX_BLOCK_SIZE)
+            .order_by('key')
+            .values_list('key', flat=True)
+        )
+        compared = stored = 0
+        for start in range(0, len(keys), batch_size):
+            rows = MemberBlockingKey.objects.filter(key__in=keys[start:start + batch_size])
+            blocks = {}
+            for key, member_id in rows.values_list('key', 'member_id'):
+                blocks.setdefault(key, []).append(member_id)
+            pairs = {
+                (min(a, b), max(a, b))
+                for block in blocks.values()
+                for i, a in enumerate(block)
+                for b in block[i + 1:]
+            }
+            compared += len(pairs)
+            stored += store_duplicate_candidates(pairs)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Compared {compared:,} pair(s) in {len(keys):,} block(s); {stored:,} possible duplicate(s) found'
+        ))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from membership.models import CalendarDay
+from membership.nepali_date import NepaliDate
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the CalendarDay dimension table from NepaliDate.NEPALI_CALENDAR'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000, help='Rows per INSERT statement')
+
+    def handle(self, *args, **options):
+        days = [
+            CalendarDay(ad_date=ad_date, bs_year=bs_year, bs_month=bs_month, bs_day=bs_day, fiscal_year=fiscal_year)
+            for ad_date, bs_year, bs_month, bs_day, fiscal_year in NepaliDate.calendar_days()
+        ]
+
+        with transaction.atomic():
+            CalendarDay.objects.all().delete()
+            CalendarDay.objects.bulk_create(days, batch_size=options['batch_size'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Calendar populated: {len(days):,} days from {days[0].ad_date} to {days[-1].ad_date}'
+        ))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from membership.models import Member, index_member_search_tokens
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the member search token index (needed after bulk imports that skip Member.save)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Members indexed per batch')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        batch, indexed = [], 0
+        for member in Member.objects.order_by('pk').iterator(chunk_size=batch_size):
+            batch.append(member)
+            if len(batch) >= batch_size:
+                index_member_search_tokens(batch)
+                indexed += len(batch)
+                batch = []
+        index_member_search_tokens(batch)
+        indexed += len(batch)
+        self.stdout.write(self.style.SUCCESS(f'Indexed {indexed:,} member(s)'))
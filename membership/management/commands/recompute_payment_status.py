@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from membership.models import recompute_payment_status
+
+
+class Command(BaseCommand):
+    help = 'Rebuild member last payment dates and membership validity from the Payment table'
+
+    def handle(self, *args, **options):
+        updated = recompute_payment_status()
+        self.stdout.write(self.style.SUCCESS(f'Recomputed payment status for {updated:,} member(s)'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from membership.models import reconcile_payment_summaries
+
+
+class Command(BaseCommand):
+    help = 'Rebuild stored member payment totals (total paid, count, last amount) from the Payment table'
+
+    def handle(self, *args, **options):
+        updated = reconcile_payment_summaries()
+        self.stdout.write(self.style.SUCCESS(f'Reconciled payment totals for {updated:,} member(s)'))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from membership.arrears import member_dues_stale, refresh_member_dues
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the member dues table behind the arrears report; run daily as dues grow with time'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--if-stale', action='store_true',
+            help='Only rebuild when not yet rebuilt today or after a fee change or import (for frequent cron runs)',
+        )
+
+    def handle(self, *args, **options):
+        if options['if_stale'] and not member_dues_stale():
+            self.stdout.write('Member dues are up to date')
+            return
+        owing = refresh_member_dues()
+        self.stdout.write(self.style.SUCCESS(f'{owing:,} member(s) have dues outstanding'))
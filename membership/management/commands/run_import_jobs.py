@@ -0,0 +1,74 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from membership.importer import run_import_job
+from membership.models import ImportJob
+
+
+class Command(BaseCommand):
+    help = 'Process bulk member uploads queued from the bulk upload page'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Process waiting jobs and exit instead of polling')
+        parser.add_argument('--poll-interval', type=float, default=2, help='Seconds between checks for new jobs')
+        parser.add_argument(
+            '--stale-after', type=float, default=120,
+            help='Minutes after which a job still running is taken to have lost its worker and is failed',
+        )
+
+    def fail_stale_jobs(self, stale_after):
+        """
+        Fail jobs left running by a worker that died; returns how many.
+        They are not requeued: chunks already committed would be imported twice.
+        """
+        cutoff = timezone.now() - timedelta(minutes=stale_after)
+        failed = 0
+        for job in ImportJob.objects.filter(status='RUNNING', started_at__lt=cutoff):
+            # Conditional, like claiming, in case the job finished meanwhile
+            if ImportJob.objects.filter(pk=job.pk, status='RUNNING').update(
+                status='FAILED', finished_at=timezone.now(),
+                message='The import worker stopped before finishing this job. Check which rows were '
+                        'imported before uploading the file again.',
+            ):
+                job.refresh_from_db()
+                job.file.delete(save=True)
+                failed += 1
+        return failed
+
+    def claim_next(self):
+        """Oldest waiting job, marked running; None when the queue is empty"""
+        while True:
+            job = ImportJob.objects.filter(status='PENDING').order_by('created_at', 'pk').first()
+            if job is None:
+                return None
+            # Conditional update so two workers never run the same job
+            claimed = ImportJob.objects.filter(pk=job.pk, status='PENDING').update(
+                status='RUNNING', started_at=timezone.now()
+            )
+            if claimed:
+                job.refresh_from_db()
+                return job
+
+    def handle(self, *args, **options):
+        failed = self.fail_stale_jobs(options['stale_after'])
+        if failed:
+            self.stdout.write(self.style.WARNING(f'Failed {failed:,} job(s) left running by a stopped worker'))
+
+        while True:
+            job = self.claim_next()
+            if job is None:
+                if options['once']:
+                    return
+                time.sleep(options['poll_interval'])
+                continue
+
+            self.stdout.write(f'Importing {job.file_name} (job {job.pk})...')
+            job = run_import_job(job)
+            style = self.style.SUCCESS if job.status == 'COMPLETED' else self.style.ERROR
+            self.stdout.write(style(
+                f'{job.get_status_display()}: {job.success_count:,} created, '
+                f'{job.error_count:,} failed, {job.skipped_count:,} skipped'
+            ))
@@ -0,0 +1,45 @@
+# Generated by Django 5.0 on 2026-10-17 01:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('membership', '0003_alter_member_phone'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CalendarDay',
+            fields=[
+                ('ad_date', models.DateField(primary_key=True, serialize=False, verbose_name='AD Date')),
+                ('bs_year', models.PositiveSmallIntegerField(verbose_name='BS Year')),
+                ('bs_month', models.PositiveSmallIntegerField(verbose_name='BS Month')),
+                ('bs_day', models.PositiveSmallIntegerField(verbose_name='BS Day')),
+                ('fiscal_year', models.PositiveSmallIntegerField(help_text='BS year in which the fiscal year starts (1 Shrawan)', verbose_name='Fiscal Year')),
+            ],
+            options={
+                'verbose_name': 'Calendar Day',
+                'verbose_name_plural': 'Calendar Days',
+                'ordering': ['ad_date'],
+                'indexes': [models.Index(fields=['bs_year', 'bs_month'], name='calendar_bs_month_idx'), models.Index(fields=['fiscal_year'], name='calendar_fiscal_year_idx')],
+            },
+        ),
+        migrations.AddField(
+            model_name='member',
+            name='expiry_calendar_day',
+            field=models.ForeignObject(from_fields=['membership_valid_until'], null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='membership.calendarday', to_fields=['ad_date']),
+        ),
+        migrations.AddField(
+            model_name='member',
+            name='join_calendar_day',
+            field=models.ForeignObject(from_fields=['join_date'], null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='membership.calendarday', to_fields=['ad_date']),
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='payment_calendar_day',
+            field=models.ForeignObject(from_fields=['payment_date'], null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='membership.calendarday', to_fields=['ad_date']),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.0 on 2026-10-17 02:02
+
+from django.db import migrations, models
+from django.db.models.functions import ExtractDay, ExtractMonth
+
+
+def backfill_birthday_keys(apps, schema_editor):
+    for model_name in ('Member', 'Child'):
+        model = apps.get_model('membership', model_name)
+        model.objects.filter(date_of_birth__isnull=False).update(
+            birthday_key=ExtractMonth('date_of_birth') * 100 + ExtractDay('date_of_birth')
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('membership', '0004_calendarday'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='child',
+            name='birthday_key',
+            field=models.PositiveSmallIntegerField(blank=True, db_index=True, editable=False, help_text='Birth month and day as MMDD, kept in sync with date of birth', null=True),
+        ),
+        migrations.AddField(
+            model_name='member',
+            name='birthday_key',
+            field=models.PositiveSmallIntegerField(blank=True, db_index=True, editable=False, help_text='Birth month and day as MMDD, kept in sync with date of birth', null=True),
+        ),
+        migrations.RunPython(backfill_birthday_keys, migrations.RunPython.noop),
+    ]
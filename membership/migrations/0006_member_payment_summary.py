@@ -0,0 +1,49 @@
+# Generated by Django 5.0 on 2026-10-17 02:05
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def backfill_payment_summaries(apps, schema_editor):
+    Member = apps.get_model('membership', 'Member')
+    Payment = apps.get_model('membership', 'Payment')
+    payments = Payment.objects.filter(member=OuterRef('pk')).order_by().values('member')
+    Member.objects.update(
+        total_paid=Coalesce(
+            Subquery(payments.annotate(total=Sum('amount')).values('total')),
+            Decimal('0.00'),
+            output_field=models.DecimalField(max_digits=12, decimal_places=2),
+        ),
+        payment_count=Coalesce(Subquery(payments.annotate(count=Count('id')).values('count')), 0),
+        last_payment_amount=Subquery(
+            Payment.objects.filter(member=OuterRef('pk')).order_by('-payment_date', '-id').values('amount')[:1]
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('membership', '0005_birthday_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='member',
+            name='last_payment_amount',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=10, null=True, verbose_name='Last Payment Amount'),
+        ),
+        migrations.AddField(
+            model_name='member',
+            name='payment_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Number of Payments'),
+        ),
+        migrations.AddField(
+            model_name='member',
+            name='total_paid',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), editable=False, max_digits=12, verbose_name='Total Paid'),
+        ),
+        migrations.RunPython(backfill_payment_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.0 on 2026-10-17 02:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from membership.search import member_search_tokens
+
+
+def build_search_tokens(apps, schema_editor):
+    Member = apps.get_model('membership', 'Member')
+    MemberSearchToken = apps.get_model('membership', 'MemberSearchToken')
+    tokens = []
+    for member in Member.objects.order_by('pk').iterator(chunk_size=2000):
+        tokens.extend(
+            MemberSearchToken(member_id=member.pk, token=token, weight=weight)
+            for token, weight in member_search_tokens(member).items()
+        )
+        if len(tokens) >= 5000:
+            MemberSearchToken.objects.bulk_create(tokens)
+            tokens = []
+    MemberSearchToken.objects.bulk_create(tokens)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('membership', '0006_member_payment_summary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MemberSearchToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=50)),
+                ('weight', models.PositiveSmallIntegerField(default=1)),
+                ('member', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to='membership.member')),
+            ],
+            options={
+                'verbose_name': 'Member Search Token',
+                'verbose_name_plural': 'Member Search Tokens',
+                'indexes': [models.Index(fields=['token', 'member'], name='member_search_token_idx')],
+            },
+        ),
+        migrations.RunPython(build_search_tokens, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0 on 2026-10-17 02:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('membership', '0007_member_search_token'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='child',
+            name='phonetic_key',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, help_text='Transliterated phonetic skeleton of the name, kept in sync on save', max_length=200),
+        ),
+        migrations.AddField(
+            model_name='member',
+            name='phonetic_key',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, help_text='Transliterated phonetic skeleton of the name, kept in sync on save', max_length=200),
+        ),
+    ]
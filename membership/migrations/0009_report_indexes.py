@@ -0,0 +1,25 @@
+# Generated by Django 5.0 on 2026-10-17 02:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('membership', '0008_phonetic_key'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='member',
+            index=models.Index(fields=['is_active', 'membership_type', 'membership_valid_until'], name='member_status_expiry_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='member',
+            index=models.Index(fields=['join_date', 'id'], name='member_join_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['payment_date', 'payment_mode'], name='payment_date_mode_idx'),
+        ),
+    ]
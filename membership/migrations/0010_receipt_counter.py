@@ -0,0 +1,24 @@
+# Generated by Django 5.0 on 2026-10-17 02:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('membership', '0009_report_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReceiptCounter',
+            fields=[
+                ('day', models.DateField(primary_key=True, serialize=False, verbose_name='Day')),
+                ('last_number', models.PositiveIntegerField(default=0, verbose_name='Last Number')),
+            ],
+            options={
+                'verbose_name': 'Receipt Counter',
+                'verbose_name_plural': 'Receipt Counters',
+            },
+        ),
+    ]
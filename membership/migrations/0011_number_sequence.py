@@ -0,0 +1,24 @@
+# Generated by Django 5.0 on 2026-10-17 02:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('membership', '0010_receipt_counter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NumberSequence',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False, verbose_name='Name')),
+                ('last_value', models.PositiveIntegerField(default=0, verbose_name='Last Value')),
+            ],
+            options={
+                'verbose_name': 'Number Sequence',
+                'verbose_name_plural': 'Number Sequences',
+            },
+        ),
+    ]
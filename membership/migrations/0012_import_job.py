@@ -0,0 +1,44 @@
+# Generated by Django 5.0 on 2026-10-17 02:25
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('membership', '0011_number_sequence'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file', models.FileField(blank=True, upload_to='imports/', verbose_name='File')),
+                ('file_name', models.CharField(max_length=255, verbose_name='File Name')),
+                ('file_type', models.CharField(max_length=10, verbose_name='File Type')),
+                ('status', models.CharField(choices=[('PENDING', 'Waiting'), ('RUNNING', 'Importing'), ('COMPLETED', 'Completed'), ('FAILED', 'Failed')], db_index=True, default='PENDING', max_length=20, verbose_name='Status')),
+                ('total_rows', models.PositiveIntegerField(blank=True, null=True, verbose_name='Total Rows')),
+                ('processed_rows', models.PositiveIntegerField(default=0, verbose_name='Processed Rows')),
+                ('success_count', models.PositiveIntegerField(default=0, verbose_name='Created')),
+                ('skipped_count', models.PositiveIntegerField(default=0, verbose_name='Skipped')),
+                ('error_count', models.PositiveIntegerField(default=0, verbose_name='Errors')),
+                ('auto_generated_count', models.PositiveIntegerField(default=0, verbose_name='Auto-generated')),
+                ('errors', models.JSONField(blank=True, default=list, verbose_name='Error Details')),
+                ('auto_generated', models.JSONField(blank=True, default=list, verbose_name='Auto-generated Details')),
+                ('message', models.TextField(blank=True, verbose_name='Message')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Started At')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Finished At')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='import_jobs', to=settings.AUTH_USER_MODEL, verbose_name='Uploaded By')),
+            ],
+            options={
+                'verbose_name': 'Import Job',
+                'verbose_name_plural': 'Import Jobs',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
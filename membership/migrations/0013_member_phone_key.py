@@ -0,0 +1,44 @@
+# Generated by Django 5.0 on 2026-10-17 02:30
+
+from django.db import migrations, models
+
+from membership.search import normalize_phone
+
+
+def fill_phone_keys(apps, schema_editor):
+    Member = apps.get_model('membership', 'Member')
+    batch = []
+    for member in Member.objects.only('pk', 'phone').order_by('pk').iterator(chunk_size=2000):
+        member.phone_key = normalize_phone(member.phone)
+        if member.phone_key:
+            batch.append(member)
+        if len(batch) >= 2000:
+            Member.objects.bulk_update(batch, ['phone_key'])
+            batch = []
+    Member.objects.bulk_update(batch, ['phone_key'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('membership', '0012_import_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='update_existing',
+            field=models.BooleanField(default=False, help_text='Rows matching a member by membership number, citizenship number or phone update it', verbose_name='Update Existing Members'),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='updated_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Updated'),
+        ),
+        migrations.AddField(
+            model_name='member',
+            name='phone_key',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, help_text='Phone digits without the country code, kept in sync on save', max_length=17),
+        ),
+        migrations.RunPython(fill_phone_keys, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 5.0 on 2026-10-17 02:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from membership.duplicates import member_blocking_keys
+
+
+def build_blocking_keys(apps, schema_editor):
+    Member = apps.get_model('membership', 'Member')
+    MemberBlockingKey = apps.get_model('membership', 'MemberBlockingKey')
+    keys = []
+    for member in Member.objects.order_by('pk').iterator(chunk_size=2000):
+        keys.extend(
+            MemberBlockingKey(member_id=member.pk, key=key)
+            for key in member_blocking_keys(member)
+        )
+        if len(keys) >= 5000:
+            MemberBlockingKey.objects.bulk_create(keys)
+            keys = []
+    MemberBlockingKey.objects.bulk_create(keys)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('membership', '0013_member_phone_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MemberBlockingKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=120)),
+                ('member', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='blocking_keys', to='membership.member')),
+            ],
+            options={
+                'verbose_name': 'Member Blocking Key',
+                'verbose_name_plural': 'Member Blocking Keys',
+            },
+        ),
+        migrations.CreateModel(
+            name='DuplicateCandidate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.PositiveSmallIntegerField(verbose_name='Score (%)')),
+                ('reasons', models.CharField(blank=True, max_length=255, verbose_name='Reasons')),
+                ('status', models.CharField(choices=[('OPEN', 'Needs Review'), ('DISMISSED', 'Not a Duplicate')], default='OPEN', max_length=20, verbose_name='Status')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('member_a', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='membership.member', verbose_name='Member')),
+                ('member_b', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='membership.member', verbose_name='Possible Duplicate')),
+            ],
+            options={
+                'verbose_name': 'Duplicate Candidate',
+                'verbose_name_plural': 'Duplicate Candidates',
+                'ordering': ['-score', 'member_a'],
+                'indexes': [models.Index(fields=['status', 'score'], name='duplicate_status_score_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='duplicatecandidate',
+            constraint=models.UniqueConstraint(fields=('member_a', 'member_b'), name='unique_duplicate_pair'),
+        ),
+        migrations.AddIndex(
+            model_name='memberblockingkey',
+            index=models.Index(fields=['key', 'member'], name='member_blocking_key_idx'),
+        ),
+        migrations.RunPython(build_blocking_keys, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.0 on 2026-10-17 02:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('membership', '0014_duplicate_detection'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='already_imported_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Already Imported'),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='children_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Children Created'),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='payments_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Payments Created'),
+        ),
+    ]
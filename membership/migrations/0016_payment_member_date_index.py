@@ -0,0 +1,17 @@
+# Generated by Django 5.0 on 2026-10-17 02:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('membership', '0015_import_job_workbook_counts'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['member', '-payment_date'], name='payment_member_date_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.0 on 2026-10-17 02:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('membership', '0016_payment_member_date_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MemberDues',
+            fields=[
+                ('member', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='dues', serialize=False, to='membership.member')),
+                ('payment_frequency', models.CharField(choices=[('ANNUAL', 'Annual'), ('MONTHLY', 'Monthly'), ('ONE-TIME', 'Once for a Lifetime'), ('HONARARY', 'Given on honour for a member')], max_length=20)),
+                ('last_payment_date', models.DateField(blank=True, null=True)),
+                ('due_since', models.DateField(help_text='Start of the earliest unpaid period')),
+                ('periods_owed', models.PositiveIntegerField(help_text='Months or years due, by payment frequency')),
+                ('amount_due', models.DecimalField(blank=True, decimal_places=2, help_text="Empty when no active fee matches the member's frequency", max_digits=12, null=True)),
+                ('computed_on', models.DateField()),
+            ],
+            options={
+                'verbose_name': 'Member Dues',
+                'verbose_name_plural': 'Member Dues',
+                'indexes': [models.Index(fields=['amount_due'], name='dues_amount_idx'), models.Index(fields=['payment_frequency', 'amount_due'], name='dues_frequency_amount_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+from django.db import migrations
+
+from membership.nepali_date import NepaliDate
+
+
+def fill_calendar_days(apps, schema_editor):
+    CalendarDay = apps.get_model('membership', 'CalendarDay')
+    if CalendarDay.objects.exists():
+        return
+    CalendarDay.objects.bulk_create(
+        [
+            CalendarDay(ad_date=ad_date, bs_year=bs_year, bs_month=bs_month, bs_day=bs_day, fiscal_year=fiscal_year)
+            for ad_date, bs_year, bs_month, bs_day, fiscal_year in NepaliDate.calendar_days()
+        ],
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('membership', '0017_member_dues'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_calendar_days, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.0 on 2026-10-17 02:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('membership', '0018_fill_calendar_days'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='member',
+            index=models.Index(fields=['birthday_key', 'is_active'], name='member_birthday_idx'),
+        ),
+        migrations.AlterField(
+            model_name='member',
+            name='birthday_key',
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, help_text='Birth month and day as MMDD, kept in sync with date of birth', null=True),
+        ),
+    ]
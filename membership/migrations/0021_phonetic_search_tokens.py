@@ -0,0 +1,38 @@
+from collections import defaultdict
+
+from django.db import migrations
+
+from membership.search import member_search_tokens
+
+
+def rebuild_search_tokens(apps, schema_editor):
+    Member = apps.get_model('membership', 'Member')
+    Child = apps.get_model('membership', 'Child')
+    MemberSearchToken = apps.get_model('membership', 'MemberSearchToken')
+    MemberSearchToken.objects.all().delete()
+
+    child_names = defaultdict(list)
+    for member_id, name in Child.objects.values_list('member_id', 'name').iterator(chunk_size=2000):
+        child_names[member_id].append(name)
+
+    batch = []
+    for member in Member.objects.order_by('pk').iterator(chunk_size=2000):
+        batch.extend(
+            MemberSearchToken(member_id=member.pk, token=token, weight=weight)
+            for token, weight in member_search_tokens(member, child_names[member.pk]).items()
+        )
+        if len(batch) >= 5000:
+            MemberSearchToken.objects.bulk_create(batch)
+            batch = []
+    MemberSearchToken.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('membership', '0020_cache_table'),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild_search_tokens, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.0 on 2026-10-17 03:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('membership', '0021_phonetic_search_tokens'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='member',
+            name='member_status_expiry_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='memberdues',
+            name='dues_amount_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='memberdues',
+            name='dues_frequency_amount_idx',
+        ),
+        migrations.AddIndex(
+            model_name='member',
+            index=models.Index(fields=['membership_type', 'is_active', 'membership_valid_until'], name='member_type_expiry_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='memberdues',
+            index=models.Index(fields=['amount_due', 'member'], name='dues_amount_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='memberdues',
+            index=models.Index(fields=['payment_frequency', 'amount_due', 'member'], name='dues_frequency_amount_idx'),
+        ),
+    ]
@@ -1,12 +1,54 @@
-from django.db import models
+from django.db import connection, models, transaction
 from django.core.validators import RegexValidator
 from django.utils import timezone
 from decimal import Decimal
 from datetime import timedelta, date
+from calendar import isleap
+from collections import defaultdict
 from dateutil.relativedelta import relativedelta
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
+from django.core.cache import cache
+from django.db.models.functions import Coalesce
+from django.db.models.lookups import Exact
+from .search import (
+    SEARCH_FIELD_WEIGHTS, member_search_tokens, normalize_phone, phonetic_tokens, search_terms
+)
+from .phonetic import phonetic_key
+from .duplicates import (
+    BLOCKING_KEY_MAX_LENGTH, DUPLICATE_THRESHOLD, MAX_BLOCK_SIZE, member_blocking_keys, score_pair
+)
+
+
+def birthday_key(date_of_birth):
+    """Month/day of a birth date as a sortable MMDD integer (e.g. 0628 -> 628)"""
+    if not date_of_birth:
+        return None
+    return date_of_birth.month * 100 + date_of_birth.day
+
+
+def get_upcoming_birthdays(queryset, today, days=7):
+    """
+    Members or children whose birthday falls within the next `days` days.
+    
+    Matches the indexed birthday_key against the keys of the upcoming dates,
+    so the year wrap-around needs no special casing and only matching rows
+    are loaded. Feb 29 birthdays are celebrated on Feb 28 in non-leap years.
+    Each result gets a days_until_birthday attribute and the list is sorted by it.
+    """
+    key_offsets = {}
+    for offset in range(days + 1):
+        day = today + timedelta(days=offset)
+        key_offsets.setdefault(birthday_key(day), offset)
+        if day.month == 2 and day.day == 28 and not isleap(day.year):
+            key_offsets.setdefault(229, offset)
+    
+    matches = list(queryset.filter(birthday_key__in=list(key_offsets)))
+    for obj in matches:
+        obj.days_until_birthday = key_offsets[obj.birthday_key]
+    matches.sort(key=lambda obj: obj.days_until_birthday)
+    return matches
 
 
 class UserProfile(models.Model):
@@ -47,10 +89,47 @@ def save_user_profile(sender, instance, **kwargs):
         instance.profile.save()
 
 
+class CalendarDay(models.Model):
+    """
+    Calendar dimension mapping every AD date to its BS date and fiscal year.
+    Filled from NepaliDate.NEPALI_CALENDAR by migration 0018 (and rebuilt by the
+    populate_calendar command after calendar data changes) so reports can
+    group by Nepali periods with a JOIN in SQL.
+    """
+    ad_date = models.DateField(primary_key=True, verbose_name="AD Date")
+    bs_year = models.PositiveSmallIntegerField(verbose_name="BS Year")
+    bs_month = models.PositiveSmallIntegerField(verbose_name="BS Month")
+    bs_day = models.PositiveSmallIntegerField(verbose_name="BS Day")
+    fiscal_year = models.PositiveSmallIntegerField(
+        verbose_name="Fiscal Year",
+        help_text="BS year in which the fiscal year starts (1 Shrawan)"
+    )
+    
+    class Meta:
+        ordering = ['ad_date']
+        verbose_name = "Calendar Day"
+        verbose_name_plural = "Calendar Days"
+        indexes = [
+            models.Index(fields=['bs_year', 'bs_month'], name='calendar_bs_month_idx'),
+            models.Index(fields=['fiscal_year'], name='calendar_fiscal_year_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.ad_date} ({self.bs_year:04d}-{self.bs_month:02d}-{self.bs_day:02d} BS)"
+
+
 class Member(models.Model):
     """Primary member information"""
     # Primary Information
     name = models.CharField(max_length=200, verbose_name="Full Name")
+    phonetic_key = models.CharField(
+        max_length=200,
+        blank=True,
+        default='',
+        editable=False,
+        db_index=True,
+        help_text="Transliterated phonetic skeleton of the name, kept in sync on save"
+    )
     phone_regex = RegexValidator(
         regex=r'^\+?1?\d{9,15}$',
         message="Phone number must be entered in the format: '+999999999'. Up to 15 digits allowed."
@@ -62,6 +141,14 @@ class Member(models.Model):
         unique=False,
         verbose_name="Phone Number"
     )
+    phone_key = models.CharField(
+        max_length=17,
+        blank=True,
+        default='',
+        editable=False,
+        db_index=True,
+        help_text="Phone digits without the country code, kept in sync on save"
+    )
     email = models.EmailField(
         verbose_name="Email Address",
         blank=True,
@@ -73,6 +160,12 @@ class Member(models.Model):
         blank=True,
         null=True
     )
+    birthday_key = models.PositiveSmallIntegerField(
+        blank=True,
+        null=True,
+        editable=False,
+        help_text="Birth month and day as MMDD, kept in sync with date of birth"
+    )
     photograph = models.ImageField(
         upload_to='member_photos/',
         verbose_name="Photograph",
@@ -178,18 +271,102 @@ class Member(models.Model):
         help_text="Date when membership expires (null for lifetime members)"
     )
     
+    # Payment summary, maintained by Payment writes (see apply_payment_to_member_summary)
+    total_paid = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        editable=False,
+        verbose_name="Total Paid"
+    )
+    payment_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Number of Payments"
+    )
+    last_payment_amount = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        blank=True,
+        null=True,
+        editable=False,
+        verbose_name="Last Payment Amount"
+    )
+    
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    # Calendar joins for grouping by BS periods (no extra columns)
+    join_calendar_day = models.ForeignObject(
+        CalendarDay,
+        on_delete=models.DO_NOTHING,
+        from_fields=['join_date'],
+        to_fields=['ad_date'],
+        null=True,
+        related_name='+',
+    )
+    expiry_calendar_day = models.ForeignObject(
+        CalendarDay,
+        on_delete=models.DO_NOTHING,
+        from_fields=['membership_valid_until'],
+        to_fields=['ad_date'],
+        null=True,
+        related_name='+',
+    )
+    
     class Meta:
         ordering = ['-join_date']
         verbose_name = "Member"
         verbose_name_plural = "Members"
+        indexes = [
+            # Reports, renewal lists and dashboard: active members of a type by expiry.
+            # The type leads because SQLite tests a boolean filter as a bare
+            # column ("WHERE is_active"), which cannot seek an index.
+            models.Index(
+                fields=['membership_type', 'is_active', 'membership_valid_until'],
+                name='member_type_expiry_idx'
+            ),
+            # New members report and the keyset-paginated member list
+            models.Index(fields=['join_date', 'id'], name='member_join_date_idx'),
+            # Dashboard birthdays: seek the upcoming MMDD keys, then the active flag
+            models.Index(fields=['birthday_key', 'is_active'], name='member_birthday_idx'),
+        ]
     
     def __str__(self):
         return f"{self.membership_number} - {self.name}"
     
+    # Only ever written with F() expressions by payment writes, never from an instance
+    PAYMENT_SUMMARY_FIELDS = ('total_paid', 'payment_count', 'last_payment_amount')
+    # Derived from the latest payment by the payment signals, never from an instance
+    PAYMENT_STATUS_FIELDS = ('last_payment_date', 'membership_valid_until')
+    # What a member owes depends on these (and their payments)
+    DUES_FIELDS = ('membership_type', 'payment_frequency', 'join_date', 'is_active')
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored dues terms so saves that leave them alone skip the dues refresh
+        stored = dict(zip(field_names, values))
+        if all(field in stored for field in cls.DUES_FIELDS):
+            instance._stored_dues_terms = tuple(stored[field] for field in cls.DUES_FIELDS)
+        return instance
+    
+    def save(self, *args, **kwargs):
+        """Keep the indexed birthday, phonetic and phone keys in sync and never overwrite payment fields"""
+        self.birthday_key = birthday_key(self.date_of_birth)
+        self.phonetic_key = phonetic_key(self.name)
+        self.phone_key = normalize_phone(self.phone)
+        
+        # A stale in-memory total or status must not clobber concurrent payment updates
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            payment_fields = self.PAYMENT_SUMMARY_FIELDS + self.PAYMENT_STATUS_FIELDS
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in payment_fields
+            ]
+        super().save(*args, **kwargs)
+    
     @property
     def age(self):
         """Calculate age from date of birth"""
@@ -225,10 +402,8 @@ class Member(models.Model):
         return date.today() > self.membership_valid_until
     
     def get_total_paid(self):
-        """Calculate total amount paid by this member"""
-        return self.payments.aggregate(
-            total=models.Sum('amount')
-        )['total'] or Decimal('0.00')
+        """Total amount paid by this member (stored, no query)"""
+        return self.total_paid
     
     def get_membership_status(self):
         """
@@ -327,11 +502,26 @@ class Child(models.Model):
         verbose_name="Parent Member"
     )
     name = models.CharField(max_length=200, verbose_name="Child's Name")
+    phonetic_key = models.CharField(
+        max_length=200,
+        blank=True,
+        default='',
+        editable=False,
+        db_index=True,
+        help_text="Transliterated phonetic skeleton of the name, kept in sync on save"
+    )
     date_of_birth = models.DateField(
         verbose_name="Date of Birth",
         blank=True,
         null=True
     )
+    birthday_key = models.PositiveSmallIntegerField(
+        blank=True,
+        null=True,
+        editable=False,
+        db_index=True,
+        help_text="Birth month and day as MMDD, kept in sync with date of birth"
+    )
     GENDER_CHOICES = [
         ('M', 'Male'),
         ('F', 'Female'),
@@ -353,6 +543,12 @@ class Child(models.Model):
     def __str__(self):
         return f"{self.name} (Child of {self.member.name})"
     
+    def save(self, *args, **kwargs):
+        """Keep the indexed birthday and phonetic keys in sync with the child's details"""
+        self.birthday_key = birthday_key(self.date_of_birth)
+        self.phonetic_key = phonetic_key(self.name)
+        super().save(*args, **kwargs)
+    
     @property
     def age(self):
         """Calculate age from date of birth"""
@@ -370,6 +566,101 @@ class Child(models.Model):
         return age
 
 
+class MemberSearchToken(models.Model):
+    """
+    Search index entry: one normalized token of a member's searchable fields,
+    or a phonetic token ('~' + skeleton) of a word of the member's or a
+    child's name. Rebuilt whenever the member or a child is saved (see
+    index_member_search_tokens); searches match tokens by prefix so the
+    (token, member) index is used.
+    """
+    member = models.ForeignKey(
+        Member,
+        on_delete=models.CASCADE,
+        related_name='search_tokens'
+    )
+    token = models.CharField(max_length=50)
+    weight = models.PositiveSmallIntegerField(default=1)
+    
+    class Meta:
+        verbose_name = "Member Search Token"
+        verbose_name_plural = "Member Search Tokens"
+        indexes = [
+            models.Index(fields=['token', 'member'], name='member_search_token_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.token} ({self.member_id})"
+
+
+class MemberBlockingKey(models.Model):
+    """
+    Duplicate detection block: members sharing a key (phone, citizenship
+    number, name with father's name) are compared with each other.
+    Kept in sync on save; see index_member_blocking_keys.
+    """
+    member = models.ForeignKey(
+        Member,
+        on_delete=models.CASCADE,
+        related_name='blocking_keys'
+    )
+    key = models.CharField(max_length=BLOCKING_KEY_MAX_LENGTH)
+    
+    class Meta:
+        verbose_name = "Member Blocking Key"
+        verbose_name_plural = "Member Blocking Keys"
+        indexes = [
+            models.Index(fields=['key', 'member'], name='member_blocking_key_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.key} ({self.member_id})"
+
+
+class DuplicateCandidate(models.Model):
+    """Two members that may be the same person, waiting for review"""
+    STATUS_CHOICES = [
+        ('OPEN', 'Needs Review'),
+        ('DISMISSED', 'Not a Duplicate'),
+    ]
+    # member_a always has the lower id, so each pair is stored once
+    member_a = models.ForeignKey(
+        Member,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name="Member"
+    )
+    member_b = models.ForeignKey(
+        Member,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name="Possible Duplicate"
+    )
+    score = models.PositiveSmallIntegerField(verbose_name="Score (%)")
+    reasons = models.CharField(max_length=255, blank=True, verbose_name="Reasons")
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default='OPEN',
+        verbose_name="Status"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-score', 'member_a']
+        verbose_name = "Duplicate Candidate"
+        verbose_name_plural = "Duplicate Candidates"
+        constraints = [
+            models.UniqueConstraint(fields=['member_a', 'member_b'], name='unique_duplicate_pair'),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'score'], name='duplicate_status_score_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.member_a_id} / {self.member_b_id} ({self.score}%)"
+
+
 class MembershipFee(models.Model):
     """Membership fee structure"""
     membership_type = models.CharField(
@@ -417,6 +708,135 @@ class MembershipFee(models.Model):
         return f"{self.get_membership_type_display()} - {self.get_payment_frequency_display()}: NPR {self.amount}"
 
 
+class NumberSequence(models.Model):
+    """
+    Named counter for identifiers handed out in order (membership numbers).
+    Advanced under a row lock, so concurrent callers never get the same value.
+    """
+    name = models.CharField(max_length=50, primary_key=True, verbose_name="Name")
+    last_value = models.PositiveIntegerField(default=0, verbose_name="Last Value")
+    
+    class Meta:
+        verbose_name = "Number Sequence"
+        verbose_name_plural = "Number Sequences"
+    
+    def __str__(self):
+        return f"{self.name}: {self.last_value}"
+
+
+MEMBERSHIP_NUMBER_SEQUENCE = 'membership_number'
+MEMBERSHIP_NUMBER_PREFIX = 'NSS-MEM-'
+
+
+def format_membership_number(value):
+    """Membership number for a sequence value, e.g. 12 -> NSS-MEM-00012"""
+    return f"{MEMBERSHIP_NUMBER_PREFIX}{value:05d}"
+
+
+def _last_issued_membership_number():
+    """Highest NSS-MEM- number already in use (seeds the sequence on first use)"""
+    prefix = MEMBERSHIP_NUMBER_PREFIX
+    numbers = Member.objects.filter(membership_number__startswith=prefix).values_list('membership_number', flat=True)
+    return max((int(number[len(prefix):]) for number in numbers if number[len(prefix):].isdigit()), default=0)
+
+
+def reserve_sequence_values(name, count, initial=0):
+    """
+    Advance a named sequence by `count` under a row lock and return the first new value.
+    `initial` (a value or a callable) seeds the sequence the first time it is used.
+    """
+    with transaction.atomic():
+        # Insert the row up front (a no-op if another caller got there first)
+        # and only then lock it: locking a missing row takes a gap lock on
+        # MySQL, and two such callers deadlock on their inserts
+        if not NumberSequence.objects.filter(name=name).exists():
+            NumberSequence.objects.bulk_create(
+                [NumberSequence(name=name, last_value=initial() if callable(initial) else initial)],
+                ignore_conflicts=True,
+            )
+        sequence = NumberSequence.objects.select_for_update().get(name=name)
+        first = sequence.last_value + 1
+        sequence.last_value += count
+        sequence.save(update_fields=['last_value'])
+    return first
+
+
+def reserve_membership_numbers(count=1, exclude=()):
+    """
+    Allocate `count` new membership numbers in one round trip.
+    
+    Used by the member form, the admin and bulk uploads alike. The block is
+    contiguous unless some numbers in it were already typed in by hand (or
+    are listed in `exclude`, e.g. numbers given in an upload file), in which
+    case those are skipped and replaced from further up the sequence.
+    """
+    exclude = set(exclude)
+    numbers = []
+    while len(numbers) < count:
+        needed = count - len(numbers)
+        first = reserve_sequence_values(
+            MEMBERSHIP_NUMBER_SEQUENCE, needed, initial=_last_issued_membership_number
+        )
+        block = [format_membership_number(value) for value in range(first, first + needed)]
+        taken = set(Member.objects.filter(membership_number__in=block).values_list('membership_number', flat=True))
+        numbers.extend(number for number in block if number not in taken and number not in exclude)
+    return numbers
+
+
+class ReceiptCounter(models.Model):
+    """
+    Last receipt number handed out for each day.
+    Incremented under a row lock by reserve_receipt_numbers, so concurrent
+    payments get contiguous numbers without scanning existing receipts.
+    """
+    day = models.DateField(primary_key=True, verbose_name="Day")
+    last_number = models.PositiveIntegerField(default=0, verbose_name="Last Number")
+    
+    class Meta:
+        verbose_name = "Receipt Counter"
+        verbose_name_plural = "Receipt Counters"
+    
+    def __str__(self):
+        return f"{self.day}: {self.last_number}"
+
+
+def receipt_prefix(day):
+    """Receipt number prefix for a day, e.g. NSS-20250115-"""
+    return f"NSS-{day:%Y%m%d}-"
+
+
+def _last_issued_receipt_number(day):
+    """Highest receipt number already used on a day (seeds a new counter row)"""
+    prefix = receipt_prefix(day)
+    numbers = Payment.objects.filter(receipt_number__startswith=prefix).values_list('receipt_number', flat=True)
+    return max((int(number[len(prefix):]) for number in numbers if number[len(prefix):].isdigit()), default=0)
+
+
+def reserve_receipt_numbers(count=1, day=None):
+    """
+    Allocate `count` contiguous receipt numbers for a day (default today).
+    
+    The day's counter row is locked with SELECT ... FOR UPDATE and advanced
+    by `count` in one statement, so concurrent callers queue on the row
+    instead of colliding on the unique receipt number. Called inside the
+    caller's transaction, a rollback returns the numbers as well.
+    """
+    day = day or timezone.localdate()
+    with transaction.atomic():
+        # Created before locking, as in reserve_sequence_values
+        if not ReceiptCounter.objects.filter(day=day).exists():
+            ReceiptCounter.objects.bulk_create(
+                [ReceiptCounter(day=day, last_number=_last_issued_receipt_number(day))],
+                ignore_conflicts=True,
+            )
+        counter = ReceiptCounter.objects.select_for_update().get(day=day)
+        first = counter.last_number + 1
+        counter.last_number += count
+        counter.save(update_fields=['last_number'])
+    prefix = receipt_prefix(day)
+    return [f"{prefix}{number:04d}" for number in range(first, first + count)]
+
+
 class Payment(models.Model):
     """Revenue collection records"""
     member = models.ForeignKey(
@@ -476,58 +896,646 @@ class Payment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    # Calendar join for grouping by BS periods (no extra column)
+    payment_calendar_day = models.ForeignObject(
+        CalendarDay,
+        on_delete=models.DO_NOTHING,
+        from_fields=['payment_date'],
+        to_fields=['ad_date'],
+        null=True,
+        related_name='+',
+    )
+    
     class Meta:
         ordering = ['-payment_date']
         verbose_name = "Payment"
         verbose_name_plural = "Payments"
+        indexes = [
+            # Revenue report and payment list: date range, optionally by mode.
+            # receipt_number prefix lookups use its unique index.
+            models.Index(fields=['payment_date', 'payment_mode'], name='payment_date_mode_idx'),
+            # A member's latest payment, read by the payment status recompute
+            models.Index(fields=['member', '-payment_date'], name='payment_member_date_idx'),
+        ]
     
     def __str__(self):
         return f"{self.receipt_number} - {self.member.name} - NPR {self.amount}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored member and amount so edits can adjust member totals
+        stored = dict(zip(field_names, values))
+        instance._stored_summary = (stored.get('member_id'), stored.get('amount'))
+        return instance
+    
+    @transaction.atomic
     def save(self, *args, **kwargs):
-        """Auto-generate receipt number and update member status"""
+        """Auto-generate receipt number; member totals and status follow via signals"""
         # Generate receipt number if not provided
         if not self.receipt_number:
-            from datetime import datetime
-            date_str = datetime.now().strftime('%Y%m%d')
-            last_payment = Payment.objects.filter(
-                receipt_number__startswith=f'NSS-{date_str}'
-            ).order_by('receipt_number').last()
-            
-            if last_payment:
-                last_number = int(last_payment.receipt_number.split('-')[-1])
-                new_number = last_number + 1
-            else:
-                new_number = 1
-            
-            self.receipt_number = f'NSS-{date_str}-{new_number:04d}'
+            self.receipt_number = reserve_receipt_numbers(1)[0]
         
-        # Save the payment first
         super().save(*args, **kwargs)
-        
-        # Update member's payment status
-        self.update_member_status()
+
+
+class MemberDues(models.Model):
+    """
+    What a regular member owes, kept by membership.arrears for the arrears
+    report. Only members with at least one period due have a row.
+    """
+    member = models.OneToOneField(
+        Member,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='dues',
+    )
+    payment_frequency = models.CharField(max_length=20, choices=MembershipFee.PAYMENT_FREQUENCY_CHOICES)
+    last_payment_date = models.DateField(null=True, blank=True)
+    due_since = models.DateField(help_text="Start of the earliest unpaid period")
+    periods_owed = models.PositiveIntegerField(help_text="Months or years due, by payment frequency")
+    amount_due = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        help_text="Empty when no active fee matches the member's frequency",
+    )
+    computed_on = models.DateField()
     
-    def update_member_status(self):
-        """Update member's last payment date and membership validity"""
-        member = self.member
-        
-        # Update last payment date
-        member.last_payment_date = self.payment_date
-        
-        # Calculate membership validity
-        if member.membership_type == 'LIFETIME' or 'HONARARY':
-            # Lifetime members never expire
-            member.membership_valid_until = None
+    class Meta:
+        verbose_name = "Member Dues"
+        verbose_name_plural = "Member Dues"
+        indexes = [
+            # Arrears report: largest amount first, optionally for one frequency
+            models.Index(fields=['amount_due', 'member'], name='dues_amount_idx'),
+            models.Index(fields=['payment_frequency', 'amount_due', 'member'], name='dues_frequency_amount_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.member_id}: {self.periods_owed} period(s), NPR {self.amount_due}"
+
+
+DASHBOARD_STATS_CACHE_KEY = 'membership:dashboard_stats'
+
+# Backstop for writes that skip signals (raw SQL, queryset.update)
+DASHBOARD_STATS_TIMEOUT = 300
+
+# Day the member dues table was last fully rebuilt; dropped to force a rebuild
+MEMBER_DUES_CACHE_KEY = 'membership:member_dues_date'
+
+
+def get_dashboard_stats():
+    """
+    Member counts by type and total revenue for the dashboard.
+    One aggregate over members gives the active count of every type and the
+    sum of their stored payment totals, which is the revenue without reading
+    payments. Cached until a Member or Payment write commits (or for
+    DASHBOARD_STATS_TIMEOUT seconds at most).
+    """
+    stats = cache.get(DASHBOARD_STATS_CACHE_KEY)
+    if stats is not None:
+        return stats
+    
+    types = [membership_type for membership_type, _ in Member.MEMBERSHIP_CHOICES]
+    counts = Member.objects.aggregate(
+        **{
+            f'{membership_type.lower()}_members': models.Count(
+                'id', filter=models.Q(is_active=True, membership_type=membership_type)
+            )
+            for membership_type in types
+        },
+        total_revenue=models.Sum('total_paid'),
+    )
+    total_revenue = counts.pop('total_revenue') or 0
+    counts['total_members'] = sum(counts.values())
+    
+    total_members = counts['total_members']
+    stats = {
+        **counts,
+        'active_members': total_members,
+        'total_revenue': total_revenue,
+    }
+    for membership_type in ('regular', 'lifetime', 'honarary'):
+        count = counts[f'{membership_type}_members']
+        stats[f'{membership_type}_percentage'] = (
+            round(count / total_members * 100, 1) if total_members > 0 else 0
+        )
+    
+    cache.set(DASHBOARD_STATS_CACHE_KEY, stats, DASHBOARD_STATS_TIMEOUT)
+    return stats
+
+
+@receiver(post_save, sender=Member)
+@receiver(post_delete, sender=Member)
+@receiver(post_save, sender=Payment)
+@receiver(post_delete, sender=Payment)
+def invalidate_dashboard_stats(sender, **kwargs):
+    """
+    Drop cached dashboard statistics once a member or payment write commits,
+    so no worker can re-cache figures read before the write was visible
+    """
+    transaction.on_commit(lambda: cache.delete(DASHBOARD_STATS_CACHE_KEY))
+
+
+@receiver(post_save, sender=MembershipFee)
+@receiver(post_delete, sender=MembershipFee)
+def invalidate_member_dues(sender, **kwargs):
+    """A fee change reprices everyone's dues; mark the table for the next refresh_member_dues run"""
+    transaction.on_commit(lambda: cache.delete(MEMBER_DUES_CACHE_KEY))
+
+
+def _latest_payment_amount():
+    return models.Subquery(
+        Payment.objects.filter(member=models.OuterRef('pk'))
+        .order_by('-payment_date', '-id')
+        .values('amount')[:1]
+    )
+
+
+class AddMonths(models.Func):
+    """
+    date + N months in SQL, landing on the last day of a shorter month
+    the way relativedelta does (Jan 31 + 1 month is Feb 28 or 29)
+    """
+    output_field = models.DateField()
+
+    def __init__(self, expression, months, **extra):
+        self.months = int(months)
+        super().__init__(expression, **extra)
+
+    def as_sql(self, compiler, connection, **extra_context):
+        # Standard SQL interval arithmetic for other backends; whether a
+        # month end is clamped or rejected is then up to the database
+        sql, params = compiler.compile(self.source_expressions[0])
+        return f"CAST(({sql}) + INTERVAL '{self.months}' MONTH AS DATE)", params
+
+    def as_mysql(self, compiler, connection, **extra_context):
+        sql, params = compiler.compile(self.source_expressions[0])
+        return f'DATE_ADD({sql}, INTERVAL {self.months} MONTH)', params
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        sql, params = compiler.compile(self.source_expressions[0])
+        return f'(({sql}) + make_interval(months => {self.months}))::date', params
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        # SQLite rolls Jan 31 + 1 month over to March, so cap at the month's end
+        sql, params = compiler.compile(self.source_expressions[0])
+        return (
+            f"MIN(DATE({sql}, '+{self.months} months'), "
+            f"DATE({sql}, 'start of month', '+{self.months + 1} months', '-1 day'))",
+            (*params, *params),
+        )
+
+
+def _payment_status_fields():
+    """
+    last_payment_date and membership_valid_until as expressions over the
+    Payment table. Lifetime and honorary members never expire; the rest are
+    valid for a month or a year after their latest payment, by that payment's
+    fee frequency. Members without payments get neither date.
+    """
+    latest = Payment.objects.filter(member=models.OuterRef('pk')).order_by('-payment_date', '-id')
+    last_payment_date = models.Subquery(latest.values('payment_date')[:1])
+    frequency = models.Subquery(latest.values('membership_fee__payment_frequency')[:1])
+    return {
+        'last_payment_date': last_payment_date,
+        'membership_valid_until': models.Case(
+            models.When(membership_type__in=['LIFETIME', 'HONARARY'], then=None),
+            models.When(Exact(frequency, 'MONTHLY'), then=AddMonths(last_payment_date, 1)),
+            default=AddMonths(last_payment_date, 12),
+            output_field=models.DateField(),
+        ),
+    }
+
+
+def recompute_payment_status(members=None):
+    """
+    Rebuild last_payment_date and membership_valid_until from the Payment table
+    with one set-based UPDATE. Returns the number of members updated.
+    """
+    if members is None:
+        members = Member.objects.all()
+    return members.update(**_payment_status_fields())
+
+
+def _adjust_member_summary(member_id, amount_delta, count_delta):
+    """Apply a payment write to one member's stored totals and status in a single UPDATE"""
+    Member.objects.filter(pk=member_id).update(
+        total_paid=models.F('total_paid') + amount_delta,
+        payment_count=models.F('payment_count') + count_delta,
+        last_payment_amount=_latest_payment_amount(),
+        **_payment_status_fields(),
+    )
+
+
+def reconcile_payment_summaries(members=None):
+    """
+    Rebuild stored payment totals from the Payment table with one set-based UPDATE
+    Returns the number of members updated.
+    """
+    if members is None:
+        members = Member.objects.all()
+    payments = Payment.objects.filter(member=models.OuterRef('pk')).order_by().values('member')
+    return members.update(
+        total_paid=Coalesce(
+            models.Subquery(payments.annotate(total=models.Sum('amount')).values('total')),
+            Decimal('0.00'),
+            output_field=models.DecimalField(max_digits=12, decimal_places=2),
+        ),
+        payment_count=Coalesce(
+            models.Subquery(payments.annotate(count=models.Count('id')).values('count')),
+            0,
+        ),
+        last_payment_amount=_latest_payment_amount(),
+    )
+
+
+@receiver(post_save, sender=Payment)
+def apply_payment_to_member_summary(sender, instance, created, raw=False, **kwargs):
+    """Keep the member's payment totals, last payment date and validity in step"""
+    if raw:
+        return
+    
+    amount = Decimal(str(instance.amount))
+    stored = None if created else getattr(instance, '_stored_summary', None)
+    member_ids = {instance.member_id}
+    if created:
+        _adjust_member_summary(instance.member_id, amount, 1)
+    elif stored is None:
+        # Unknown previous state: rebuild this member from the payments table
+        member = Member.objects.filter(pk=instance.member_id)
+        reconcile_payment_summaries(member)
+        recompute_payment_status(member)
+    else:
+        old_member_id, old_amount = stored
+        if old_member_id == instance.member_id:
+            _adjust_member_summary(instance.member_id, amount - old_amount, 0)
         else:
-            # Regular members - calculate expiry based on payment frequency
-            frequency = self.membership_fee.payment_frequency  # ANNUAL or MONTHLY
-            
-            if frequency == 'MONTHLY':
-                # Add 1 month
-                member.membership_valid_until = self.payment_date + relativedelta(months=1)
-            else:  # ANNUAL
-                # Add 1 year
-                member.membership_valid_until = self.payment_date + relativedelta(years=1)
-        
-        member.save()
\ No newline at end of file
+            _adjust_member_summary(old_member_id, -old_amount, -1)
+            _adjust_member_summary(instance.member_id, amount, 1)
+            member_ids.add(old_member_id)
+    
+    instance._stored_summary = (instance.member_id, amount)
+    _refresh_member_dues(member_ids)
+
+
+@receiver(post_delete, sender=Payment)
+def remove_payment_from_member_summary(sender, instance, **kwargs):
+    """Take a deleted payment out of its member's stored totals and status"""
+    member_id, amount = getattr(instance, '_stored_summary', (instance.member_id, instance.amount))
+    _adjust_member_summary(member_id, -Decimal(str(amount)), -1)
+    origin = kwargs.get('origin')
+    if getattr(origin, 'model', type(origin)) is not Member:
+        # Not part of deleting the member itself, which takes its dues row along
+        _refresh_member_dues([member_id])
+
+
+def _refresh_member_dues(member_ids):
+    from .arrears import refresh_member_dues
+    refresh_member_dues(member_ids)
+
+
+def index_member_search_tokens(members):
+    """Rebuild the search tokens of the given members, children's names included"""
+    members = list(members)
+    if not members:
+        return
+    MemberSearchToken.objects.filter(member__in=members).delete()
+    child_names = defaultdict(list)
+    for member_id, name in Child.objects.filter(member__in=members).values_list('member_id', 'name'):
+        child_names[member_id].append(name)
+    
+    # Plain executemany: imports index tens of thousands of tokens and
+    # building a model instance per token dominated the import time
+    meta = MemberSearchToken._meta
+    quote = connection.ops.quote_name
+    sql = 'INSERT INTO {} ({}, {}, {}) VALUES (%s, %s, %s)'.format(
+        quote(meta.db_table),
+        *(quote(meta.get_field(name).column) for name in ('member', 'token', 'weight'))
+    )
+    rows = [
+        (member.pk, token, weight)
+        for member in members
+        for token, weight in member_search_tokens(member, child_names[member.pk]).items()
+    ]
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), 1000):
+            cursor.executemany(sql, rows[start:start + 1000])
+
+
+# Member fields used by duplicate detection
+DUPLICATE_FIELDS = ('name', 'father_name', 'phone', 'citizenship_number', 'date_of_birth', 'email')
+
+
+def index_member_blocking_keys(members):
+    """Rebuild the duplicate detection blocking keys of the given members"""
+    members = list(members)
+    if not members:
+        return
+    MemberBlockingKey.objects.filter(member__in=members).delete()
+    MemberBlockingKey.objects.bulk_create(
+        [
+            MemberBlockingKey(member_id=member.pk, key=key)
+            for member in members
+            for key in member_blocking_keys(member)
+        ],
+        batch_size=1000,
+    )
+
+
+def store_duplicate_candidates(pairs):
+    """
+    Score (lower id, higher id) member pairs and store those likely to be the
+    same person. Pairs already stored (including dismissed ones) are kept.
+    """
+    pairs = list(pairs)
+    if not pairs:
+        return 0
+    ids = {pk for pair in pairs for pk in pair}
+    members = Member.objects.only('pk', *DUPLICATE_FIELDS).in_bulk(ids)
+    found = []
+    for a, b in pairs:
+        if a not in members or b not in members:
+            continue
+        score, reasons = score_pair(members[a], members[b])
+        if score >= DUPLICATE_THRESHOLD:
+            found.append(DuplicateCandidate(
+                member_a_id=a, member_b_id=b,
+                score=round(score * 100), reasons=', '.join(reasons)[:255],
+            ))
+    DuplicateCandidate.objects.bulk_create(found, batch_size=1000, ignore_conflicts=True)
+    return len(found)
+
+
+def find_duplicates_of(member_ids, batch_size=1000):
+    """
+    Re-check the given members against everyone sharing one of their
+    blocking keys. Their open candidates are replaced; dismissed ones stay.
+    """
+    member_ids = set(member_ids)
+    keys = set()
+    ids = list(member_ids)
+    for start in range(0, len(ids), batch_size):
+        chunk = ids[start:start + batch_size]
+        DuplicateCandidate.objects.filter(
+            models.Q(member_a__in=chunk) | models.Q(member_b__in=chunk), status='OPEN'
+        ).delete()
+        keys.update(MemberBlockingKey.objects.filter(member__in=chunk).values_list('key', flat=True))
+
+    blocks = defaultdict(set)
+    keys = list(keys)
+    for start in range(0, len(keys), batch_size):
+        rows = MemberBlockingKey.objects.filter(key__in=keys[start:start + batch_size])
+        for key, member_id in rows.values_list('key', 'member_id'):
+            blocks[key].add(member_id)
+
+    pairs = set()
+    for block in blocks.values():
+        if len(block) < 2 or len(block) > MAX_BLOCK_SIZE:
+            continue
+        for a in block & member_ids:
+            pairs.update((min(a, b), max(a, b)) for b in block if b != a)
+    return store_duplicate_candidates(pairs)
+
+
+def prefix_filter(field, prefix):
+    """
+    Q for values of field starting with prefix, in the form the database can
+    seek an index with. Search keys are stored lowercase, so case does not
+    matter: MySQL compares LIKE 'x%' in the column's case-insensitive
+    collation and uses the index (startswith would be LIKE BINARY, which
+    cannot). SQLite's LIKE never uses a default index, but its BINARY
+    collation orders by code point, so there the prefix becomes a range up
+    to the prefix with its last character bumped.
+    """
+    if connection.vendor == 'sqlite':
+        upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        return models.Q(**{f'{field}__gte': prefix, f'{field}__lt': upper})
+    return models.Q(**{f'{field}__istartswith': prefix})
+
+
+def _search_rows(query, members=None):
+    """Matching member_ids with their score, or None for an empty query"""
+    terms = search_terms(query)
+    if not terms:
+        return None
+    
+    matches = models.Q()
+    aggregates = {}
+    for i, term in enumerate(terms):
+        term_match = prefix_filter('token', term)
+        for token in phonetic_tokens(term)[:1]:
+            term_match |= prefix_filter('token', token)
+        matches |= term_match
+        aggregates[f'term_{i}'] = models.Max(models.Case(
+            models.When(token=term, then=models.F('weight') * 2),
+            models.When(term_match, then=models.F('weight')),
+            default=0,
+            output_field=models.IntegerField(),
+        ))
+    
+    rows = MemberSearchToken.objects.filter(matches)
+    if members is not None:
+        # Correlated on the primary key, so any member filter is a key lookup
+        rows = rows.filter(models.Exists(members.order_by().filter(pk=models.OuterRef('member_id'))))
+    rows = rows.values('member_id').annotate(**aggregates)
+    for name in aggregates:
+        rows = rows.filter(**{f'{name}__gt': 0})
+    return rows
+
+
+def search_members(query, members=None, offset=0, limit=100):
+    """
+    Ids of members matching every term of the query, best match first,
+    optionally only among the given members queryset.
+    
+    Each term is matched as a token prefix, and as a prefix of the phonetic
+    tokens of the member's and children's names, so other spellings and
+    scripts are found too. A member scores the weight of its best token for
+    every term, doubled for an exact token match, so a hit on the name
+    outranks one on the father's name and "ram" ranks Ram above Ramesh.
+    """
+    rows = _search_rows(query, members)
+    if rows is None:
+        return []
+    rows = rows.annotate(
+        score=sum((models.F(name) for name in rows.query.annotations if name.startswith('term_')), models.Value(0))
+    ).order_by('-score', '-member_id')[offset:offset + limit]
+    return [row['member_id'] for row in rows]
+
+
+def count_search_members(query, members=None):
+    """Number of members search_members would return without a limit"""
+    rows = _search_rows(query, members)
+    return 0 if rows is None else rows.count()
+
+
+def phonetic_key_filter(query, field='phonetic_key'):
+    """
+    Q matching names that start with words sounding like the query.
+    None when the query has no letters to compare.
+    """
+    key = phonetic_key(query)
+    if not key:
+        return None
+    return prefix_filter(field, key)
+
+
+@receiver(post_save, sender=Member)
+def update_member_search_tokens(sender, instance, raw=False, **kwargs):
+    """Keep the member search index in sync with the member's fields"""
+    if raw:
+        return
+    update_fields = kwargs.get('update_fields')
+    if update_fields is not None and not set(update_fields) & set(SEARCH_FIELD_WEIGHTS):
+        return
+    index_member_search_tokens([instance])
+
+
+@receiver(post_save, sender=Child)
+@receiver(post_delete, sender=Child)
+def update_member_child_tokens(sender, instance, raw=False, **kwargs):
+    """Children's names are searchable through their parent's tokens"""
+    if raw:
+        return
+    origin = kwargs.get('origin')
+    if getattr(origin, 'model', type(origin)) is Member:
+        return  # The member is being deleted along with its tokens
+    index_member_search_tokens(Member.objects.filter(pk=instance.member_id))
+
+
+@receiver(post_save, sender=Member)
+def update_member_duplicates(sender, instance, raw=False, **kwargs):
+    """Re-check a new or edited member for duplicates"""
+    if raw:
+        return
+    update_fields = kwargs.get('update_fields')
+    if update_fields is not None and not set(update_fields) & set(DUPLICATE_FIELDS):
+        return
+    index_member_blocking_keys([instance])
+    find_duplicates_of([instance.pk])
+
+
+@receiver(post_save, sender=Member)
+def update_member_dues(sender, instance, created, raw=False, **kwargs):
+    """Type, frequency, join date or active status can all change what a member owes"""
+    if raw:
+        return
+    update_fields = kwargs.get('update_fields')
+    if update_fields is not None and not set(update_fields) & set(Member.DUES_FIELDS):
+        return
+    terms = tuple(getattr(instance, field) for field in Member.DUES_FIELDS)
+    if created or getattr(instance, '_stored_dues_terms', None) != terms:
+        _refresh_member_dues([instance.pk])
+    instance._stored_dues_terms = terms
+
+
+class ImportJob(models.Model):
+    """
+    A bulk member upload waiting for or being processed by the import worker
+    (manage.py run_import_jobs). Counters are updated after every chunk so
+    the upload page can show real progress.
+    """
+    STATUS_CHOICES = [
+        ('PENDING', 'Waiting'),
+        ('RUNNING', 'Importing'),
+        ('COMPLETED', 'Completed'),
+        ('FAILED', 'Failed'),
+    ]
+    file = models.FileField(upload_to='imports/', blank=True, verbose_name="File")
+    file_name = models.CharField(max_length=255, verbose_name="File Name")
+    file_type = models.CharField(max_length=10, verbose_name="File Type")
+    update_existing = models.BooleanField(
+        default=False,
+        verbose_name="Update Existing Members",
+        help_text="Rows matching a member by membership number, citizenship number or phone update it"
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default='PENDING',
+        db_index=True,
+        verbose_name="Status"
+    )
+    created_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='import_jobs',
+        verbose_name="Uploaded By"
+    )
+    
+    total_rows = models.PositiveIntegerField(null=True, blank=True, verbose_name="Total Rows")
+    processed_rows = models.PositiveIntegerField(default=0, verbose_name="Processed Rows")
+    success_count = models.PositiveIntegerField(default=0, verbose_name="Created")
+    updated_count = models.PositiveIntegerField(default=0, verbose_name="Updated")
+    children_count = models.PositiveIntegerField(default=0, verbose_name="Children Created")
+    payments_count = models.PositiveIntegerField(default=0, verbose_name="Payments Created")
+    already_imported_count = models.PositiveIntegerField(default=0, verbose_name="Already Imported")
+    skipped_count = models.PositiveIntegerField(default=0, verbose_name="Skipped")
+    error_count = models.PositiveIntegerField(default=0, verbose_name="Errors")
+    auto_generated_count = models.PositiveIntegerField(default=0, verbose_name="Auto-generated")
+    # First entries of the import report, as collected by MemberImport
+    errors = models.JSONField(default=list, blank=True, verbose_name="Error Details")
+    auto_generated = models.JSONField(default=list, blank=True, verbose_name="Auto-generated Details")
+    message = models.TextField(blank=True, verbose_name="Message")
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name="Started At")
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="Finished At")
+    
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = "Import Job"
+        verbose_name_plural = "Import Jobs"
+    
+    def __str__(self):
+        return f"{self.file_name} ({self.get_status_display()})"
+    
+    @property
+    def is_finished(self):
+        return self.status in ('COMPLETED', 'FAILED')
+    
+    @property
+    def percent_complete(self):
+        if self.status == 'COMPLETED':
+            return 100
+        if not self.total_rows:
+            return 0
+        return min(99, int(self.processed_rows * 100 / self.total_rows))
+    
+    @property
+    def eta_seconds(self):
+        """Seconds left at the rate seen so far; None until it can be estimated"""
+        if self.status != 'RUNNING' or not self.started_at or not self.total_rows or not self.processed_rows:
+            return None
+        elapsed = (timezone.now() - self.started_at).total_seconds()
+        remaining = max(self.total_rows - self.processed_rows, 0)
+        return int(elapsed / self.processed_rows * remaining)
+    
+    def progress(self):
+        """State polled by the bulk upload page"""
+        return {
+            'id': self.pk,
+            'file_name': self.file_name,
+            'status': self.status,
+            'status_display': self.get_status_display(),
+            'finished': self.is_finished,
+            'total_rows': self.total_rows,
+            'processed_rows': self.processed_rows,
+            'percent': self.percent_complete,
+            'eta_seconds': self.eta_seconds,
+            'success_count': self.success_count,
+            'updated_count': self.updated_count,
+            'children_count': self.children_count,
+            'payments_count': self.payments_count,
+            'already_imported_count': self.already_imported_count,
+            'skipped_count': self.skipped_count,
+            'error_count': self.error_count,
+            'auto_generated_count': self.auto_generated_count,
+            'errors': self.errors[:10],
+            'auto_generated': self.auto_generated[:10],
+            'message': self.message,
+        }
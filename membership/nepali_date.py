@@ -2,7 +2,33 @@
 Nepali Date Converter
 Converts English dates to Nepali (BS - Bikram Sambat) dates
 """
-from datetime import date
+import re
+from bisect import bisect_right
+from datetime import date, timedelta
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+
+def _build_month_index(calendar):
+    """
+    Build the cumulative day-offset index for a BS calendar table
+
+    Returns two parallel lists: the day offset (from 2000-01-01 BS) at which
+    every BS month starts, followed by the offset one past the last covered
+    day, and the (year, month) key of each of those months.
+    """
+    offsets = []
+    keys = []
+    total = 0
+    for year in sorted(calendar):
+        for month, days_in_month in enumerate(calendar[year], start=1):
+            offsets.append(total)
+            keys.append((year, month))
+            total += days_in_month
+    offsets.append(total)
+    return offsets, keys
 
 
 class NepaliDate:
@@ -112,11 +138,84 @@ class NepaliDate:
     REFERENCE_DATE_AD = date(1943, 4, 14)
     REFERENCE_DATE_BS = (2000, 1, 1)
     
+    # Start offset of every BS month in NEPALI_CALENDAR, built once at import
+    MONTH_START_OFFSETS, MONTH_KEYS = _build_month_index(NEPALI_CALENDAR)
+    
+    # NumPy views of the same index for the batch converters
+    _START_ARRAY = np.array(MONTH_START_OFFSETS, dtype=np.int64)
+    _REFERENCE_DAY = np.datetime64(REFERENCE_DATE_AD, 'D')
+    
+    # Accepted BS date text: 2081-03-15, 2081/3/15, 2081.03.15 (after digit folding).
+    # A midnight time suffix is allowed for spreadsheet cells typed as dates.
+    BS_DATE_PATTERN = r'^\s*(\d{4})\s*[-/.]\s*(\d{1,2})\s*[-/.]\s*(\d{1,2})(?:[ T]00:00(?::00)?)?\s*$'
+    DEVANAGARI_DIGITS = str.maketrans('०१२३४५६७८९', '0123456789')
+    
+    # Nepali fiscal year starts on 1 Shrawan
+    FISCAL_YEAR_START_MONTH = 4
+    
+    # Maximum number of (date, format) entries kept by each formatting cache
+    FORMAT_CACHE_SIZE = 8192
+    
     @classmethod
     def ad_to_bs(cls, ad_date):
         """
         Convert AD date to BS date
         Returns tuple: (year, month, day) or None if out of range
+        
+        Looks the date up in the precomputed month index with a binary
+        search, so every conversion costs O(log n) instead of a month walk.
+        """
+        if not ad_date:
+            return None
+        
+        offset = (ad_date - cls.REFERENCE_DATE_AD).days
+        if offset < 0 or offset >= cls.MONTH_START_OFFSETS[-1]:
+            return None  # Out of range
+        
+        index = bisect_right(cls.MONTH_START_OFFSETS, offset) - 1
+        bs_year, bs_month = cls.MONTH_KEYS[index]
+        return (bs_year, bs_month, offset - cls.MONTH_START_OFFSETS[index] + 1)
+    
+    @classmethod
+    def bs_to_ad(cls, bs_year, bs_month, bs_day):
+        """
+        Convert BS date to AD date
+        Returns date object or None if the BS date is invalid or out of range
+        """
+        try:
+            bs_year, bs_month, bs_day = int(bs_year), int(bs_month), int(bs_day)
+        except (TypeError, ValueError):
+            return None
+        
+        if bs_year not in cls.NEPALI_CALENDAR or not 1 <= bs_month <= 12:
+            return None
+        if not 1 <= bs_day <= cls.NEPALI_CALENDAR[bs_year][bs_month - 1]:
+            return None
+        
+        index = (bs_year - cls.MONTH_KEYS[0][0]) * 12 + bs_month - 1
+        return cls.REFERENCE_DATE_AD + timedelta(days=cls.MONTH_START_OFFSETS[index] + bs_day - 1)
+    
+    @classmethod
+    def parse_bs_date(cls, value):
+        """
+        Parse a BS date string and convert it to AD
+        
+        Accepts 2081-03-15, 2081/3/15 or 2081.03.15, in Latin or
+        Devanagari digits. Returns date object or None if it cannot be parsed.
+        """
+        if not value:
+            return None
+        
+        match = re.match(cls.BS_DATE_PATTERN, str(value).translate(cls.DEVANAGARI_DIGITS))
+        if not match:
+            return None
+        return cls.bs_to_ad(*match.groups())
+    
+    @classmethod
+    def _ad_to_bs_walk(cls, ad_date):
+        """
+        Reference AD to BS conversion walking month by month from the
+        reference date. Kept for the benchmark and equivalence tests only.
         """
         if not ad_date:
             return None
@@ -179,7 +278,15 @@ class NepaliDate:
         
         Returns:
             Formatted string or empty string if conversion fails
+        
+        Results are memoized per (date, format_type) in a bounded LRU cache.
         """
+        if not ad_date:
+            return ""
+        return _format_cache(ad_date, format_type)
+    
+    @classmethod
+    def _format_nepali_date(cls, ad_date, format_type):
         bs_date = cls.ad_to_bs(ad_date)
         if not bs_date:
             return ""
@@ -194,6 +301,157 @@ class NepaliDate:
             return f"{day} {cls.MONTH_NAMES[month - 1]}, {year}"
         else:
             return f"{year:04d}-{month:02d}-{day:02d}"
+    
+    @classmethod
+    def format_dual_date(cls, ad_date, date_format='short'):
+        """
+        Format a date as AD followed by BS, e.g. 2024-06-28 (2081-03-14 BS)
+        
+        'short' uses ISO dates, anything else 'Jun 28, 2024 (14 Ashadh 2081 BS)'.
+        Memoized like format_nepali_date.
+        """
+        if not ad_date:
+            return ""
+        return _dual_date_cache(ad_date, date_format)
+    
+    @classmethod
+    def _format_dual_date(cls, ad_date, date_format):
+        if date_format == 'short':
+            ad_str = ad_date.strftime('%Y-%m-%d')
+            bs_str = cls.format_nepali_date(ad_date, 'short')
+        else:  # medium/long
+            ad_str = ad_date.strftime('%b %d, %Y')
+            bs_str = cls.format_nepali_date(ad_date, 'medium')
+        
+        if bs_str:
+            return f"{ad_str} ({bs_str} BS)"
+        return ad_str
+    
+    @classmethod
+    def cache_stats(cls):
+        """Hit/miss counters of the formatting caches, for monitoring"""
+        return {
+            name: {
+                'hits': info.hits,
+                'misses': info.misses,
+                'size': info.currsize,
+                'maxsize': info.maxsize,
+            }
+            for name, info in (
+                ('format_nepali_date', _format_cache.cache_info()),
+                ('format_dual_date', _dual_date_cache.cache_info()),
+            )
+        }
+    
+    @classmethod
+    def clear_cache(cls):
+        """Empty the formatting caches and reset their counters"""
+        _format_cache.cache_clear()
+        _dual_date_cache.cache_clear()
+    
+    @classmethod
+    def fiscal_year_for(cls, bs_year, bs_month):
+        """Return the BS year in which the fiscal year containing this month starts"""
+        return bs_year if bs_month >= cls.FISCAL_YEAR_START_MONTH else bs_year - 1
+    
+    @staticmethod
+    def fiscal_year_label(fiscal_year):
+        """Format a fiscal year as 2081/82"""
+        return f"{fiscal_year}/{(fiscal_year + 1) % 100:02d}"
+    
+    @classmethod
+    def calendar_days(cls):
+        """(ad_date, bs_year, bs_month, bs_day, fiscal_year) for every day of the calendar"""
+        ad_date = cls.REFERENCE_DATE_AD
+        for bs_year, bs_month in cls.MONTH_KEYS:
+            fiscal_year = cls.fiscal_year_for(bs_year, bs_month)
+            for bs_day in range(1, cls.NEPALI_CALENDAR[bs_year][bs_month - 1] + 1):
+                yield ad_date, bs_year, bs_month, bs_day, fiscal_year
+                ad_date += timedelta(days=1)
+    
+    @classmethod
+    def warm_cache(cls, today=None):
+        """
+        Pre-format every day of the current fiscal year in all formats
+        Returns the number of days warmed (0 if today is outside the calendar)
+        """
+        bs_today = cls.ad_to_bs(today or date.today())
+        if not bs_today:
+            return 0
+        
+        fiscal_year = cls.fiscal_year_for(bs_today[0], bs_today[1])
+        start = cls.bs_to_ad(fiscal_year, cls.FISCAL_YEAR_START_MONTH, 1)
+        end = cls.bs_to_ad(fiscal_year + 1, cls.FISCAL_YEAR_START_MONTH, 1)
+        if not start:
+            return 0
+        if not end:
+            end = cls.REFERENCE_DATE_AD + timedelta(days=cls.MONTH_START_OFFSETS[-1])
+        
+        day = start
+        while day < end:
+            for format_type in ('short', 'medium', 'long'):
+                cls.format_nepali_date(day, format_type)
+            cls.format_dual_date(day, 'short')
+            cls.format_dual_date(day, 'medium')
+            day += timedelta(days=1)
+        return (end - start).days
+    
+    @classmethod
+    def bs_to_ad_array(cls, years, months, days):
+        """
+        Convert whole columns of BS year/month/day values to AD dates
+        
+        Args:
+            years, months, days: equal-length lists, arrays or Series.
+                None, NaN and non-numeric values are treated as missing.
+        
+        Returns:
+            NumPy datetime64[D] array, NaT where the input is missing or
+            is not a valid BS date.
+        """
+        def as_float(values):
+            return pd.to_numeric(
+                pd.Series(values, dtype=object), errors='coerce'
+            ).to_numpy(dtype='float64')
+        
+        years, months, days = as_float(years), as_float(months), as_float(days)
+        first_year = cls.MONTH_KEYS[0][0]
+        month_count = len(cls.MONTH_KEYS)
+        
+        with np.errstate(invalid='ignore'):
+            index = (years - first_year) * 12 + (months - 1)
+            valid = (
+                np.isfinite(index) & np.isfinite(days)
+                & (index >= 0) & (index < month_count)
+                & (months >= 1) & (months <= 12)
+                & (years == np.floor(years)) & (months == np.floor(months))
+                & (days == np.floor(days)) & (days >= 1)
+            )
+        index = np.where(valid, index, 0).astype(np.int64)
+        days = np.where(valid, days, 1).astype(np.int64)
+        month_lengths = cls._START_ARRAY[index + 1] - cls._START_ARRAY[index]
+        valid &= days <= month_lengths
+        
+        result = cls._REFERENCE_DAY + (cls._START_ARRAY[index] + days - 1).astype('timedelta64[D]')
+        result[~valid] = np.datetime64('NaT')
+        return result
+    
+    @classmethod
+    def parse_bs_array(cls, values):
+        """
+        Parse a whole column of BS date strings to AD dates
+        
+        Same formats as parse_bs_date, applied with pandas string methods
+        instead of per-cell parsing. Returns a NumPy datetime64[D] array,
+        NaT where a value is missing or cannot be parsed.
+        """
+        text = pd.Series(values, dtype=object).astype('string').str.translate(cls.DEVANAGARI_DIGITS)
+        parts = text.str.extract(cls.BS_DATE_PATTERN)
+        return cls.bs_to_ad_array(parts[0], parts[1], parts[2])
+
+
+_format_cache = lru_cache(maxsize=NepaliDate.FORMAT_CACHE_SIZE)(NepaliDate._format_nepali_date)
+_dual_date_cache = lru_cache(maxsize=NepaliDate.FORMAT_CACHE_SIZE)(NepaliDate._format_dual_date)
 
 
 def convert_to_nepali(ad_date, format_type='short'):
@@ -204,4 +462,4 @@ def convert_to_nepali(ad_date, format_type='short'):
         from membership.nepali_date import convert_to_nepali
         nepali = convert_to_nepali(some_date, 'medium')
     """
-    return NepaliDate.format_nepali_date(ad_date, format_type)
\ No newline at end of file
+    return NepaliDate.format_nepali_date(ad_date, format_type)
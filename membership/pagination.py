@@ -0,0 +1,189 @@
+"""
+Keyset (seek) pagination
+Pages through a queryset ordered newest first by (date field, id) using
+WHERE clauses on the last seen row instead of OFFSET, so every page costs
+the same no matter how deep it is. Ranked search results have no stable
+key to seek on and are paged by position instead.
+"""
+import hashlib
+from datetime import date
+
+from django.core.cache import cache
+from django.db.models import Q
+
+# Largest id or position a cursor may carry: a signed 64-bit integer, the
+# widest the databases bind (larger values overflow instead of matching nothing)
+MAX_CURSOR_VALUE = 2 ** 63 - 1
+
+
+class KeysetPage:
+    """One page of results plus the cursors needed to move from it"""
+
+    def __init__(self, object_list, date_field, has_next, has_previous):
+        self.object_list = object_list
+        self.date_field = date_field
+        self.has_next = has_next
+        self.has_previous = has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+    def _cursor(self, obj):
+        return f"{getattr(obj, self.date_field).isoformat()}.{obj.pk}"
+
+    @property
+    def next_cursor(self):
+        return self._cursor(self.object_list[-1]) if self.object_list else ''
+
+    @property
+    def previous_cursor(self):
+        return self._cursor(self.object_list[0]) if self.object_list else ''
+
+
+class KeysetPaginator:
+    """
+    Seek paginator for querysets ordered by (date_field DESC, id DESC)
+
+    Usage:
+        paginator = KeysetPaginator(members, 'join_date', per_page=20)
+        page = paginator.page(after=request.GET.get('after'), before=request.GET.get('before'))
+    """
+
+    def __init__(self, queryset, date_field, per_page=20):
+        self.queryset = queryset
+        self.date_field = date_field
+        self.per_page = per_page
+
+    @staticmethod
+    def parse_cursor(cursor):
+        """Return (date, id) for a cursor string, or None if it is malformed or out of range"""
+        if not cursor:
+            return None
+        try:
+            day, pk = cursor.rsplit('.', 1)
+            day, pk = date.fromisoformat(day), int(pk)
+        except ValueError:
+            return None
+        if not 0 <= pk <= MAX_CURSOR_VALUE:
+            return None
+        return day, pk
+
+    def _newest_first(self):
+        return self.queryset.order_by(f'-{self.date_field}', '-id')
+
+    def _oldest_first(self):
+        return self.queryset.order_by(self.date_field, 'id')
+
+    def page(self, after=None, before=None, last=False):
+        """
+        Fetch the page after or before a cursor, the last page, or the first page
+        Each call runs a single LIMIT query (per_page + 1 rows to detect more).
+        """
+        field = self.date_field
+        limit = self.per_page + 1
+        after, before = self.parse_cursor(after), self.parse_cursor(before)
+
+        if after:
+            day, pk = after
+            rows = list(self._newest_first().filter(
+                Q(**{f'{field}__lt': day}) | Q(**{field: day, 'id__lt': pk})
+            )[:limit])
+            if not rows:
+                return self.page(last=True)
+            return KeysetPage(rows[:self.per_page], field, len(rows) > self.per_page, True)
+
+        if before:
+            day, pk = before
+            rows = list(self._oldest_first().filter(
+                Q(**{f'{field}__gt': day}) | Q(**{field: day, 'id__gt': pk})
+            )[:limit])
+            if len(rows) <= self.per_page:
+                # Reached the start: show a full first page instead of a short one
+                return self.page()
+            return KeysetPage(rows[:self.per_page][::-1], field, True, True)
+
+        if last:
+            rows = list(self._oldest_first()[:limit])
+            return KeysetPage(rows[:self.per_page][::-1], field, False, len(rows) > self.per_page)
+
+        rows = list(self._newest_first()[:limit])
+        return KeysetPage(rows[:self.per_page], field, len(rows) > self.per_page, False)
+
+
+class RankedPage(KeysetPage):
+    """One page of ranked results; its cursors are positions in the ranking"""
+
+    def __init__(self, object_list, start, has_next, has_previous):
+        super().__init__(object_list, None, has_next, has_previous)
+        self.start = start
+
+    @property
+    def next_cursor(self):
+        return self.start + len(self.object_list)
+
+    @property
+    def previous_cursor(self):
+        return self.start
+
+
+class RankedPaginator:
+    """
+    Paginator for results ranked by relevance rather than date, such as a
+    member search. fetch(offset, limit) returns a slice of the ranking.
+
+    Takes the same after/before/last arguments as KeysetPaginator, so list
+    templates link to either kind of page the same way.
+    """
+
+    def __init__(self, fetch, per_page=20):
+        self.fetch = fetch
+        self.per_page = per_page
+
+    @staticmethod
+    def parse_cursor(cursor):
+        """Return the position for a cursor string, or None if it is malformed or out of range"""
+        try:
+            position = int(cursor)
+        except (TypeError, ValueError):
+            return None
+        return position if 0 <= position <= MAX_CURSOR_VALUE else None
+
+    def page(self, after=None, before=None, last=False, count=None):
+        """
+        Fetch the page after or before a cursor, the last page, or the first page
+        The last page needs the total count of results.
+        """
+        start = 0
+        after, before = self.parse_cursor(after), self.parse_cursor(before)
+        if after is not None:
+            start = after
+        elif before is not None:
+            start = max(before - self.per_page, 0)
+        elif last and count:
+            start = (count - 1) // self.per_page * self.per_page
+
+        rows = list(self.fetch(start, self.per_page + 1))
+        if not rows and start:
+            return self.page(last=True, count=count)
+        return RankedPage(rows[:self.per_page], start, len(rows) > self.per_page, start > 0)
+
+
+def cached_aggregate(queryset, timeout=60, **aggregates):
+    """
+    Aggregate a queryset, caching the result briefly per distinct SQL query
+    Used for list totals that would otherwise scan the table on every page.
+    """
+    key = 'membership:aggregate:' + hashlib.md5(
+        f"{queryset.query}|{sorted(aggregates)}".encode()
+    ).hexdigest()
+    result = cache.get(key)
+    if result is None:
+        result = queryset.order_by().aggregate(**aggregates)
+        cache.set(key, result, timeout)
+    return result
@@ -0,0 +1,108 @@
+"""
+Phonetic name keys
+Names are recorded both in Devanagari and in several romanized spellings
+("श्रेष्ठ", "Shrestha", "Srestha"). phonetic_key() transliterates Devanagari
+to Latin and folds both into the same consonant skeleton ("srst"), so any
+spelling of a name finds the others.
+"""
+import re
+
+# Consonants carry an inherent 'a', removed by a following vowel sign or virama
+DEVANAGARI_CONSONANTS = {
+    'क': 'k', 'ख': 'kh', 'ग': 'g', 'घ': 'gh', 'ङ': 'n',
+    'च': 'ch', 'छ': 'chh', 'ज': 'j', 'झ': 'jh', 'ञ': 'n',
+    'ट': 't', 'ठ': 'th', 'ड': 'd', 'ढ': 'dh', 'ण': 'n',
+    'त': 't', 'थ': 'th', 'द': 'd', 'ध': 'dh', 'न': 'n',
+    'प': 'p', 'फ': 'ph', 'ब': 'b', 'भ': 'bh', 'म': 'm',
+    'य': 'y', 'र': 'r', 'ल': 'l', 'व': 'v',
+    'श': 'sh', 'ष': 'sh', 'स': 's', 'ह': 'h',
+    'क़': 'k', 'ख़': 'kh', 'ग़': 'g', 'ज़': 'j', 'ड़': 'd', 'ढ़': 'dh', 'फ़': 'f',
+}
+DEVANAGARI_VOWELS = {
+    'अ': 'a', 'आ': 'aa', 'इ': 'i', 'ई': 'ii', 'उ': 'u', 'ऊ': 'uu',
+    'ऋ': 'ri', 'ए': 'e', 'ऐ': 'ai', 'ओ': 'o', 'औ': 'au',
+}
+DEVANAGARI_VOWEL_SIGNS = {
+    'ा': 'aa', 'ि': 'i', 'ी': 'ii', 'ु': 'u', 'ू': 'uu',
+    'ृ': 'ri', 'े': 'e', 'ै': 'ai', 'ो': 'o', 'ौ': 'au',
+}
+DEVANAGARI_MARKS = {'ं': 'n', 'ँ': 'n', 'ः': 'h'}
+VIRAMA = '्'
+NUKTA = '़'
+
+# Spelling variants folded to one letter, longest first
+LATIN_FOLDS = [
+    ('chh', 'c'), ('ch', 'c'), ('sh', 's'), ('kh', 'k'), ('gh', 'g'),
+    ('jh', 'j'), ('th', 't'), ('dh', 'd'), ('ph', 'p'), ('bh', 'b'),
+    ('x', 'ks'), ('q', 'k'), ('z', 'j'), ('f', 'p'), ('w', 'v'),
+]
+LEADING_VOWEL_FOLDS = {'aa': 'a', 'ii': 'i', 'ee': 'i', 'uu': 'u', 'oo': 'u', 'ai': 'e', 'au': 'o'}
+
+VOWELS = set('aeiou')
+NON_LETTERS = re.compile(r'[^a-z]+')
+
+
+def transliterate(text):
+    """Romanize Devanagari text; Latin characters pass through unchanged"""
+    out = []
+    pending_a = False
+    for ch in text:
+        if ch == NUKTA:
+            continue
+        if ch in DEVANAGARI_CONSONANTS:
+            if pending_a:
+                out.append('a')
+            out.append(DEVANAGARI_CONSONANTS[ch])
+            pending_a = True
+            continue
+        if ch in DEVANAGARI_VOWEL_SIGNS:
+            out.append(DEVANAGARI_VOWEL_SIGNS[ch])
+        elif ch == VIRAMA:
+            pass
+        else:
+            if pending_a:
+                out.append('a')
+            out.append(DEVANAGARI_MARKS.get(ch) or DEVANAGARI_VOWELS.get(ch, ch))
+        pending_a = False
+    if pending_a:
+        out.append('a')
+    return ''.join(out)
+
+
+def fold_word(word):
+    """Phonetic skeleton of one romanized word: 'Shrestha' -> 'srst'"""
+    word = NON_LETTERS.sub('', word.lower())
+    if not word:
+        return ''
+    for variant, letter in LATIN_FOLDS:
+        word = word.replace(variant, letter)
+
+    # Keep a leading vowel (folded), then consonants only
+    lead = ''
+    if word[0] in VOWELS:
+        for variant, letter in LEADING_VOWEL_FOLDS.items():
+            if word.startswith(variant):
+                lead, word = letter, word[len(variant):]
+                break
+        else:
+            lead, word = word[0], word[1:]
+
+    skeleton = []
+    for ch in word:
+        if ch in VOWELS:
+            continue
+        # Aspiration after a consonant ("Kh", "Bh" written apart) is dropped
+        if ch == 'h' and skeleton:
+            continue
+        if skeleton and skeleton[-1] == ch:
+            continue
+        skeleton.append(ch)
+    return lead + ''.join(skeleton)
+
+
+def phonetic_key(name, max_length=200):
+    """Space separated phonetic skeletons of the words of a name"""
+    if not name:
+        return ''
+    words = (fold_word(word) for word in transliterate(str(name)).split())
+    return ' '.join(word for word in words if word)[:max_length]
@@ -0,0 +1,110 @@
+"""
+Member search tokenizer
+Turns member fields into short normalized tokens for the MemberSearchToken
+table, and search input into the terms matched against it. Pure text
+handling only, so migrations and management commands can share it.
+"""
+import re
+
+from .phonetic import fold_word, transliterate
+
+# Characters that separate words; everything else is kept (Devanagari vowel
+# signs are combining marks and must not split a word)
+WORD_SEPARATORS = re.compile(r"[\s,;:/\\()\[\]'\"`.@_+#&~-]+")
+
+TOKEN_MAX_LENGTH = 50
+
+# Relevance weight of a match in each field
+SEARCH_FIELD_WEIGHTS = {
+    'name': 10,
+    'membership_number': 8,
+    'phone': 6,
+    'citizenship_number': 6,
+    'email': 4,
+    'father_name': 3,
+    'grandfather_name': 2,
+}
+
+# Sound-alike tokens of names are stored next to the literal ones, marked by
+# this prefix. It is a word separator, so no literal token starts with it.
+PHONETIC_TOKEN_PREFIX = '~'
+PHONETIC_NAME_WEIGHT = 5
+PHONETIC_CHILD_WEIGHT = 1
+
+# Identifier fields are also indexed whole, so "NSS-MEM-00012" or a full
+# phone number matches as one term
+IDENTIFIER_FIELDS = ('membership_number', 'phone', 'citizenship_number', 'email')
+
+NON_DIGITS = re.compile(r'\D+')
+PHONE_COUNTRY_CODE = '977'
+# Prefixes of the phone placeholders written by bulk upload for missing numbers
+PHONE_PLACEHOLDER_PREFIXES = ('TEMP', 'DUP')
+
+
+def normalize_token(value):
+    """Lowercase a value and drop separators: 'NSS-MEM-00012' -> 'nssmem00012'"""
+    return WORD_SEPARATORS.sub('', str(value).lower())[:TOKEN_MAX_LENGTH]
+
+
+def normalize_phone(value):
+    """
+    Digits of a phone number without the +977 prefix, so "+977-984-1234567"
+    and "9841234567" compare equal. '' for placeholders and non-numbers.
+    """
+    value = str(value or '').strip()
+    if value.upper().startswith(PHONE_PLACEHOLDER_PREFIXES):
+        return ''
+    digits = NON_DIGITS.sub('', value)
+    if len(digits) > 10 and digits.startswith(PHONE_COUNTRY_CODE):
+        digits = digits[len(PHONE_COUNTRY_CODE):]
+    return digits if len(digits) >= 7 else ''
+
+
+def split_words(value):
+    """Lowercased words of a value, split on whitespace and punctuation"""
+    return [word[:TOKEN_MAX_LENGTH] for word in WORD_SEPARATORS.split(str(value).lower()) if word]
+
+
+def phonetic_tokens(value):
+    """Phonetic search token of each word of a name: 'Ram Shrestha' -> ['~rm', '~srst']"""
+    keys = (fold_word(word) for word in transliterate(str(value or '')).split())
+    return [PHONETIC_TOKEN_PREFIX + key[:TOKEN_MAX_LENGTH - 1] for key in keys if key]
+
+
+def member_search_tokens(member, child_names=()):
+    """
+    Search tokens for a member as {token: weight}
+    A token appearing in several fields keeps its highest weight. The
+    member's and children's names also get one phonetic token per word.
+    """
+    tokens = {}
+    for field, weight in SEARCH_FIELD_WEIGHTS.items():
+        value = getattr(member, field, None)
+        if not value:
+            continue
+        words = split_words(value)
+        if field in IDENTIFIER_FIELDS:
+            words.append(normalize_token(value))
+        for word in words:
+            if word and tokens.get(word, 0) < weight:
+                tokens[word] = weight
+    named = [(member.name, PHONETIC_NAME_WEIGHT)] + [(name, PHONETIC_CHILD_WEIGHT) for name in child_names]
+    for name, weight in named:
+        for token in phonetic_tokens(name):
+            if tokens.get(token, 0) < weight:
+                tokens[token] = weight
+    return tokens
+
+
+def search_terms(query):
+    """
+    Terms of a search query, each matched as a token prefix
+    A single identifier-like query ('NSS-MEM-00012', '9841-123456') is kept
+    whole so it matches the normalized identifier token.
+    """
+    query = (query or '').strip()
+    if not query:
+        return []
+    if ' ' not in query and any(ch.isdigit() for ch in query):
+        return [normalize_token(query)]
+    return list(dict.fromkeys(split_words(query)))
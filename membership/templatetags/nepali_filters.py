@@ -30,21 +30,7 @@ def dual_date(value, date_format='short'):
     """
     if not value:
         return ""
-    
-    from django.utils.dateformat import format as date_format_func
-    
-    # Format AD date
-    if date_format == 'short':
-        ad_str = value.strftime('%Y-%m-%d')
-        bs_str = NepaliDate.format_nepali_date(value, 'short')
-    else:  # medium/long
-        ad_str = value.strftime('%b %d, %Y')
-        bs_str = NepaliDate.format_nepali_date(value, 'medium')
-    
-    # Return combined
-    if bs_str:
-        return f"{ad_str} ({bs_str} BS)"
-    return ad_str
+    return NepaliDate.format_dual_date(value, date_format)
 
 
 @register.filter(name='abs')
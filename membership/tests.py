@@ -1,3 +1,1425 @@
-from django.test import TestCase
+import re
+import tempfile
+from datetime import date, timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+import openpyxl
+import pandas as pd
+from dateutil.relativedelta import relativedelta
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.signals import request_started
+from django.db import DatabaseError, connection, models
+from django.db.models import Q, QuerySet
+from django.db.models.signals import post_save
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from membership.apps import WARM_CACHE_DISPATCH_UID, warm_nepali_date_cache
+from membership.arrears import compute_dues, refresh_member_dues
+from membership.duplicates import DUPLICATE_THRESHOLD, member_blocking_keys, score_pair
+from membership.forms import MemberForm
+from membership.importer import MemberImport, WorkbookImport, _update_on, count_rows
+from membership.management.commands.run_import_jobs import Command as RunImportJobs
+from membership.models import (
+    AddMonths, CalendarDay, Child, DuplicateCandidate, ImportJob, Member, MembershipFee, NumberSequence,
+    Payment, ReceiptCounter, count_search_members, find_duplicates_of, get_dashboard_stats,
+    index_member_search_tokens, phonetic_key_filter, prefix_filter, recompute_payment_status,
+    reserve_membership_numbers, reserve_receipt_numbers, reserve_sequence_values, search_members,
+)
+from membership.pagination import KeysetPaginator, RankedPaginator
+from membership.views import MEMBER_LOOKUP_LIMIT
+from .nepali_date import NepaliDate
+
+
+class NepaliDateIndexTests(SimpleTestCase):
+    """Indexed AD to BS conversion must agree with the month walker"""
+
+    def test_matches_month_walk_across_whole_calendar(self):
+        last_offset = NepaliDate.MONTH_START_OFFSETS[-1] - 1
+        for offset in range(last_offset + 1):
+            ad_date = NepaliDate.REFERENCE_DATE_AD + timedelta(days=offset)
+            self.assertEqual(
+                NepaliDate.ad_to_bs(ad_date),
+                NepaliDate._ad_to_bs_walk(ad_date),
+                msg=f'Mismatch for {ad_date}'
+            )
+
+    def test_calendar_bounds(self):
+        first = NepaliDate.REFERENCE_DATE_AD
+        last = first + timedelta(days=NepaliDate.MONTH_START_OFFSETS[-1] - 1)
+
+        self.assertEqual(NepaliDate.ad_to_bs(first), (2000, 1, 1))
+        self.assertEqual(NepaliDate.ad_to_bs(last), (2089, 12, 30))
+        self.assertIsNone(NepaliDate.ad_to_bs(first - timedelta(days=1)))
+        self.assertIsNone(NepaliDate.ad_to_bs(last + timedelta(days=1)))
+        self.assertIsNone(NepaliDate.ad_to_bs(None))
+
+
+    def test_batch_bs_to_ad_matches_scalar_at_boundaries(self):
+        # Last and first days of every month of a few years, plus days just past the end
+        dates = []
+        for year in (2000, 2080, 2081, 2089):
+            for month, length in enumerate(NepaliDate.NEPALI_CALENDAR[year], start=1):
+                dates += [(year, month, 1), (year, month, length), (year, month, length + 1)]
+        dates += [(1999, 12, 30), (2090, 1, 1), (2081, 13, 1), (2081, 0, 1), (2081, 1, 0)]
+        years, months, days = zip(*dates)
+
+        expected = [NepaliDate.bs_to_ad(*bs_date) for bs_date in dates]
+        converted = NepaliDate.bs_to_ad_array(years, months, days)
+        self.assertEqual([None if pd.isna(day) else day.astype(date) for day in converted], expected)
+
+        text = [f'{year}-{month:02d}-{day:02d}' for year, month, day in dates]
+        text += ['2081/3/15', '२०८१.०३.१५', 'x', None]
+        expected += [date(2024, 6, 29)] * 2 + [None, None]
+        self.assertEqual(expected, [NepaliDate.parse_bs_date(value) for value in text])
+        parsed = NepaliDate.parse_bs_array(text)
+        self.assertEqual([None if pd.isna(day) else day.astype(date) for day in parsed], expected)
+
+
+class NepaliDateCacheTests(SimpleTestCase):
+    """Formatting caches, their warm-up and the hook that runs it"""
+
+    def setUp(self):
+        NepaliDate.clear_cache()
+        self.addCleanup(NepaliDate.clear_cache)
+
+    def test_repeated_formats_hit_the_cache(self):
+        day = date(2024, 6, 29)
+        self.assertEqual(NepaliDate.format_nepali_date(day), '2081-03-15')
+        self.assertEqual(NepaliDate.format_nepali_date(day), '2081-03-15')
+        self.assertEqual(NepaliDate.format_dual_date(day), '2024-06-29 (2081-03-15 BS)')
+        stats = NepaliDate.cache_stats()
+        self.assertEqual(stats['format_nepali_date'], {
+            'hits': 2, 'misses': 1, 'size': 1, 'maxsize': NepaliDate.FORMAT_CACHE_SIZE,
+        })
+        self.assertEqual((stats['format_dual_date']['hits'], stats['format_dual_date']['misses']), (0, 1))
+
+    def test_warm_cache_formats_current_fiscal_year(self):
+        # 15 Ashadh 2081 falls in fiscal year 2080/81, from 1 Shrawan 2080 up to 1 Shrawan 2081
+        days = NepaliDate.warm_cache(today=date(2024, 6, 29))
+        self.assertEqual(days, (NepaliDate.bs_to_ad(2081, 4, 1) - NepaliDate.bs_to_ad(2080, 4, 1)).days)
+        stats = NepaliDate.cache_stats()
+        self.assertEqual(stats['format_nepali_date']['size'], days * 3)
+        self.assertEqual(stats['format_dual_date']['size'], days * 2)
+
+        NepaliDate.format_dual_date(date(2024, 1, 1), 'medium')
+        self.assertEqual(NepaliDate.cache_stats()['format_dual_date']['hits'], 1)
+        self.assertEqual(NepaliDate.warm_cache(today=date(1900, 1, 1)), 0)
+
+    def test_benchmark_reports_cache_stats(self):
+        out = StringIO()
+        call_command('benchmark_nepali_date', '--count', '50', stdout=out)
+        self.assertIn('format_dual_date: 50 hits, 50 misses', out.getvalue())
+        self.assertIn('All conversions match', out.getvalue())
+
+    def test_setting_gates_first_request_warm_up(self):
+        def connected():
+            return any(key[0] == WARM_CACHE_DISPATCH_UID for key, *_ in request_started.receivers)
+
+        config = apps.get_app_config('membership')
+        self.addCleanup(request_started.disconnect, dispatch_uid=WARM_CACHE_DISPATCH_UID)
+        request_started.disconnect(dispatch_uid=WARM_CACHE_DISPATCH_UID)
+        with self.settings(NEPALI_DATE_WARM_CACHE=False):
+            config.ready()
+        self.assertFalse(connected())
+
+        config.ready()
+        self.assertTrue(connected())
+        with mock.patch('membership.nepali_date.NepaliDate.warm_cache') as warm:
+            warm_nepali_date_cache(sender=None)
+        warm.assert_called_once_with()
+        self.assertFalse(connected())
+
+
+class BsDateEntryTests(TestCase):
+    """Nepali dates typed into the member form are stored as AD dates"""
+
+    def member_data(self, **values):
+        data = {
+            'name': 'Bikash Maharjan', 'gender': 'M', 'phone': '9841000000', 'address': 'Kirtipur',
+            'father_name': 'Hari', 'citizenship_number': 'CIT-BS-1', 'membership_type': 'REGULAR', 'payment_frequency': 'ANNUAL',
+            'join_date': '2024-01-01', 'is_active': 'on',
+        }
+        data.update(values)
+        return data
+
+    def test_bs_to_ad(self):
+        self.assertEqual(NepaliDate.bs_to_ad(2081, 1, 1), date(2024, 4, 14))
+        self.assertEqual(NepaliDate.bs_to_ad('2081', '4', '32'), date(2024, 8, 16))
+        self.assertIsNone(NepaliDate.bs_to_ad(2081, 3, 32))
+        self.assertIsNone(NepaliDate.bs_to_ad(2081, 13, 1))
+        self.assertIsNone(NepaliDate.bs_to_ad(2081, 'x', 1))
+
+    def test_parse_bs_date(self):
+        self.assertEqual(NepaliDate.parse_bs_date('2081-03-15'), date(2024, 6, 29))
+        self.assertEqual(NepaliDate.parse_bs_date('2081/3/15'), date(2024, 6, 29))
+        self.assertEqual(NepaliDate.parse_bs_date('२०८१.०३.१५'), date(2024, 6, 29))
+        for value in ('2081-03-32', '2081-13-01', '2081-03', '15/03/2081', 'soon', '', None):
+            self.assertIsNone(NepaliDate.parse_bs_date(value), msg=value)
+
+    def test_round_trip(self):
+        for bs_date in ((2000, 1, 1), (2081, 4, 32), (2081, 12, 30), (2089, 12, 30)):
+            self.assertEqual(NepaliDate.ad_to_bs(NepaliDate.bs_to_ad(*bs_date)), bs_date)
+
+    def test_member_form_converts_bs_dates(self):
+        form = MemberForm(data=self.member_data(dob_bs_year='2050', dob_bs_month='1', dob_bs_day='1'))
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual(form.cleaned_data['date_of_birth'], NepaliDate.bs_to_ad(2050, 1, 1))
+        self.assertEqual(NepaliDate.ad_to_bs(form.cleaned_data['date_of_birth']), (2050, 1, 1))
+
+        # An AD date typed in wins over the BS inputs
+        form = MemberForm(data=self.member_data(
+            join_date='2024-02-02', join_bs_year='2081', join_bs_month='1', join_bs_day='1',
+        ))
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual(form.cleaned_data['join_date'], date(2024, 2, 2))
+
+    def test_member_form_rejects_invalid_bs_dates(self):
+        message = 'Enter a valid Nepali (BS) date between 2000 and 2089.'
+        for year, month, day in (('2081', '3', '32'), ('2081', '13', '1'), ('20x1', '3', '1'), ('2095', '1', '1')):
+            form = MemberForm(data=self.member_data(dob_bs_year=year, dob_bs_month=month, dob_bs_day=day))
+            self.assertFalse(form.is_valid())
+            self.assertEqual(form.errors['date_of_birth'], [message])
+
+
+class CalendarDayTests(TestCase):
+    """The calendar dimension is filled by migrations, not only by populate_calendar"""
+
+    def test_filled_for_whole_calendar(self):
+        self.assertEqual(CalendarDay.objects.count(), NepaliDate.MONTH_START_OFFSETS[-1])
+        first = CalendarDay.objects.get(ad_date=NepaliDate.REFERENCE_DATE_AD)
+        self.assertEqual((first.bs_year, first.bs_month, first.bs_day), (2000, 1, 1))
+        for day in CalendarDay.objects.filter(ad_date__year=2024, ad_date__month=7):
+            self.assertEqual(NepaliDate.ad_to_bs(day.ad_date), (day.bs_year, day.bs_month, day.bs_day))
+            self.assertEqual(day.fiscal_year, NepaliDate.fiscal_year_for(day.bs_year, day.bs_month))
+
+
+class ArrearsEngineTests(SimpleTestCase):
+    """Vectorized dues must agree with stepping through periods one member at a time"""
+
+    def test_matches_period_walk(self):
+        today = date(2026, 3, 31)
+        fees = {'MONTHLY': Decimal('150.50'), 'ANNUAL': Decimal('1500')}
+        joined = date(2020, 1, 31)
+        rows, last_payments = [], {}
+        for i in range(400):
+            frequency = ('MONTHLY', 'ANNUAL')[i % 2]
+            rows.append((i, frequency, joined + timedelta(days=i * 7)))
+            if i % 5:
+                last_payments[i] = date(2023, 1, 28) + timedelta(days=i * 3)
+        members = pd.DataFrame.from_records(rows, columns=['id', 'payment_frequency', 'join_date'], index='id')
+
+        dues = compute_dues(members, pd.Series(last_payments, dtype=object), fees, today)
+
+        for pk, frequency, join_date in rows:
+            step = relativedelta(months=1) if frequency == 'MONTHLY' else relativedelta(years=1)
+            due_since = last_payments[pk] + step if pk in last_payments else join_date
+            periods = 0
+            while due_since + step * periods <= today:
+                periods += 1
+            if not periods:
+                self.assertNotIn(pk, dues.index)
+                continue
+            row = dues.loc[pk]
+            self.assertEqual(row['due_since'].date(), due_since, msg=f'Member {pk}')
+            self.assertEqual(row['periods_owed'], periods, msg=f'Member {pk}')
+            self.assertEqual(row['amount_due'], periods * int(fees[frequency] * 100), msg=f'Member {pk}')
+
+
+class MemberDuesTests(TestCase):
+    """Stored dues follow member edits; the arrears report only reads them"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser('collector', 'collector@example.com', 'pw')
+        MembershipFee.objects.create(membership_type='REGULAR', payment_frequency='ANNUAL', amount=Decimal('1000'))
+        cls.member = Member.objects.create(
+            name='Dues Member', phone='9812345678', address='Kirtipur', father_name='Father',
+            membership_number='NSS-DUE-1', citizenship_number='CIT-DUE-1',
+            payment_frequency='ANNUAL', join_date=date(2020, 1, 1),
+        )
+
+    def test_refresh_only_when_dues_terms_change(self):
+        member = Member.objects.get(pk=self.member.pk)
+        with mock.patch('membership.models._refresh_member_dues') as refresh:
+            member.address = 'Patan'
+            member.save()
+            member.save(update_fields=['address'])
+            refresh.assert_not_called()
+            member.payment_frequency = 'MONTHLY'
+            member.save()
+            refresh.assert_called_once_with([member.pk])
+            member.save()
+            refresh.assert_called_once()
+
+    def test_report_reads_table_rebuilt_by_command(self):
+        self.client.force_login(self.user)
+        with mock.patch('membership.arrears.refresh_member_dues') as refresh:
+            response = self.client.get('/reports/arrears/')
+        refresh.assert_not_called()
+        self.assertEqual(response.context['total_count'], 1)
+        self.assertTrue(response.context['dues_stale'])
+
+        call_command('refresh_member_dues', '--if-stale', stdout=StringIO())
+        response = self.client.get('/reports/arrears/')
+        self.assertEqual(response.context['computed_on'], timezone.localdate())
+        self.assertFalse(response.context['dues_stale'])
+        out = StringIO()
+        call_command('refresh_member_dues', '--if-stale', stdout=out)
+        self.assertIn('up to date', out.getvalue())
+
+
+class DashboardStatsTests(TestCase):
+    """Cached dashboard figures are dropped when a write commits"""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_payment_write_invalidates_on_commit(self):
+        fee = MembershipFee.objects.create(
+            membership_type='REGULAR', payment_frequency='ANNUAL', amount=Decimal('700')
+        )
+        member = Member.objects.create(
+            name='Stats Member', phone='9800000001', address='Bhaktapur', father_name='Father',
+            membership_number='NSS-MEM-90002', citizenship_number='CIT-90002',
+        )
+        self.assertEqual(get_dashboard_stats()['total_revenue'], 0)
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            Payment.objects.create(
+                member=member, membership_fee=fee, amount=Decimal('700'),
+                payment_date=date(2024, 1, 1), payment_mode='CASH',
+            )
+            # Still cached until the write commits
+            self.assertEqual(get_dashboard_stats()['total_revenue'], 0)
+        self.assertTrue(callbacks)
+        self.assertEqual(get_dashboard_stats()['total_revenue'], Decimal('700'))
+
+
+    def test_counts_and_revenue_in_one_query(self):
+        fee = MembershipFee.objects.create(
+            membership_type='REGULAR', payment_frequency='ANNUAL', amount=Decimal('500')
+        )
+        for i, (membership_type, is_active) in enumerate(
+            [('REGULAR', True), ('REGULAR', True), ('REGULAR', False), ('LIFETIME', True), ('HONARARY', False)]
+        ):
+            member = Member.objects.create(
+                name=f'Stats {i}', phone=f'98100000{i:02d}', address='Bhaktapur', father_name='Father',
+                membership_number=f'NSS-STAT-{i}', citizenship_number=f'CIT-STAT-{i}',
+                membership_type=membership_type, is_active=is_active,
+            )
+            Payment.objects.create(
+                member=member, membership_fee=fee, amount=Decimal('500'), payment_date=date(2024, 1, 1),
+            )
+        cache.clear()
+
+        with CaptureQueriesContext(connection) as queries:
+            stats = get_dashboard_stats()
+        # Leaving out the cache table's own reads and writes
+        reads = [query['sql'] for query in queries if query['sql'].startswith('SELECT')]
+        self.assertEqual(len([sql for sql in reads if 'membership_cache' not in sql]), 1)
+        self.assertEqual(
+            (stats['regular_members'], stats['lifetime_members'], stats['honarary_members'], stats['total_members']),
+            (2, 1, 0, 3),
+        )
+        self.assertEqual(stats['regular_percentage'], 66.7)
+        # Revenue counts inactive members' payments too
+        self.assertEqual(stats['total_revenue'], Decimal('2500'))
+
+
+class PaymentStatusTests(TestCase):
+    """Last payment date and validity, kept by payment signals and rebuilt in SQL"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.monthly = MembershipFee.objects.create(
+            membership_type='REGULAR', payment_frequency='MONTHLY', amount=Decimal('100')
+        )
+        cls.annual = MembershipFee.objects.create(
+            membership_type='REGULAR', payment_frequency='ANNUAL', amount=Decimal('1000')
+        )
+        cls.lifetime = MembershipFee.objects.create(
+            membership_type='LIFETIME', payment_frequency='ONE-TIME', amount=Decimal('10000')
+        )
+
+    def member(self, number, membership_type='REGULAR'):
+        return Member.objects.create(
+            name=f'Status {number}', phone=f'981{number:07d}', address='Kirtipur', father_name='Father',
+            membership_number=f'NSS-ST-{number}', citizenship_number=f'CIT-ST-{number}',
+            membership_type=membership_type,
+        )
+
+    def pay(self, member, fee, day, amount=None):
+        return Payment.objects.create(
+            member=member, membership_fee=fee, amount=amount or fee.amount, payment_date=day,
+            receipt_number=f'NSS-ST-{member.pk}-{day.isoformat()}',
+        )
+
+    def status(self, member):
+        member = Member.objects.get(pk=member.pk)
+        return (
+            member.last_payment_date, member.membership_valid_until,
+            member.total_paid, member.payment_count,
+        )
+
+    def test_regular_validity_follows_fee_frequency(self):
+        monthly, annual = self.member(1), self.member(2)
+        self.pay(monthly, self.monthly, date(2024, 3, 10))
+        self.pay(annual, self.annual, date(2024, 3, 10))
+        self.assertEqual(self.status(monthly)[:2], (date(2024, 3, 10), date(2024, 4, 10)))
+        self.assertEqual(self.status(annual)[:2], (date(2024, 3, 10), date(2025, 3, 10)))
+
+    def test_lifetime_and_honorary_never_expire(self):
+        for number, membership_type in ((3, 'LIFETIME'), (4, 'HONARARY')):
+            member = self.member(number, membership_type)
+            self.pay(member, self.lifetime, date(2024, 3, 10))
+            self.assertEqual(self.status(member)[:2], (date(2024, 3, 10), None))
+
+    def test_month_end_is_clamped(self):
+        member = self.member(5)
+        self.pay(member, self.monthly, date(2024, 1, 31))
+        self.assertEqual(self.status(member)[1], date(2024, 2, 29))
+        self.pay(member, self.annual, date(2024, 2, 29))
+        self.assertEqual(self.status(member)[1], date(2025, 2, 28))
+        clamped = Member.objects.annotate(
+            next_month=AddMonths(models.Value(date(2023, 1, 31)), 1)
+        ).values_list('next_month', flat=True).first()
+        self.assertEqual(clamped, date(2023, 2, 28))
+
+    def test_add_months_generic_sql(self):
+        compiler = Member.objects.all().query.get_compiler(connection=connection)
+        sql, params = AddMonths(models.Value(date(2024, 1, 31)), 3).as_sql(compiler, connection)
+        self.assertIn("+ INTERVAL '3' MONTH AS DATE", sql)
+
+    def test_edit_move_and_delete_follow_latest_payment(self):
+        first, second = self.member(6), self.member(7)
+        early = self.pay(first, self.monthly, date(2024, 1, 5))
+        late = self.pay(first, self.annual, date(2024, 6, 5))
+        self.assertEqual(self.status(first), (date(2024, 6, 5), date(2025, 6, 5), Decimal('1100'), 2))
+
+        late = Payment.objects.get(pk=late.pk)
+        late.amount = Decimal('1200')
+        late.save()
+        self.assertEqual(self.status(first), (date(2024, 6, 5), date(2025, 6, 5), Decimal('1300'), 2))
+
+        late.member = second
+        late.save()
+        self.assertEqual(self.status(first), (date(2024, 1, 5), date(2024, 2, 5), Decimal('100'), 1))
+        self.assertEqual(self.status(second), (date(2024, 6, 5), date(2025, 6, 5), Decimal('1200'), 1))
+
+        Payment.objects.get(pk=early.pk).delete()
+        self.assertEqual(self.status(first), (None, None, Decimal('0'), 0))
+
+    def test_reconcile_command_repairs_drifted_totals(self):
+        paid, unpaid = self.member(10), self.member(11)
+        self.pay(paid, self.monthly, date(2024, 1, 5))
+        self.pay(paid, self.annual, date(2024, 6, 5))
+        Member.objects.filter(pk__in=[paid.pk, unpaid.pk]).update(
+            total_paid=Decimal('99'), payment_count=7, last_payment_amount=Decimal('1')
+        )
+
+        out = StringIO()
+        call_command('reconcile_payment_totals', stdout=out)
+        self.assertIn('Reconciled payment totals', out.getvalue())
+        self.assertEqual(self.status(paid)[2:], (Decimal('1100'), 2))
+        self.assertEqual(Member.objects.get(pk=paid.pk).last_payment_amount, Decimal('1000'))
+        self.assertEqual(self.status(unpaid)[2:], (Decimal('0'), 0))
+        self.assertIsNone(Member.objects.get(pk=unpaid.pk).last_payment_amount)
+
+    def test_saving_stale_member_keeps_payment_status(self):
+        member = self.member(9)
+        stale = Member.objects.get(pk=member.pk)
+        self.pay(member, self.monthly, date(2024, 3, 10))
+        stale.address = 'Patan'
+        stale.save()
+        self.assertEqual(self.status(member), (date(2024, 3, 10), date(2024, 4, 10), Decimal('100'), 1))
+        self.assertEqual(Member.objects.get(pk=member.pk).address, 'Patan')
+
+    def test_recompute_rebuilds_stale_status(self):
+        member = self.member(8)
+        self.pay(member, self.monthly, date(2024, 1, 31))
+        self.pay(member, self.monthly, date(2023, 12, 1))
+        Member.objects.filter(pk=member.pk).update(last_payment_date=None, membership_valid_until=None)
+        self.assertEqual(recompute_payment_status(Member.objects.filter(pk=member.pk)), 1)
+        self.assertEqual(self.status(member)[:2], (date(2024, 1, 31), date(2024, 2, 29)))
+
+
+class AllocatorTests(TestCase):
+    """Receipt and membership numbers handed out from locked counter rows"""
+
+    def test_receipt_counter_seeds_from_existing_receipts(self):
+        day = date(2024, 5, 1)
+        member = Member.objects.create(
+            name='Receipt Holder', phone='9812345678', address='Patan', father_name='Father',
+            membership_number='NSS-RC-1', citizenship_number='CIT-RC-1',
+        )
+        fee = MembershipFee.objects.create(
+            membership_type='REGULAR', payment_frequency='ANNUAL', amount=Decimal('1000')
+        )
+        Payment.objects.create(
+            member=member, membership_fee=fee, amount=Decimal('1000'), payment_date=day,
+            receipt_number='NSS-20240501-0007',
+        )
+        self.assertEqual(reserve_receipt_numbers(2, day), ['NSS-20240501-0008', 'NSS-20240501-0009'])
+        self.assertEqual(reserve_receipt_numbers(1, day), ['NSS-20240501-0010'])
+        self.assertEqual(ReceiptCounter.objects.get(day=day).last_number, 10)
+        self.assertEqual(reserve_receipt_numbers(1, date(2024, 5, 2)), ['NSS-20240502-0001'])
+
+    def test_existing_counter_row_is_locked_not_reseeded(self):
+        day = date(2024, 5, 3)
+        ReceiptCounter.objects.create(day=day, last_number=41)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(reserve_receipt_numbers(1, day), ['NSS-20240503-0042'])
+        statements = ' '.join(query['sql'] for query in queries)
+        self.assertNotIn('INSERT', statements)
+        self.assertNotIn('membership_payment', statements)
+
+    def test_sequence_seeds_once_from_callable(self):
+        seeds = []
+
+        def initial():
+            seeds.append(1)
+            return 100
+
+        self.assertEqual(reserve_sequence_values('test', 5, initial=initial), 101)
+        self.assertEqual(reserve_sequence_values('test', 1, initial=initial), 106)
+        self.assertEqual(NumberSequence.objects.get(name='test').last_value, 106)
+        self.assertEqual(len(seeds), 1)
+
+    def test_membership_numbers_skip_taken_and_excluded(self):
+        Member.objects.create(
+            name='Typed Number', phone='9812345679', address='Patan', father_name='Father',
+            membership_number='NSS-MEM-00002', citizenship_number='CIT-RC-2',
+        )
+        NumberSequence.objects.create(name='membership_number', last_value=0)
+        numbers = reserve_membership_numbers(3, exclude=['NSS-MEM-00003'])
+        self.assertEqual(numbers, ['NSS-MEM-00001', 'NSS-MEM-00004', 'NSS-MEM-00005'])
+
+
+def csv_upload(*lines):
+    """In-memory CSV upload, one string per line (the first is the header)"""
+    return BytesIO('\n'.join(lines).encode())
+
+
+class MemberImportTests(TestCase):
+    """Column-wise bulk import: defaults, validation and the per-row report"""
+    HEADER = 'name,father_name,phone,membership_number,citizenship_number,gender,membership_type,payment_frequency,email'
+
+    def test_creates_valid_rows_and_reports_the_rest(self):
+        Member.objects.create(
+            name='Already Here', phone='9810000000', address='Patan', father_name='Father',
+            membership_number='NSS-MEM-00001', citizenship_number='TAKEN-1',
+        )
+        importer = MemberImport()
+        importer.import_file(csv_upload(
+            self.HEADER,
+            'Asha Maharjan,Buddha,9841000001,CUSTOM-7,CIT-1,female,lifetime,yearly,asha@example.com',
+            'Bina Shakya,,9841000002,,CIT-2,F,,,',
+            ',,,,,,,,',
+            'Chandra Tuladhar,Gopal,9841000003,,TAKEN-1,M,,,',
+            'Dipak Bajracharya,Hari,,,CIT-4,?,,,',
+        ), 'csv')
+
+        self.assertEqual((importer.success_count, importer.error_count, importer.skipped_count), (2, 2, 1))
+        self.assertEqual(importer.errors, [
+            "Row 3: Father's name is required.",
+            'Row 5: Citizenship number TAKEN-1 already exists.',
+        ])
+
+        asha = Member.objects.get(citizenship_number='CIT-1')
+        self.assertEqual(
+            (asha.membership_number, asha.gender, asha.membership_type, asha.payment_frequency),
+            ('CUSTOM-7', 'F', 'LIFETIME', 'ANNUAL'),
+        )
+        self.assertTrue(asha.search_tokens.exists())
+
+        dipak = Member.objects.get(citizenship_number='CIT-4')
+        self.assertTrue(dipak.phone.startswith('TEMP'))
+        self.assertEqual(dipak.membership_number, 'NSS-MEM-00002')
+        self.assertEqual(dipak.email, 'noemail.nssmem00002@placeholder.com')
+        self.assertEqual((dipak.gender, dipak.membership_type, dipak.payment_frequency), ('O', 'REGULAR', 'MONTHLY'))
+
+        self.assertEqual(importer.auto_generated_count, 2)
+        self.assertEqual(importer.auto_generated[0], {'row': 2, 'name': 'Asha Maharjan', 'fields': ['address']})
+        self.assertEqual(importer.auto_generated[1]['row'], 6)
+        self.assertEqual(set(importer.auto_generated[1]['fields']), {
+            'phone (missing)', 'address', 'membership_type', 'gender', 'payment_frequency',
+            'membership_number', 'email',
+        })
+
+    def test_membership_number_in_use_is_replaced(self):
+        Member.objects.create(
+            name='Holder', phone='9810000000', address='Patan', father_name='Father',
+            membership_number='CUSTOM-1', citizenship_number='HOLDER',
+        )
+        importer = MemberImport()
+        importer.import_file(csv_upload(
+            self.HEADER,
+            'Erina Joshi,Ram,9841000005,CUSTOM-1,CIT-5,F,,,e@example.com',
+            'Gita Joshi,Ram,9841000006,CUSTOM-2,CIT-6,F,,,g@example.com',
+            'Hira Joshi,Ram,9841000007,CUSTOM-2,CIT-7,F,,,h@example.com',
+        ), 'csv')
+        numbers = dict(Member.objects.filter(citizenship_number__in=['CIT-5', 'CIT-6', 'CIT-7'])
+                       .values_list('citizenship_number', 'membership_number'))
+        self.assertEqual(numbers['CIT-6'], 'CUSTOM-2')
+        self.assertTrue(numbers['CIT-5'].startswith('NSS-MEM-'))
+        self.assertTrue(numbers['CIT-7'].startswith('NSS-MEM-'))
+        self.assertEqual(
+            [('membership_number' in item['fields']) for item in importer.auto_generated],
+            [True, False, True],
+        )
+
+
+class ChunkedImportTests(TestCase):
+    """Uploads are read and committed a chunk at a time"""
+
+    def rows(self, count, start=0):
+        return [f'Person {i},Father {i},98{i:08d},CHUNK-{i}' for i in range(start, start + count)]
+
+    def test_progress_after_every_chunk(self):
+        seen = []
+        importer = MemberImport()
+        importer.import_file(
+            csv_upload('name,father_name,phone,citizenship_number', *self.rows(5)), 'csv',
+            chunk_size=2, progress=lambda importer: seen.append((importer.processed_rows, importer.success_count)),
+        )
+        self.assertEqual(seen, [(2, 2), (4, 4), (5, 5)])
+        self.assertFalse(importer.stopped)
+
+    def test_later_chunk_failure_keeps_earlier_chunks(self):
+        create = MemberImport._create
+
+        def fail_third_chunk(importer, members, row_numbers):
+            if row_numbers[0] == 6:
+                raise DatabaseError('connection lost')
+            return create(importer, members, row_numbers)
+
+        importer = MemberImport()
+        with mock.patch.object(MemberImport, '_create', fail_third_chunk):
+            importer.import_file(
+                csv_upload('name,father_name,phone,citizenship_number', *self.rows(6)), 'csv', chunk_size=2,
+            )
+
+        self.assertTrue(importer.stopped)
+        self.assertEqual((importer.success_count, importer.processed_rows), (4, 4))
+        self.assertEqual(importer.errors, ['Rows 6-7: connection lost. Import stopped; earlier rows were saved.'])
+        self.assertEqual(Member.objects.filter(citizenship_number__startswith='CHUNK-').count(), 4)
+
+    def test_cross_chunk_duplicates_are_caught(self):
+        importer = MemberImport()
+        importer.import_file(csv_upload(
+            'name,father_name,phone,citizenship_number',
+            *self.rows(2), 'Again,Father,9800000099,CHUNK-0',
+        ), 'csv', chunk_size=2)
+        self.assertEqual((importer.success_count, importer.errors), (2, ['Row 4: Citizenship number CHUNK-0 already exists.']))
+
+
+class ImportJobTests(TestCase):
+    """run_import_jobs claims waiting uploads and saves progress as it goes"""
+
+    def setUp(self):
+        media = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(self.settings(MEDIA_ROOT=media))
+
+    def queue(self, name, lines, status='PENDING'):
+        job = ImportJob(file_name=name, file_type='csv', status=status)
+        job.file.save(name, ContentFile('\n'.join(lines).encode()), save=False)
+        job.save()
+        return job
+
+    def test_runs_waiting_jobs_with_progress(self):
+        running = self.queue('running.csv', ['name,father_name', 'Someone,Father'], status='RUNNING')
+        job = self.queue('members.csv', [
+            'name,father_name,phone,citizenship_number',
+            *[f'Job Person {i},Father,98{i:08d},JOB-{i}' for i in range(5)],
+            'No Father,,9800000099,JOB-X',
+        ])
+        progress = []
+
+        def record(sender, instance, update_fields=None, **kwargs):
+            if update_fields and 'processed_rows' in update_fields:
+                progress.append((instance.processed_rows, instance.success_count))
+
+        out = StringIO()
+        post_save.connect(record, sender=ImportJob)
+        try:
+            with mock.patch.object(MemberImport, 'CHUNK_SIZE', 2):
+                call_command('run_import_jobs', '--once', stdout=out)
+        finally:
+            post_save.disconnect(record, sender=ImportJob)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'COMPLETED')
+        self.assertEqual((job.total_rows, job.processed_rows), (6, 6))
+        self.assertEqual((job.success_count, job.error_count), (5, 1))
+        self.assertEqual(job.errors, ["Row 7: Father's name is required."])
+        self.assertIsNotNone(job.started_at)
+        self.assertIsNotNone(job.finished_at)
+        self.assertFalse(job.file)
+        self.assertEqual(progress, [(2, 2), (4, 4), (6, 5)])
+        self.assertEqual(out.getvalue().splitlines(), [
+            f'Importing members.csv (job {job.pk})...',
+            'Completed: 5 created, 1 failed, 0 skipped',
+        ])
+
+        running.refresh_from_db()
+        self.assertEqual(running.status, 'RUNNING')
+
+    def test_jobs_left_running_by_a_dead_worker_fail(self):
+        stale = self.queue('stale.csv', ['name,father_name'], status='RUNNING')
+        recent = self.queue('recent.csv', ['name,father_name'], status='RUNNING')
+        ImportJob.objects.filter(pk=stale.pk).update(started_at=timezone.now() - timedelta(hours=3))
+        ImportJob.objects.filter(pk=recent.pk).update(started_at=timezone.now() - timedelta(minutes=10))
+
+        out = StringIO()
+        call_command('run_import_jobs', '--once', '--stale-after', '60', stdout=out)
+        self.assertEqual(out.getvalue().splitlines(), ['Failed 1 job(s) left running by a stopped worker'])
+
+        stale.refresh_from_db()
+        self.assertEqual(stale.status, 'FAILED')
+        self.assertIn('stopped before finishing', stale.message)
+        self.assertIsNotNone(stale.finished_at)
+        self.assertFalse(stale.file)
+        recent.refresh_from_db()
+        self.assertEqual(recent.status, 'RUNNING')
+
+    def test_claim_is_conditional(self):
+        job = self.queue('claimed.csv', ['name,father_name'])
+        command = RunImportJobs()
+        real_update = QuerySet.update
+
+        def taken_by_another_worker(queryset, **kwargs):
+            # Another worker claims the job between our read and our update
+            real_update(ImportJob.objects.filter(pk=job.pk), status='RUNNING')
+            return real_update(queryset, **kwargs)
+
+        with mock.patch.object(QuerySet, 'update', taken_by_another_worker):
+            self.assertIsNone(command.claim_next())
+        job.refresh_from_db()
+        self.assertIsNone(job.started_at)
+
+
+class DryRunTests(TestCase):
+    """A dry run checks an upload against the database and writes nothing"""
+
+    def test_dry_run_reports_every_row_without_writing(self):
+        Member.objects.create(
+            name='Existing', phone='9810000000', address='Patan', father_name='Father',
+            membership_number='NSS-MEM-00001', citizenship_number='DRY-TAKEN',
+        )
+        user = User.objects.create_superuser('dry', 'dry@example.com', 'pw')
+        self.client.force_login(user)
+        upload = SimpleUploadedFile('members.csv', '\n'.join([
+            'name,father_name,phone,citizenship_number,membership_number,email',
+            'Kabita Rajbhandari,Mohan,9841000010,DRY-1,,kabita@example.com',
+            'Laxmi Pradhan,,9841000011,DRY-2,,',
+            ',,,,,',
+            'Mina Shrestha,Shyam,9841000012,DRY-TAKEN,,',
+            'Nabin Shrestha,Shyam,,DRY-3,NSS-MEM-00001,',
+        ]).encode(), content_type='text/csv')
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/members/bulk-upload/', {'file': upload, 'dry_run': '1'})
+
+        writes = [
+            query['sql'] for query in queries
+            if query['sql'].lstrip().upper().startswith(('INSERT', 'UPDATE', 'DELETE'))
+        ]
+        self.assertEqual(writes, [])
+        self.assertEqual(Member.objects.count(), 1)
+        self.assertFalse(NumberSequence.objects.exists())
+        self.assertFalse(ImportJob.objects.exists())
+
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="members_validation.xlsx"')
+        workbook = openpyxl.load_workbook(BytesIO(response.content))
+        rows = list(workbook['Rows'].iter_rows(min_row=2, values_only=True))
+        self.assertEqual([row[:3] for row in rows], [
+            (2, 'Kabita Rajbhandari', 'OK'),
+            (3, 'Laxmi Pradhan', 'Error'),
+            (4, None, 'Skipped'),
+            (5, 'Mina Shrestha', 'Error'),
+            (6, 'Nabin Shrestha', 'OK'),
+        ])
+        self.assertEqual(rows[1][3], "Father's name is required.")
+        self.assertEqual(rows[3][3], 'Citizenship number DRY-TAKEN already exists.')
+        self.assertIn('membership_number', rows[4][4])
+        summary = dict(row[:2] for row in workbook['Summary'].iter_rows(min_row=2, values_only=True))
+        self.assertEqual((summary['Rows that will be created'], summary['Rows with errors']), (2, 2))
+
+
+class UpsertImportTests(TestCase):
+    """Upsert mode: rows matching an existing member update it"""
+    HEADER = 'name,father_name,phone,membership_number,citizenship_number,address,email'
+
+    def setUp(self):
+        self.sita = Member.objects.create(
+            name='Sita Maharjan', phone='9841111111', address='Kirtipur', father_name='Ram',
+            membership_number='NSS-MEM-00010', citizenship_number='UP-1', email='sita@example.com',
+        )
+        self.gita = Member.objects.create(
+            name='Gita Maharjan', phone='9842222222', address='Kirtipur', father_name='Ram',
+            membership_number='NSS-MEM-00011', citizenship_number='UP-2',
+        )
+
+    def run_import(self, *lines):
+        importer = MemberImport(update_existing=True)
+        importer.import_file(csv_upload(self.HEADER, *lines), 'csv')
+        return importer
+
+    def test_matches_by_number_citizenship_and_phone(self):
+        importer = self.run_import(
+            'Sita Maharjan,,,NSS-MEM-00010,,Patan,',
+            'Gita Maharjan,Ram,9842222222,,UP-2,Kirtipur,',
+            'Sita Maharjan,,+977-984-1111111,,,,',
+            'Hari Maharjan,Ram,9843333333,,UP-3,Bhaktapur,',
+        )
+        self.assertEqual(importer.errors, ['Row 4: Matches the same member as an earlier row.'])
+        self.assertEqual((importer.updated_count, importer.unchanged_count, importer.success_count), (1, 1, 1))
+
+        self.sita.refresh_from_db()
+        # Empty cells keep the stored values
+        self.assertEqual(
+            (self.sita.address, self.sita.phone, self.sita.father_name, self.sita.email),
+            ('Patan', '9841111111', 'Ram', 'sita@example.com'),
+        )
+        self.assertEqual(Member.objects.count(), 3)
+
+    def test_changed_name_updates_derived_keys(self):
+        self.run_import('Sitaa Maharjan,,,NSS-MEM-00010,,,')
+        self.sita.refresh_from_db()
+        self.assertEqual(self.sita.name, 'Sitaa Maharjan')
+        self.assertEqual(search_members('sitaa'), [self.sita.pk])
+
+    def test_conflicting_identifiers_are_rejected(self):
+        Member.objects.create(
+            name='Rita Maharjan', phone='9841111111', address='Kirtipur', father_name='Ram',
+            membership_number='NSS-MEM-00012', citizenship_number='UP-4',
+        )
+        Member.objects.create(
+            name='Rita Maharjan', phone='9841111111', address='Kirtipur', father_name='Shyam',
+            membership_number='NSS-MEM-00013', citizenship_number='UP-5',
+        )
+        importer = self.run_import(
+            'Sita Maharjan,Ram,,NSS-MEM-00010,UP-2,Lalitpur,',
+            'Rita Maharjan,Ram,9841111111,,,Lalitpur,',
+        )
+        self.assertEqual(importer.errors, [
+            'Row 2: Membership number and citizenship number belong to different members.',
+            'Row 3: Phone 9841111111 matches several members with this name; '
+            'add the membership or citizenship number.',
+        ])
+        self.assertEqual((importer.updated_count, importer.success_count), (0, 0))
+        self.assertFalse(Member.objects.filter(address='Lalitpur').exists())
+
+    def test_without_upsert_existing_identifiers_are_errors(self):
+        importer = MemberImport()
+        importer.import_file(csv_upload(self.HEADER, 'Sita Maharjan,Ram,,NSS-MEM-00010,UP-1,Patan,'), 'csv')
+        self.assertEqual(importer.errors, ['Row 2: Citizenship number UP-1 already exists.'])
+        self.sita.refresh_from_db()
+        self.assertEqual(self.sita.address, 'Kirtipur')
+
+
+class WorkbookImportTests(TestCase):
+    """Members, Children and Payments sheets imported together"""
+
+    @classmethod
+    def setUpTestData(cls):
+        MembershipFee.objects.create(membership_type='REGULAR', payment_frequency='ANNUAL', amount=Decimal('1200'))
+
+    def workbook(self, members, children=(), payments=()):
+        workbook = openpyxl.Workbook()
+        sheet = workbook.active
+        sheet.title = 'Members'
+        for values in (['name', 'father_name', 'membership_number', 'citizenship_number', 'payment_frequency'], *members):
+            sheet.append(values)
+        sheet = workbook.create_sheet('Children')
+        for values in (['membership_number', 'name', 'date_of_birth'], *children):
+            sheet.append(values)
+        sheet = workbook.create_sheet('Payments')
+        for values in (['membership_number', 'payment_date', 'amount', 'receipt_number'], *payments):
+            sheet.append(values)
+        buffer = BytesIO()
+        workbook.save(buffer)
+        buffer.seek(0)
+        return buffer
+
+    def run_import(self, file):
+        importer = WorkbookImport()
+        importer.import_workbook(file)
+        self.assertFalse(importer.stopped, importer.errors)
+        return importer
+
+    def legacy_workbook(self):
+        return self.workbook(
+            members=[
+                ['Kiran Shakya', 'Buddha', 'OLD-1', 'WB-CIT-1', 'ANNUAL'],
+                ['Laxmi Shakya', 'Buddha', 'OLD-2', '', 'ANNUAL'],
+            ],
+            children=[['OLD-1', 'Anish Shakya', date(2015, 3, 4)], ['OLD-2', 'Asha Shakya', None]],
+            payments=[['OLD-1', date(2024, 1, 5), 1200, None], ['OLD-2', date(2024, 2, 5), None, 'LEGACY-9']],
+        )
+
+    def test_import_links_sheets(self):
+        importer = self.run_import(self.legacy_workbook())
+        self.assertEqual((importer.success_count, importer.children_count, importer.payments_count), (2, 2, 2))
+        kiran = Member.objects.get(membership_number='OLD-1')
+        self.assertEqual(list(kiran.children.values_list('name', flat=True)), ['Anish Shakya'])
+        self.assertEqual((kiran.total_paid, kiran.payment_count), (Decimal('1200'), 1))
+        self.assertEqual(kiran.membership_valid_until, date(2025, 1, 5))
+
+    def test_reimport_adds_nothing(self):
+        self.run_import(self.legacy_workbook())
+        counts = (Member.objects.count(), Child.objects.count(), Payment.objects.count())
+
+        importer = self.run_import(self.legacy_workbook())
+        self.assertEqual((Member.objects.count(), Child.objects.count(), Payment.objects.count()), counts)
+        self.assertEqual((importer.success_count, importer.children_count, importer.payments_count), (0, 0, 0))
+        self.assertEqual(importer.already_imported_count, 6)
+        self.assertEqual(importer.error_count, 0)
+        self.assertEqual(Member.objects.get(membership_number='OLD-1').payment_count, 1)
+
+    def test_progress_counts_every_sheet(self):
+        file = self.legacy_workbook()
+        self.assertEqual(count_rows(file, 'xlsx'), 6)
+        seen = []
+        importer = WorkbookImport()
+        importer.import_workbook(file, chunk_size=1, progress=lambda importer: seen.append(importer.processed_rows))
+        self.assertEqual(seen, [1, 2, 3, 4, 5, 6])
+
+    def test_progress_update_on_given_connection(self):
+        job = ImportJob.objects.create(file_name='book.xlsx', file_type='xlsx', status='RUNNING')
+        _update_on(connection, ImportJob.objects.filter(pk=job.pk), processed_rows=4, errors=['Row 2: bad'])
+        job.refresh_from_db()
+        self.assertEqual((job.processed_rows, job.errors), (4, ['Row 2: bad']))
+
+    def test_number_of_another_member_is_rejected(self):
+        self.run_import(self.legacy_workbook())
+        importer = self.run_import(self.workbook(
+            members=[['Mohan Tuladhar', 'Gopal', 'OLD-1', 'WB-CIT-9', 'ANNUAL']],
+            children=[['OLD-1', 'Manish Tuladhar', None]],
+            payments=[['OLD-1', date(2024, 3, 5), 1200, None]],
+        ))
+        self.assertEqual(importer.errors, [
+            'Row 2: Membership number OLD-1 already belongs to another member.',
+            'Children row 2: Member OLD-1 was not imported (see the Members sheet).',
+            'Payments row 2: Member OLD-1 was not imported (see the Members sheet).',
+        ])
+        kiran = Member.objects.get(membership_number='OLD-1')
+        self.assertEqual((kiran.children.count(), kiran.payment_count), (1, 1))
+        self.assertFalse(Member.objects.filter(name='Mohan Tuladhar').exists())
+
+
+    def test_repeated_number_in_sheet_keeps_first_row(self):
+        for chunk_size in (None, 1):
+            Member.objects.all().delete()
+            importer = WorkbookImport()
+            importer.import_workbook(self.workbook(
+                members=[
+                    ['Kiran Shakya', 'Buddha', 'OLD-1', 'WB-CIT-1', 'ANNUAL'],
+                    ['Rita Bajracharya', 'Ratna', 'OLD-1', 'WB-CIT-2', 'ANNUAL'],
+                ],
+                children=[['OLD-1', 'Anish Shakya', None]],
+            ), chunk_size=chunk_size)
+            self.assertEqual(importer.errors, [
+                'Row 3: Membership number OLD-1 appears more than once in the Members sheet.',
+            ])
+            kiran = Member.objects.get(membership_number='OLD-1')
+            self.assertEqual(kiran.name, 'Kiran Shakya')
+            self.assertEqual(list(kiran.children.values_list('name', flat=True)), ['Anish Shakya'])
+            self.assertFalse(Member.objects.filter(name='Rita Bajracharya').exists())
+
+    def test_rollback_resets_counts(self):
+        self.run_import(self.legacy_workbook())
+        importer = WorkbookImport()
+        with mock.patch.object(importer, 'import_payments', side_effect=DatabaseError('boom')):
+            importer.import_workbook(self.legacy_workbook())
+        self.assertTrue(importer.stopped)
+        self.assertEqual(importer.already_imported_count, 0)
+
+
+class ScorePairTests(SimpleTestCase):
+    """Pair scores behind duplicate detection"""
+
+    def member(self, name, father_name='Hari Shrestha', **fields):
+        return Member(name=name, father_name=father_name, **fields)
+
+    def test_spelling_and_script_variants_score_high(self):
+        score, reasons = score_pair(self.member('Ram Shrestha'), self.member('Raam Srestha'))
+        self.assertGreaterEqual(score, DUPLICATE_THRESHOLD)
+        self.assertEqual(reasons, ['name 100% alike', "father's name 100% alike"])
+        score, _ = score_pair(self.member('Ram Shrestha'), self.member('राम श्रेष्ठ'))
+        self.assertGreaterEqual(score, DUPLICATE_THRESHOLD)
+
+    def test_relatives_sharing_a_surname_score_low(self):
+        score, _ = score_pair(self.member('Ram Shrestha'), self.member('Sita Shrestha'))
+        self.assertLess(score, DUPLICATE_THRESHOLD)
+
+    def test_shared_identifiers_and_birth_dates(self):
+        a = self.member('Ram Shrestha', citizenship_number='12-01-345', date_of_birth=date(1980, 1, 1))
+        b = self.member('R. Shrestha', father_name='', citizenship_number='12 01 345', date_of_birth=date(1980, 1, 1))
+        score, reasons = score_pair(a, b)
+        self.assertGreaterEqual(score, 0.9)
+        self.assertIn('same citizenship number', reasons)
+        self.assertIn('same date of birth', reasons)
+
+        b.date_of_birth = date(1985, 6, 6)
+        lower, reasons = score_pair(a, b)
+        self.assertLess(lower, score)
+        self.assertIn('different date of birth', reasons)
+
+    def test_placeholders_are_never_shared(self):
+        a = self.member('Ram Shrestha', phone='TEMPABC1', email='noemail.nssmem00001@placeholder.com')
+        b = self.member('Shyam Shrestha', phone='TEMPABC1', email='noemail.nssmem00001@placeholder.com')
+        score, reasons = score_pair(a, b)
+        self.assertNotIn('same phone', reasons)
+        self.assertNotIn('same email', reasons)
+        self.assertEqual(score, score_pair(self.member('Ram Shrestha'), self.member('Shyam Shrestha'))[0])
+        self.assertEqual(member_blocking_keys(a) & member_blocking_keys(b), set())
+
+
+class DuplicateDetectionTests(TestCase):
+    """Members are re-checked against their blocks when saved"""
+
+    def create(self, number, name, **fields):
+        defaults = dict(
+            phone=f'98100{number:05d}', address='Patan', father_name='Hari Shrestha',
+            membership_number=f'NSS-DUP-{number}', citizenship_number=f'DUP-CIT-{number}',
+        )
+        return Member.objects.create(name=name, **{**defaults, **fields})
+
+    def test_finds_sound_alike_members(self):
+        ram = self.create(1, 'Ram Shrestha')
+        raam = self.create(2, 'Raam Srestha')
+        self.create(3, 'Sita Shrestha')
+        candidate = DuplicateCandidate.objects.get()
+        self.assertEqual((candidate.member_a_id, candidate.member_b_id), (ram.pk, raam.pk))
+        self.assertGreaterEqual(candidate.score, DUPLICATE_THRESHOLD * 100)
+
+    def test_placeholder_phones_and_emails_do_not_pair_members(self):
+        # The same pair with a real shared phone and email is flagged
+        self.create(4, 'Ram Shrestha', phone='9819999999', father_name='Gopal', email='ram@example.com')
+        self.create(5, 'Ram Shrestha', phone='9819999999', father_name='Krishna', email='ram@example.com')
+        self.assertEqual(DuplicateCandidate.objects.count(), 1)
+
+        self.create(6, 'Hari Shrestha', phone='TEMPXYZ1', father_name='Gopal', email='noemail.a@placeholder.com')
+        self.create(7, 'Hari Shrestha', phone='TEMPXYZ1', father_name='Krishna', email='noemail.a@placeholder.com')
+        self.assertEqual(DuplicateCandidate.objects.count(), 1)
+
+    def test_recheck_keeps_dismissed_pairs(self):
+        ram = self.create(10, 'Ram Shrestha')
+        self.create(11, 'Raam Srestha')
+        DuplicateCandidate.objects.update(status='DISMISSED')
+        self.assertEqual(find_duplicates_of([ram.pk]), 1)
+        self.assertEqual(list(DuplicateCandidate.objects.values_list('status', flat=True)), ['DISMISSED'])
+
+    def test_recheck_drops_resolved_pairs(self):
+        ram = self.create(8, 'Ram Shrestha')
+        raam = self.create(9, 'Raam Srestha')
+        raam.name = 'Bikash Bajracharya'
+        raam.father_name = 'Mohan'
+        raam.save()
+        self.assertFalse(DuplicateCandidate.objects.exists())
+        self.assertEqual(find_duplicates_of([ram.pk]), 0)
+
+
+class QueryPlanTests(TestCase):
+    """
+    Filtered queries behind the dashboard, lists and reports must use an index.
+    Every SELECT issued while rendering a page is re-run under EXPLAIN and the
+    test fails if it reads one of the large tables in full, through an index
+    or not, unless it walks an index in order to fetch the first rows.
+    """
+    LARGE_TABLES = {
+        'membership_member', 'membership_payment', 'membership_child',
+        'membership_membersearchtoken', 'membership_calendarday', 'membership_memberdues',
+    }
+    MEMBER_COUNT = 600
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser('planner', 'planner@example.com', 'pw')
+        fee = MembershipFee.objects.create(
+            membership_type='REGULAR', payment_frequency='ANNUAL', amount=Decimal('1000')
+        )
+        start = date(2015, 1, 1)
+        members = Member.objects.bulk_create([
+            Member(
+                name=f'Member {i}', phone=f'98{i:08d}', address='Kathmandu', father_name='Father',
+                membership_number=f'NSS-MEM-{i:05d}', citizenship_number=f'CIT-{i}',
+                membership_type=('REGULAR', 'LIFETIME', 'HONARARY')[i % 3],
+                is_active=i % 10 != 0,
+                join_date=start + timedelta(days=i * 5),
+                membership_valid_until=start + timedelta(days=i * 7),
+                date_of_birth=date(1980, 1, 1) + timedelta(days=i * 11),
+            )
+            for i in range(cls.MEMBER_COUNT)
+        ])
+        index_member_search_tokens(members)
+        Payment.objects.bulk_create([
+            Payment(
+                member=member, membership_fee=fee, amount=Decimal('1000'),
+                payment_date=member.join_date + timedelta(days=offset),
+                payment_mode=('CASH', 'BANK_TRANSFER')[offset % 2],
+                receipt_number=f'NSS-{member.pk}-{offset}',
+            )
+            for member in members
+            for offset in (0, 365)
+        ])
+        refresh_member_dues()
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def capture_selects(self, url):
+        """(sql, params) of every SELECT run while rendering the page"""
+        statements = []
+
+        def record(execute, sql, params, many, context):
+            if sql.lstrip().upper().startswith('SELECT'):
+                statements.append((sql, params))
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(record):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        return statements
+
+    def full_scans(self, sql, params):
+        """
+        Large tables the database would read in full to run this statement.
+        Walking an index in order is allowed only for a LIMITed query the index
+        already sorts, which stops after the first rows (a list's first page).
+        """
+        ordered_limit = ' LIMIT ' in sql
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+                details = [row[-1] for row in cursor.fetchall()]
+                ordered_limit &= not any('TEMP B-TREE' in detail for detail in details)
+                return {
+                    match.group(1) for match in
+                    (re.match(r'SCAN (\w+)( USING (?:COVERING )?INDEX \w+)?$', detail) for detail in details)
+                    if match and not (match.group(2) and ordered_limit)
+                } & self.LARGE_TABLES
+            if connection.vendor == 'mysql':
+                cursor.execute('EXPLAIN ' + sql, params)
+                columns = [col[0] for col in cursor.description]
+                rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+                ordered_limit &= not any('filesort' in (row['Extra'] or '') for row in rows)
+                return {
+                    row['table'] for row in rows
+                    if row['type'] == 'ALL' or (row['type'] == 'index' and not ordered_limit)
+                } & self.LARGE_TABLES
+            if connection.vendor == 'postgresql':
+                cursor.execute('SET LOCAL enable_seqscan = off')
+                cursor.execute('EXPLAIN ' + sql, params)
+                plan = '\n'.join(row[0] for row in cursor.fetchall())
+                return set(re.findall(r'Seq Scan on (\w+)', plan)) & self.LARGE_TABLES
+        self.skipTest(f'No query plan check for {connection.vendor}')
+
+    def indexes_used(self, sql, params):
+        """Names of the indexes the database picks to run this statement"""
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+                return set(re.findall(r'USING (?:COVERING )?INDEX (\w+)', ' '.join(row[-1] for row in cursor.fetchall())))
+            if connection.vendor == 'mysql':
+                cursor.execute('EXPLAIN ' + sql, params)
+                columns = [col[0] for col in cursor.description]
+                return {dict(zip(columns, row))['key'] for row in cursor.fetchall()} - {None}
+            if connection.vendor == 'postgresql':
+                cursor.execute('EXPLAIN ' + sql, params)
+                return set(re.findall(r'Index (?:Only )?Scan using (\w+)', '\n'.join(row[0] for row in cursor.fetchall())))
+        self.skipTest(f'No query plan check for {connection.vendor}')
+
+    def assertIndexed(self, url):
+        # Cache fills (dashboard totals, list counts) read whole tables by
+        # design; check what every other request runs
+        self.client.get(url)
+        for sql, params in self.capture_selects(url):
+            scanned = self.full_scans(sql, params)
+            self.assertFalse(scanned, f'{url} scans {sorted(scanned)} for:\n{sql}')
+
+    def test_full_scans_include_index_walks(self):
+        count = Member.objects.filter(is_active=True).order_by().values('id')
+        first_page = Member.objects.order_by('-join_date', '-id')[:20]
+        self.assertEqual(self.full_scans(*count.query.sql_with_params()), {'membership_member'})
+        self.assertEqual(self.full_scans(*first_page.query.sql_with_params()), set())
+
+    def test_dashboard(self):
+        self.assertIndexed('/')
+
+    def test_dashboard_birthdays_seek_birthday_key(self):
+        birthday_queries = [
+            (sql, params) for sql, params in self.capture_selects('/')
+            if '"birthday_key" IN' in sql.replace('`', '"') and 'membership_child' not in sql
+        ]
+        self.assertEqual(len(birthday_queries), 1)
+        self.assertIn('member_birthday_idx', self.indexes_used(*birthday_queries[0]))
+
+    def test_member_list(self):
+        self.assertIndexed('/members/')
+        self.assertIndexed('/members/?type=REGULAR&status=active')
+        self.assertIndexed('/members/?search=Member 12')
+        self.assertIndexed('/members/?search=Member&type=LIFETIME&status=active&after=20')
+
+    def test_member_search_seeks_token_index(self):
+        token_queries = [
+            (sql, params) for sql, params in self.capture_selects('/members/?search=Member 12')
+            if 'membership_membersearchtoken' in sql
+        ]
+        self.assertTrue(token_queries)
+        for sql, params in token_queries:
+            self.assertIn('member_search_token_idx', self.indexes_used(sql, params), sql)
+
+    def test_payment_list(self):
+        self.assertIndexed('/payments/?start_date=2016-01-01&end_date=2016-03-31&payment_mode=CASH')
+
+    def test_revenue_report(self):
+        self.assertIndexed('/reports/revenue/?start_date=2016-01-01&end_date=2016-03-31')
+
+    def test_renewal_and_expiry_reports(self):
+        self.assertIndexed('/reports/renewal-required/')
+        self.assertIndexed('/reports/membership-expiry/?status=expired')
+
+    def test_new_members_report(self):
+        self.assertIndexed('/reports/new-members/?start_date=2016-01-01&end_date=2016-03-31')
+
+    def test_arrears_report(self):
+        self.assertIndexed('/reports/arrears/')
+        self.assertIndexed('/reports/arrears/?frequency=ANNUAL&page=2')
+
+
+class KeysetPaginatorTests(TestCase):
+    """Seek pagination over rows sharing a date, and cursors it cannot use"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser('pager', 'pager@example.com', 'pw')
+        for i, joined in enumerate([date(2024, 1, 1)] * 3 + [date(2023, 6, 1)] * 3 + [date(2022, 1, 1)]):
+            Member.objects.create(
+                name=f'Page Member {i}', phone=f'98200000{i:02d}', address='Lalitpur', father_name='Hari',
+                membership_number=f'NSS-PG-{i}', citizenship_number=f'CIT-PG-{i}', join_date=joined,
+            )
+        cls.expected = list(Member.objects.order_by('-join_date', '-id').values_list('pk', flat=True))
+
+    def paginator(self):
+        return KeysetPaginator(Member.objects.all(), 'join_date', per_page=2)
+
+    def test_after_walks_every_row_once_across_ties(self):
+        seen, page = [], self.paginator().page()
+        self.assertFalse(page.has_previous)
+        while True:
+            seen += [member.pk for member in page]
+            if not page.has_next:
+                break
+            page = self.paginator().page(after=page.next_cursor)
+            self.assertTrue(page.has_previous)
+        self.assertEqual(seen, self.expected)
+
+    def test_last_and_before_walk_back_across_ties(self):
+        page = self.paginator().page(last=True)
+        self.assertEqual([member.pk for member in page], self.expected[5:])
+        self.assertEqual((page.has_next, page.has_previous), (False, True))
+
+        page = self.paginator().page(before=page.previous_cursor)
+        self.assertEqual([member.pk for member in page], self.expected[3:5])
+        page = self.paginator().page(before=page.previous_cursor)
+        self.assertEqual([member.pk for member in page], self.expected[1:3])
+        # One row left before this page: show the full first page instead
+        page = self.paginator().page(before=page.previous_cursor)
+        self.assertEqual([member.pk for member in page], self.expected[:2])
+        self.assertFalse(page.has_previous)
+
+    def test_out_of_range_cursors_are_ignored(self):
+        for cursor in ('2024-01-01.99999999999999999999', '2024-01-01.-1', '2024-13-01.1', 'junk', ''):
+            self.assertIsNone(KeysetPaginator.parse_cursor(cursor), msg=cursor)
+            page = self.paginator().page(after=cursor)
+            self.assertEqual([member.pk for member in page], self.expected[:2])
+        self.assertEqual(KeysetPaginator.parse_cursor('2024-01-01.5'), (date(2024, 1, 1), 5))
+
+        for cursor in ('99999999999999999999', '-1', 'junk', None):
+            self.assertIsNone(RankedPaginator.parse_cursor(cursor), msg=cursor)
+        self.assertEqual(RankedPaginator.parse_cursor('40'), 40)
+
+        self.client.force_login(self.user)
+        for url in (
+            '/members/?after=2024-01-01.99999999999999999999',
+            '/members/?before=2024-01-01.99999999999999999999',
+            '/members/?search=page&after=99999999999999999999',
+            '/payments/?after=2024-01-01.99999999999999999999',
+        ):
+            self.assertEqual(self.client.get(url).status_code, 200, url)
+
+
+class MemberSearchTests(TestCase):
+    """Ranked member search, filtered and paged by the member list"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser('searcher', 'searcher@example.com', 'pw')
+        for i in range(45):
+            Member.objects.create(
+                name=f'Ram Shrestha {i}', phone=f'98{i:08d}', address='Lalitpur', father_name='Hari',
+                membership_number=f'NSS-S-{i:03d}', citizenship_number=f'CIT-{i}',
+                membership_type=('REGULAR', 'LIFETIME')[i % 2],
+                is_active=i % 5 != 0,
+            )
+        Member.objects.create(
+            name='Ramesh Pradhan', phone='9811111111', address='Bhaktapur', father_name='Ram',
+            membership_number='NSS-S-999', citizenship_number='CIT-R', membership_type='REGULAR',
+        )
+
+    def test_filters_apply_before_ranking(self):
+        lifetime = Member.objects.filter(membership_type='LIFETIME', is_active=True)
+        ranked = search_members('ram', lifetime, limit=100)
+        self.assertEqual(set(ranked), set(lifetime.values_list('pk', flat=True)))
+        self.assertEqual(count_search_members('ram', lifetime), len(ranked))
+
+    def test_terms_ending_in_9_or_z(self):
+        aziz = Member.objects.create(
+            name='Aziz Maharjan', phone='9849999999', address='Kirtipur', father_name='Hari',
+            membership_number='NSS-S-1009', citizenship_number='CIT-Z',
+        )
+        self.assertEqual(search_members('aziz'), [aziz.pk])
+        self.assertEqual(search_members('Azi'), [aziz.pk])
+        self.assertEqual(search_members('98499'), [aziz.pk])
+        self.assertEqual(search_members('9800000009'), [Member.objects.get(name='Ram Shrestha 9').pk])
+
+    def test_prefix_filter_outside_sqlite_uses_like(self):
+        # MySQL's default collations do not sort by code point, so no range there
+        with mock.patch.object(connection, 'vendor', 'mysql'):
+            self.assertEqual(prefix_filter('token', 'aziz'), Q(token__istartswith='aziz'))
+        self.assertEqual(prefix_filter('token', 'aziz'), Q(token__gte='aziz', token__lt='azi{'))
+
+    def test_child_admin_finds_other_spellings(self):
+        member = Member.objects.get(name='Ramesh Pradhan')
+        sanjay = Child.objects.create(member=member, name='Sanjay Pradhan', date_of_birth=date(2015, 5, 5))
+        Child.objects.create(member=member, name='Sanju Pradhan', date_of_birth=date(2017, 5, 5))
+        # The skeleton ends in 'y', the last letter a skeleton can hold
+        self.assertEqual(list(Child.objects.filter(phonetic_key_filter('Sanjaya'))), [sanjay])
+        with mock.patch.object(connection, 'vendor', 'mysql'):
+            self.assertEqual(phonetic_key_filter('Sanjaya'), Q(phonetic_key__istartswith='snjy'))
+
+        self.client.force_login(self.user)
+        response = self.client.get('/admin/membership/child/', {'q': 'संजय'})
+        self.assertEqual(list(response.context['cl'].result_list), [sanjay])
+
+    def test_exact_name_token_outranks_prefix(self):
+        ranked = search_members('ram')
+        self.assertEqual(len(ranked), 46)
+        self.assertEqual(ranked[-1], Member.objects.get(name='Ramesh Pradhan').pk)
+
+    def test_member_list_pages_ranked_results(self):
+        self.client.force_login(self.user)
+        seen = []
+        url = '/members/?search=shrestha'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.context['total_count'], 45)
+            page = response.context['members']
+            seen += [member.pk for member in page]
+            url = f'/members/?search=shrestha&after={page.next_cursor}' if page.has_next else None
+        self.assertEqual(seen, search_members('shrestha'))
+
+        last = self.client.get('/members/?search=shrestha&last=1').context['members']
+        self.assertEqual(len(last), 5)
+        self.assertTrue(last.has_previous)
+        previous = self.client.get(f'/members/?search=shrestha&before={last.previous_cursor}').context['members']
+        self.assertEqual([member.pk for member in previous], seen[20:40])
+
+        filtered = self.client.get('/members/?search=shrestha&type=REGULAR&status=inactive')
+        self.assertEqual(
+            {member.pk for member in filtered.context['members']},
+            set(Member.objects.filter(
+                name__startswith='Ram Shrestha', membership_type='REGULAR', is_active=False
+            ).values_list('pk', flat=True)),
+        )
+
+
+    def test_member_lookup_returns_active_matches_with_fees(self):
+        fee = MembershipFee.objects.create(membership_type='REGULAR', payment_frequency='ANNUAL', amount=1200)
+        self.client.force_login(self.user)
+        results = self.client.get('/members/lookup/', {'q': '9800000009'}).json()['results']
+        member = Member.objects.get(name='Ram Shrestha 9')
+        self.assertEqual(results, [{
+            'id': member.pk,
+            'name': 'Ram Shrestha 9',
+            'membership_number': 'NSS-S-009',
+            'phone': '9800000009',
+            'membership_type': 'LIFETIME',
+            'membership_type_display': 'Lifetime Membership',
+            'payment_frequency': 'ANNUAL',
+            'payment_frequency_display': 'Annual',
+            'fees': [],
+        }])
+
+        results = self.client.get('/members/lookup/', {'q': 'Ramesh'}).json()['results']
+        self.assertEqual([row['name'] for row in results], ['Ramesh Pradhan'])
+        self.assertEqual(results[0]['fees'], [{'id': fee.pk, 'label': 'Regular - Annual: NPR 1200.00', 'amount': '1200.00'}])
+
+    def test_member_lookup_limits_and_skips_inactive(self):
+        self.client.force_login(self.user)
+        results = self.client.get('/members/lookup/', {'q': 'shrestha'}).json()['results']
+        self.assertEqual(len(results), MEMBER_LOOKUP_LIMIT)
+        self.assertTrue(all(Member.objects.get(pk=row['id']).is_active for row in results))
+        # Ram Shrestha 10 is inactive, so its number prefix matches nothing
+        self.assertEqual(self.client.get('/members/lookup/', {'q': '9800000010'}).json(), {'results': []})
+        self.assertEqual(self.client.get('/members/lookup/', {'q': 'r'}).json(), {'results': []})
+
+        aziz = Member.objects.create(
+            name='Aziz Maharjan', phone='9849999999', address='Kirtipur', father_name='Hari',
+            membership_number='NSS-S-1009', citizenship_number='CIT-Z',
+        )
+        for query in ('aziz', 'Azi', '98499'):
+            results = self.client.get('/members/lookup/', {'q': query}).json()['results']
+            self.assertEqual([row['id'] for row in results], [aziz.pk])
+
+
+class MemberDetailQueryTests(TestCase):
+    """The member detail page runs the same queries however long the history is"""
+    # Session, user, member, children, payments (with their fees)
+    EXPECTED_QUERIES = 5
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser('detail', 'detail@example.com', 'pw')
+        cls.fee = MembershipFee.objects.create(
+            membership_type='REGULAR', payment_frequency='ANNUAL', amount=Decimal('500')
+        )
+        cls.member = Member.objects.create(
+            name='Detail Member', phone='9800000000', address='Lalitpur', father_name='Father',
+            membership_number='NSS-MEM-90001', citizenship_number='CIT-90001',
+        )
+        Child.objects.create(member=cls.member, name='Detail Child', date_of_birth=date(2015, 5, 5))
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def add_payments(self, count):
+        for i in range(count):
+            Payment.objects.create(
+                member=self.member, membership_fee=self.fee, amount=Decimal('500'),
+                payment_date=date(2020, 1, 1) + timedelta(days=i), payment_mode='CASH',
+            )
+
+    def test_query_count_does_not_grow_with_payments(self):
+        url = f'/members/{self.member.pk}/'
+        for batch in (0, 1, 10):
+            self.add_payments(batch)
+            with self.assertNumQueries(self.EXPECTED_QUERIES):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(response.context['total_paid'], Decimal('5500.00'))
+        self.assertTrue(response.context['expiry_status']['has_paid'])
@@ -25,6 +25,7 @@ urlpatterns = [
     path('members/<int:pk>/', views.member_detail, name='member_detail'),
     path('members/<int:pk>/edit/', views.member_edit, name='member_edit'),
     path('members/<int:pk>/delete/', views.member_delete, name='member_delete'),
+    path('members/lookup/', views.member_lookup, name='member_lookup'),
     
     # Payments
     path('payments/', views.payment_list, name='payment_list'),
@@ -44,6 +45,8 @@ urlpatterns = [
     path('reports/renewal-required/', views.renewal_required_report, name='renewal_required_report'),
     path('reports/membership-expiry/', views.membership_expiry_report, name='membership_expiry_report'),
     path('reports/new-members/', views.new_members_report, name='new_members_report'),
+    path('reports/arrears/', views.arrears_report, name='arrears_report'),
     path('members/bulk-upload/', views.bulk_upload_members, name='bulk_upload_members'),
+    path('members/bulk-upload/jobs/<int:pk>/progress/', views.import_job_progress, name='import_job_progress'),
     path('members/bulk-upload/template/', views.download_template, name='download_template'),
 ]
\ No newline at end of file
@@ -2,17 +2,26 @@ from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.auth import login, logout, authenticate
 from django.contrib import messages
-from django.db.models import Sum, Count, Q
-from django.http import HttpResponse
+from django.db.models import Sum, Count, Min, Q, Prefetch
+from django.core.paginator import Paginator
+from django.http import HttpResponse, JsonResponse
+from django.urls import reverse
 from django.utils import timezone
-from .models import Member, Child, MembershipFee, Payment, UserProfile
+from .models import (
+    Member, Child, MembershipFee, Payment, UserProfile, ImportJob, MemberDues,
+    get_upcoming_birthdays, get_dashboard_stats, search_members,
+    count_search_members
+)
+from .importer import validate_file, validation_report_xlsx
+from .arrears import member_dues_stale
+from .nepali_date import NepaliDate
 from .forms import (
     LoginForm, RegisterForm, MemberForm, ChildFormSet, 
     MembershipFeeForm, PaymentForm
 )
 from datetime import datetime, timedelta
+from decimal import Decimal
 
-import pandas as pd
 import openpyxl
 from io import BytesIO
 from django.core.exceptions import ValidationError
@@ -86,70 +95,17 @@ def pending_approval(request):
 def home(request):
     """Enhanced dashboard with statistics, upcoming birthdays, and insights"""
     
-    # Calculate statistics
-    total_members = Member.objects.filter(is_active=True).count()
-    regular_members = Member.objects.filter(
-        is_active=True, 
-        membership_type='REGULAR'
-    ).count()
-    lifetime_members = Member.objects.filter(
-        is_active=True, 
-        membership_type='LIFETIME'
-    ).count()
-    honarary_members = Member.objects.filter(
-        is_active=True, 
-        membership_type='HONORARY'
-    ).count()
-    
-    total_revenue = Payment.objects.aggregate(
-        total=Sum('amount')
-    )['total'] or 0
-    
-    # Calculate percentages
-    if total_members > 0:
-        regular_percentage = round((regular_members / total_members * 100), 1)
-        lifetime_percentage = round((lifetime_members / total_members * 100), 1)
-        honarary_percentage = round((honarary_members / total_members * 100), 1)
-    else:
-        regular_percentage = 0
-        lifetime_percentage = 0
-        honarary_percentage = 0
+    # Statistics come from one aggregate query, cached until members/payments change
+    stats = get_dashboard_stats()
     
-    # Get upcoming birthdays (next 7 days)
+    # Get upcoming birthdays (next 7 days) from the indexed birthday key
     today = timezone.now().date()
-    upcoming_birthdays = []
-    
-    # Get all members with birthdates
-    members = Member.objects.filter(
-        is_active=True,
-        date_of_birth__isnull=False
+    upcoming_birthdays = get_upcoming_birthdays(
+        Member.objects.filter(is_active=True), today
+    )
+    upcoming_child_birthdays = get_upcoming_birthdays(
+        Child.objects.filter(member__is_active=True).select_related('member'), today
     )
-    
-    for member in members:
-        # Calculate this year's birthday
-        try:
-            birthday_this_year = member.date_of_birth.replace(year=today.year)
-        except ValueError:
-            # Handle leap year babies (Feb 29)
-            birthday_this_year = member.date_of_birth.replace(year=today.year, day=28)
-        
-        # If birthday already passed this year, use next year
-        if birthday_this_year < today:
-            try:
-                birthday_this_year = member.date_of_birth.replace(year=today.year + 1)
-            except ValueError:
-                birthday_this_year = member.date_of_birth.replace(year=today.year + 1, day=28)
-        
-        # Calculate days until birthday
-        days_until = (birthday_this_year - today).days
-        
-        # Include if within next 7 days
-        if 0 <= days_until <= 7:
-            member.days_until_birthday = days_until
-            upcoming_birthdays.append(member)
-    
-    # Sort by days until birthday
-    upcoming_birthdays.sort(key=lambda x: x.days_until_birthday)
     
     # Get recent payments (last 5)
     recent_payments = Payment.objects.select_related(
@@ -174,41 +130,22 @@ def home(request):
             member.days_remaining = 0
     
     context = {
-        'stats': {
-            'total_members': total_members,
-            'active_members': total_members,
-            'regular_members': regular_members,
-            'lifetime_members': lifetime_members,
-            'honarary_members': honarary_members,
-            'total_revenue': total_revenue,
-            'regular_percentage': regular_percentage,
-            'lifetime_percentage': lifetime_percentage,
-            'honarary_percentage': honarary_percentage,
-        },
+        'stats': stats,
         'upcoming_birthdays': upcoming_birthdays[:10],  # Show max 10
+        'upcoming_child_birthdays': upcoming_child_birthdays[:10],
         'recent_payments': recent_payments,
         'expiring_soon': expiring_soon,
     }
     
     return render(request, 'membership/home.html', context)
 
-from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
+from .pagination import KeysetPaginator, RankedPaginator, cached_aggregate
 
 @login_required
 def member_list(request):
     """List all members with search, filter, and pagination"""
     members = Member.objects.all()
     
-    # Search
-    search_query = request.GET.get('search', '')
-    if search_query:
-        members = members.filter(
-            Q(name__icontains=search_query) |
-            Q(membership_number__icontains=search_query) |
-            Q(phone__icontains=search_query) |
-            Q(email__icontains=search_query)
-        )
-    
     # Filter by membership type
     membership_type = request.GET.get('type', '')
     if membership_type:
@@ -221,26 +158,45 @@ def member_list(request):
     elif status == 'inactive':
         members = members.filter(is_active=False)
     
+    # Search (token index, best matches first among the filtered members)
+    search_query = request.GET.get('search', '')
+    if search_query:
+        # Also finds other spellings / scripts of a member's or child's name
+        def fetch(offset, limit):
+            ranked_ids = search_members(search_query, members, offset=offset, limit=limit)
+            found = members.in_bulk(ranked_ids)
+            return [found[pk] for pk in ranked_ids if pk in found]
+        
+        total_count = count_search_members(search_query, members)
+        return render(request, 'membership/member_list.html', {
+            'members': RankedPaginator(fetch, per_page=20).page(
+                after=request.GET.get('after'),
+                before=request.GET.get('before'),
+                last=request.GET.get('last') == '1',
+                count=total_count,
+            ),
+            'search_query': search_query,
+            'membership_type': membership_type,
+            'status': status,
+            'total_count': total_count,
+        })
+    
     # Order by most recent
     members = members.order_by('-join_date', '-id')
     
-    # Pagination - 20 members per page
-    paginator = Paginator(members, 20)  # Change number as needed
-    page = request.GET.get('page', 1)
-    
-    try:
-        members_page = paginator.page(page)
-    except PageNotAnInteger:
-        members_page = paginator.page(1)
-    except EmptyPage:
-        members_page = paginator.page(paginator.num_pages)
+    # Keyset pagination - 20 members per page, seeking on (join_date, id)
+    members_page = KeysetPaginator(members, 'join_date', per_page=20).page(
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+        last=request.GET.get('last') == '1',
+    )
     
     context = {
         'members': members_page,
         'search_query': search_query,
         'membership_type': membership_type,
         'status': status,
-        'total_count': paginator.count,  # Total number of members
+        'total_count': cached_aggregate(members, count=Count('id'))['count'],  # Total number of members
     }
     
     return render(request, 'membership/member_list.html', context)
@@ -248,16 +204,26 @@ def member_list(request):
 
 @login_required
 def member_detail(request, pk):
-    member = get_object_or_404(Member, pk=pk)
-    children = member.children.all()
-    payments = Payment.objects.filter(member=member).order_by('-payment_date')
+    # Member, children and payments (with their fees) in a fixed three queries
+    member = get_object_or_404(
+        Member.objects.prefetch_related(
+            'children',
+            Prefetch(
+                'payments',
+                queryset=Payment.objects.select_related('membership_fee').order_by('-payment_date', '-id')
+            ),
+        ),
+        pk=pk
+    )
+    children = list(member.children.all())
+    payments = list(member.payments.all())
     
     # Calculate membership expiry status
     from django.utils import timezone
     today = timezone.now().date()
     
     expiry_status = {
-        'has_paid': payments.exists(),  # Has made any payment
+        'has_paid': bool(payments),  # Has made any payment
         'is_lifetime': member.membership_type == 'LIFETIME',
         'has_expiry': False,
         'is_expired': False,
@@ -318,7 +284,7 @@ def member_detail(request, pk):
         'member': member,
         'children': children,
         'payments': payments,
-        'total_paid' : member.get_total_paid(),
+        'total_paid' : sum((payment.amount for payment in payments), Decimal('0.00')),
         'expiry_status': expiry_status,  # Add this
     }
     
@@ -413,12 +379,20 @@ def payment_list(request):
     if payment_mode:
         payments = payments.filter(payment_mode=payment_mode)
     
-    # Calculate totals
-    total_amount = payments.aggregate(total=Sum('amount'))['total'] or 0
+    # Calculate totals (cached briefly, the table can be large)
+    totals = cached_aggregate(payments, total=Sum('amount'), count=Count('id'))
+    
+    # Keyset pagination - 50 payments per page, seeking on (payment_date, id)
+    payments_page = KeysetPaginator(payments.select_related('member'), 'payment_date', per_page=50).page(
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+        last=request.GET.get('last') == '1',
+    )
     
     context = {
-        'payments': payments.order_by('-payment_date'),
-        'total_amount': total_amount,
+        'payments': payments_page,
+        'total_amount': totals['total'] or 0,
+        'payment_count': totals['count'],
         'start_date': start_date,
         'end_date': end_date,
         'payment_mode': payment_mode,
@@ -426,6 +400,59 @@ def payment_list(request):
     return render(request, 'membership/payment_list.html', context)
 
 
+# Results returned by the payment form's member lookup
+MEMBER_LOOKUP_LIMIT = 10
+
+
+@login_required
+def member_lookup(request):
+    """
+    JSON typeahead for picking a member on the payment form.
+    Searches active members by name, membership number or phone through the
+    search index and returns each match with the fees that apply to them.
+    """
+    query = request.GET.get('q', '').strip()
+    if len(query) < 2:
+        return JsonResponse({'results': []})
+    
+    active = Member.objects.filter(is_active=True)
+    ranked_ids = search_members(query, active, limit=MEMBER_LOOKUP_LIMIT)
+    found = active.only(
+        'id', 'name', 'membership_number', 'phone', 'membership_type', 'payment_frequency'
+    ).in_bulk(ranked_ids)
+    members = [found[pk] for pk in ranked_ids if pk in found]
+    
+    # Active fees for the matched (type, frequency) pairs, in one query
+    fees_by_terms = {}
+    terms = {(member.membership_type, member.payment_frequency) for member in members}
+    if terms:
+        fee_match = Q()
+        for membership_type, payment_frequency in terms:
+            fee_match |= Q(membership_type=membership_type, payment_frequency=payment_frequency)
+        for fee in MembershipFee.objects.filter(fee_match, is_active=True):
+            fees_by_terms.setdefault((fee.membership_type, fee.payment_frequency), []).append({
+                'id': fee.pk,
+                'label': str(fee),
+                'amount': str(fee.amount),
+            })
+    
+    results = [
+        {
+            'id': member.pk,
+            'name': member.name,
+            'membership_number': member.membership_number,
+            'phone': member.phone,
+            'membership_type': member.membership_type,
+            'membership_type_display': member.get_membership_type_display(),
+            'payment_frequency': member.payment_frequency,
+            'payment_frequency_display': member.get_payment_frequency_display(),
+            'fees': fees_by_terms.get((member.membership_type, member.payment_frequency), []),
+        }
+        for member in members
+    ]
+    return JsonResponse({'results': results})
+
+
 @login_required
 def payment_add(request):
     """Add new payment"""
@@ -556,6 +583,43 @@ def fee_delete(request, pk):
     return render(request, 'membership/fee_confirm_delete.html', context)
 
 
+def group_by_bs_month(queryset, calendar_field, **aggregates):
+    """
+    Group a queryset by the BS month of one of its CalendarDay joins.
+    Runs as a single JOIN + GROUP BY; dates outside the calendar table are skipped.
+    """
+    year_key = f'{calendar_field}__bs_year'
+    month_key = f'{calendar_field}__bs_month'
+    rows = queryset.values(year_key, month_key).annotate(**aggregates).order_by(year_key, month_key)
+    
+    periods = []
+    for row in rows:
+        if row[year_key] is None:
+            continue
+        period = {key: row[key] for key in aggregates}
+        period['bs_year'] = row[year_key]
+        period['bs_month'] = row[month_key]
+        period['label'] = f"{NepaliDate.MONTH_NAMES[row[month_key] - 1]} {row[year_key]}"
+        periods.append(period)
+    return periods
+
+
+def group_by_fiscal_year(queryset, calendar_field, **aggregates):
+    """Group a queryset by the Nepali fiscal year of one of its CalendarDay joins"""
+    fiscal_key = f'{calendar_field}__fiscal_year'
+    rows = queryset.values(fiscal_key).annotate(**aggregates).order_by(fiscal_key)
+    
+    periods = []
+    for row in rows:
+        if row[fiscal_key] is None:
+            continue
+        period = {key: row[key] for key in aggregates}
+        period['fiscal_year'] = row[fiscal_key]
+        period['label'] = NepaliDate.fiscal_year_label(row[fiscal_key])
+        periods.append(period)
+    return periods
+
+
 @login_required
 def revenue_report(request):
     """Display revenue collection reports"""
@@ -592,6 +656,14 @@ def revenue_report(request):
         total=Sum('amount')
     ).order_by('day')
     
+    # Revenue by Nepali month and fiscal year (grouped in SQL via CalendarDay)
+    revenue_by_bs_month = group_by_bs_month(
+        payments, 'payment_calendar_day', total=Sum('amount'), count=Count('id')
+    )
+    revenue_by_fiscal_year = group_by_fiscal_year(
+        payments, 'payment_calendar_day', total=Sum('amount'), count=Count('id')
+    )
+    
     context = {
         'start_date': start_date,
         'end_date': end_date,
@@ -600,6 +672,8 @@ def revenue_report(request):
         'revenue_by_mode': revenue_by_mode,
         'revenue_by_type': revenue_by_type,
         'daily_revenue': daily_revenue,
+        'revenue_by_bs_month': revenue_by_bs_month,
+        'revenue_by_fiscal_year': revenue_by_fiscal_year,
         'payments': payments.order_by('-payment_date'),
     }
     return render(request, 'membership/revenue_report.html', context)
@@ -745,6 +819,9 @@ def renewal_required_report(request):
         'expired_count': expired_members.count(),
         'expiring_soon_count': expiring_soon.count(),
         'total_requiring_renewal': expired_members.count() + expiring_soon.count(),
+        'renewal_by_bs_month': group_by_bs_month(
+            expired_members | expiring_soon, 'expiry_calendar_day', count=Count('id')
+        ),
     }
     
     return render(request, 'membership/renewal_required_report.html', context)
@@ -815,6 +892,7 @@ def membership_expiry_report(request):
     
     context = {
         'members': members_list,
+        'expiry_by_bs_month': group_by_bs_month(members, 'expiry_calendar_day', count=Count('id')),
         'expired_count': all_regular.filter(membership_valid_until__lt=today).count(),
         'this_month_count': all_regular.filter(
             membership_valid_until__gte=today,
@@ -831,6 +909,38 @@ def membership_expiry_report(request):
     
     return render(request, 'membership/membership_expiry_report.html', context)
 
+# ARREARS REPORT
+@login_required
+def arrears_report(request):
+    """
+    Regular members with dues outstanding, largest amount first.
+    Reads the dues table as last rebuilt by the refresh_member_dues command.
+    """
+    frequency = request.GET.get('frequency', '')
+    
+    dues = MemberDues.objects.select_related('member')
+    if frequency:
+        dues = dues.filter(payment_frequency=frequency)
+    totals = cached_aggregate(
+        dues, count=Count('pk'), amount=Sum('amount_due'), periods=Sum('periods_owed'),
+        unpriced=Count('pk', filter=Q(amount_due__isnull=True)), computed_on=Min('computed_on'),
+    )
+    
+    paginator = Paginator(dues.order_by('-amount_due', '-member_id'), 50)
+    paginator.count = totals['count']  # Already counted above; skip Paginator's COUNT(*)
+    context = {
+        'dues': paginator.get_page(request.GET.get('page')),
+        'total_count': totals['count'],
+        'total_amount': totals['amount'] or 0,
+        'total_periods': totals['periods'] or 0,
+        'unpriced_count': totals['unpriced'],
+        'frequency': frequency,
+        'computed_on': totals['computed_on'],
+        'dues_stale': member_dues_stale(),
+    }
+    
+    return render(request, 'membership/arrears_report.html', context)
+
 # 3. NEW MEMBERS REPORT
 @login_required
 def new_members_report(request):
@@ -877,6 +987,7 @@ def new_members_report(request):
         ).count(),
         'regular_count': members.filter(membership_type='REGULAR').count(),
         'lifetime_count': members.filter(membership_type='LIFETIME').count(),
+        'members_by_bs_month': group_by_bs_month(members, 'join_calendar_day', count=Count('id')),
         'start_date': start_date.strftime('%Y-%m-%d'),
         'end_date': end_date.strftime('%Y-%m-%d'),
         'membership_type': membership_type,
@@ -902,234 +1013,50 @@ def bulk_upload_members(request):
             messages.error(request, 'Invalid file format. Please upload Excel (.xlsx, .xls) or CSV file.')
             return redirect('membership:bulk_upload_members')
         
-        try:
-            # Read the file based on extension
-            if file_extension == 'csv':
-                df = pd.read_csv(file)
-            else:
-                df = pd.read_excel(file)
-            
-            # Process and validate data
-            success_count = 0
-            error_count = 0
-            errors = []
-            skipped_count = 0
-            auto_generated = []
-            duplicate_phones = []  # Track phones that were auto-fixed
-            
-            for index, row in df.iterrows():
-                try:
-                    row_auto_gen = []
-                    
-                    # Skip completely empty rows
-                    if 'name' not in row or pd.isna(row['name']) or str(row['name']).strip() == '':
-                        skipped_count += 1
-                        continue
-                    
-                    name = str(row['name']).strip()
-                    
-                    # Handle phone with duplicate detection
-                    phone = None
-                    if 'phone' in row and not pd.isna(row['phone']) and str(row['phone']).strip():
-                        phone = str(row['phone']).strip()
-                        
-
-                    else:
-                        # No phone provided - generate placeholder
-                        import time
-                        phone = f"TEMP{int(time.time())}{index}"
-                        row_auto_gen.append('phone (missing)')
-                    
-                    # Parse dates
-                    date_of_birth = None
-                    if 'date_of_birth' in row and not pd.isna(row['date_of_birth']):
-                        try:
-                            date_of_birth = pd.to_datetime(row['date_of_birth']).date()
-                        except:
-                            pass
-                    
-                    join_date = timezone.now().date()
-                    if 'join_date' in row and not pd.isna(row['join_date']):
-                        try:
-                            join_date = pd.to_datetime(row['join_date']).date()
-                        except:
-                            pass
-                    
-                    citizenship_issue_date = None
-                    if 'citizenship_issue_date' in row and not pd.isna(row['citizenship_issue_date']):
-                        try:
-                            citizenship_issue_date = pd.to_datetime(row['citizenship_issue_date']).date()
-                        except:
-                            pass
-                    
-                    # Membership type
-                    membership_type = 'REGULAR'
-                    if 'membership_type' in row and not pd.isna(row['membership_type']):
-                        membership_type = str(row['membership_type']).upper().strip()
-                        if membership_type not in ['REGULAR', 'LIFETIME', 'HONORARY']:
-                            membership_type = 'REGULAR'
-                            row_auto_gen.append('membership_type')
-                    else:
-                        row_auto_gen.append('membership_type')
-                    
-                    # Gender
-                    gender = 'O'
-                    if 'gender' in row and not pd.isna(row['gender']):
-                        gender_value = str(row['gender']).upper().strip()
-                        if gender_value in ['M', 'MALE']:
-                            gender = 'M'
-                        elif gender_value in ['F', 'FEMALE']:
-                            gender = 'F'
-                        else:
-                            row_auto_gen.append('gender')
-                    else:
-                        row_auto_gen.append('gender')
-                    
-                    # Payment frequency
-                    payment_frequency = 'MONTHLY'
-                    if 'payment_frequency' in row and not pd.isna(row['payment_frequency']):
-                        freq_value = str(row['payment_frequency']).upper().strip()
-                        if freq_value in ['MONTHLY', 'QUARTERLY', 'YEARLY', 'ONE_TIME']:
-                            payment_frequency = freq_value
-                        else:
-                            row_auto_gen.append('payment_frequency')
-                    else:
-                        row_auto_gen.append('payment_frequency')
-                    
-                    # Generate membership number
-                    membership_number = None
-                    if 'membership_number' in row and not pd.isna(row['membership_number']):
-                        membership_number = str(row['membership_number']).strip()
-                        if Member.objects.filter(membership_number=membership_number).exists():
-                            membership_number = None
-                    
-                    if not membership_number:
-                        last_member = Member.objects.order_by('-id').first()
-                        if last_member and last_member.membership_number:
-                            try:
-                                last_number = int(last_member.membership_number.split('-')[-1])
-                                membership_number = f"NSS-{str(last_number + 1).zfill(3)}"
-                            except:
-                                membership_number = f"NSS-{str(Member.objects.count() + 1).zfill(3)}"
-                        else:
-                            membership_number = "NSS-001"
-                        row_auto_gen.append('membership_number')
-                    
-                    # Email
-                    email = ''
-                    if 'email' in row and not pd.isna(row['email']) and str(row['email']).strip():
-                        email = str(row['email']).strip()
-                    else:
-                        email = f"noemail.{membership_number.lower().replace('-', '')}@placeholder.com"
-                        row_auto_gen.append('email')
-                    
-                    # Address
-                    address = ''
-                    if 'address' in row and not pd.isna(row['address']) and str(row['address']).strip():
-                        address = str(row['address']).strip()
-                    else:
-                        address = 'Address not provided'
-                        row_auto_gen.append('address')
-                    
-                    # Get optional fields
-                    father_name = None
-                    if 'father_name' in row and not pd.isna(row['father_name']) and str(row['father_name']).strip():
-                        father_name = str(row['father_name']).strip()
-                    
-                    grandfather_name = None
-                    if 'grandfather_name' in row and not pd.isna(row['grandfather_name']) and str(row['grandfather_name']).strip():
-                        grandfather_name = str(row['grandfather_name']).strip()
-                    
-                    spouse_name = None
-                    if 'spouse_name' in row and not pd.isna(row['spouse_name']) and str(row['spouse_name']).strip():
-                        spouse_name = str(row['spouse_name']).strip()
-                    
-                    # Citizenship number - use None for unique field
-                    citizenship_number = None
-                    if 'citizenship_number' in row and not pd.isna(row['citizenship_number']) and str(row['citizenship_number']).strip():
-                        citizenship_number = str(row['citizenship_number']).strip()
-                    
-                    citizenship_issue_district = None
-                    if 'citizenship_issue_district' in row and not pd.isna(row['citizenship_issue_district']) and str(row['citizenship_issue_district']).strip():
-                        citizenship_issue_district = str(row['citizenship_issue_district']).strip()
-                    
-                    # Create member
-                    member = Member(
-                        membership_number=membership_number,
-                        name=name,
-                        phone=phone,
-                        email=email,
-                        date_of_birth=date_of_birth,
-                        gender=gender,
-                        address=address,
-                        father_name=father_name,
-                        grandfather_name=grandfather_name,
-                        spouse_name=spouse_name,
-                        citizenship_number=citizenship_number,
-                        citizenship_issue_date=citizenship_issue_date,
-                        citizenship_issue_district=citizenship_issue_district,
-                        membership_type=membership_type,
-                        payment_frequency=payment_frequency,
-                        join_date=join_date,
-                        is_active=True
-                    )
-                    
-                    member.save()
-                    success_count += 1
-                    
-                    if row_auto_gen:
-                        auto_generated.append({
-                            'row': index + 2,
-                            'name': name,
-                            'fields': row_auto_gen
-                        })
-                    
-                except Exception as e:
-                    error_count += 1
-                    errors.append(f'Row {index + 2}: {str(e)}')
-            
-            # Show results
-            if success_count > 0:
-                messages.success(request, f'✅ Successfully uploaded {success_count} member(s).')
-            
-            if skipped_count > 0:
-                messages.info(request, f'ℹ️ Skipped {skipped_count} empty row(s).')
-            
-
-            if auto_generated:
-                auto_gen_summary = []
-                for item in auto_generated[:10]:
-                    fields_str = ', '.join(item['fields'])
-                    auto_gen_summary.append(f"Row {item['row']} ({item['name']}): {fields_str}")
-                
-                auto_gen_message = '<br>'.join(auto_gen_summary)
-                if len(auto_generated) > 10:
-                    auto_gen_message += f'<br>... and {len(auto_generated) - 10} more rows'
-                
-                messages.info(
-                    request,
-                    f'ℹ️ Auto-generated placeholder data for {len(auto_generated)} member(s):<br>{auto_gen_message}<br><br>'
-                    f'<strong>Please update these fields later:</strong><br>'
-                    f'- Phone numbers starting with "TEMP" or "DUP"<br>'
-                    f'- Emails with "@placeholder.com"<br>'
-                    f'- Addresses saying "Address not provided"'
-                )
-            
-            if error_count > 0:
-                if len(errors) <= 10:
-                    error_list = '<br>'.join(errors)
-                else:
-                    error_list = '<br>'.join(errors[:10]) + f'<br>... and {len(errors) - 10} more'
-                
-                messages.error(request, f'❌ {error_count} row(s) failed:<br>{error_list}')
-            
-            return redirect('membership:member_list')
+        # Upsert: rows matching an existing member update it
+        update_existing = bool(request.POST.get('update_existing'))
+        
+        # Dry run: check the whole file against the database and download the report
+        if request.POST.get('dry_run'):
+            try:
+                importer = validate_file(file, file_extension, update_existing=update_existing)
+            except Exception as e:
+                messages.error(request, f'❌ Error processing file: {str(e)}')
+                return redirect('membership:bulk_upload_members')
             
-        except Exception as e:
-            messages.error(request, f'❌ Error processing file: {str(e)}')
-            return redirect('membership:bulk_upload_members')
+            report_name = file.name.rsplit('.', 1)[0] + '_validation.xlsx'
+            response = HttpResponse(
+                validation_report_xlsx(importer, file.name),
+                content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+            )
+            response['Content-Disposition'] = f'attachment; filename="{report_name}"'
+            return response
+        
+        # The import itself runs in the worker (manage.py run_import_jobs)
+        job = ImportJob.objects.create(
+            file=file,
+            file_name=file.name,
+            file_type=file_extension,
+            update_existing=update_existing,
+            created_by=request.user,
+        )
+        messages.info(request, f'📄 {file.name} uploaded. Members are being imported in the background.')
+        return redirect(f"{reverse('membership:bulk_upload_members')}?job={job.pk}")
     
-    return render(request, 'membership/bulk_upload_members.html')
+    job = None
+    job_id = request.GET.get('job', '')
+    if job_id.isdigit():
+        job = ImportJob.objects.filter(pk=job_id).first()
+    
+    return render(request, 'membership/bulk_upload_members.html', {'job': job})
+
+
+@login_required
+@user_passes_test(is_admin)
+def import_job_progress(request, pk):
+    """JSON progress of a background bulk upload, polled by the upload page"""
+    job = get_object_or_404(ImportJob, pk=pk)
+    return JsonResponse(job.progress())
 
 @login_required
 @user_passes_test(is_admin)
@@ -1199,6 +1126,8 @@ def download_template(request):
         ["- father_name, grandfather_name, spouse_name: Family details"],
         ["- citizenship_number, citizenship_issue_date, citizenship_issue_district"],
         ["- join_date: Format YYYY-MM-DD (default: today)"],
+        ["- date_of_birth_bs, join_date_bs, citizenship_issue_date_bs: Nepali (BS) dates"],
+        ["  used when the matching AD column is empty (e.g., 2081-03-15)"],
         [""],
         ["Date Format:"],
         ["All dates should be in YYYY-MM-DD format"],
@@ -1215,6 +1144,14 @@ def download_template(request):
         ["- Do not modify the header row"],
         ["- Leave cells empty if data is not available"],
         ["- Phone numbers can include country code"],
+        [""],
+        ["Workbook with related sheets:"],
+        ["- Name the sheets Members, Children and Payments to import all three at once"],
+        ["- Children: membership_number, name, date_of_birth (or date_of_birth_bs), gender"],
+        ["- Payments: membership_number, payment_date (or payment_date_bs), amount, payment_mode,"],
+        ["  receipt_number, transaction_reference, collected_by, remarks"],
+        ["- membership_number refers to the Members sheet or to an existing member"],
+        ["- Amount defaults to the member's fee; payments already recorded are skipped"],
     ]
     
     for row in instructions:
@@ -145,6 +145,30 @@ LOGIN_REDIRECT_URL = 'membership:home'
 LOGOUT_REDIRECT_URL = 'membership:login'
 
 
+# Cache for dashboard statistics, list totals and the dues rebuild marker.
+# Every worker must see the same cache so write invalidation reaches all of
+# them: Redis when REDIS_URL is set, otherwise a table in the main database
+# (created by migration 0020).
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'membership_cache',
+        }
+    }
+
+
+# Pre-fill the Nepali date formatting cache with the current fiscal year on the first request
+NEPALI_DATE_WARM_CACHE = True
+
+
 # Media files (uploads)
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'